@@ -0,0 +1,39 @@
+from typing import Optional
+
+import sinter
+
+
+def grid_stat(
+        d: int,
+        *,
+        p: float = 1e-3,
+        b: str = 'X',
+        style: str = 'A',
+        noise: str = 'SI1000',
+        decoder: str = 'pymatching',
+        shots: int = 100_000,
+        p_shot: float = 0,
+        seconds: float = 1,
+) -> sinter.TaskStats:
+    """Makes the stats of a grid point, with metadata like the circuits `gen_circuits` writes, for tests.
+
+    Args:
+        d: The code distance. The metadata also gets 4d rounds and 2d^2 - 1 qubits.
+        p: The noise strength.
+        b: The observable basis.
+        style: The circuit style.
+        noise: The noise model's name.
+        decoder: The decoder.
+        shots: The number of shots.
+        p_shot: The fraction of the shots that are errors.
+        seconds: The core-seconds spent sampling.
+    """
+    return sinter.TaskStats(
+        strong_id=f'{noise}-{decoder}-{style}-{b}-{p}-{d}',
+        decoder=decoder,
+        json_metadata={'r': 4 * d, 'd': d, 'p': p, 'noise': noise, 'b': b, 'style': style, 'q': 2 * d * d - 1},
+        shots=shots,
+        errors=round(shots * p_shot),
+        discards=0,
+        seconds=seconds,
+    )
@@ -1,8 +1,7 @@
 import functools
 import pathlib
-from typing import Optional, Callable, Dict, Tuple
+from typing import Any, Optional, Callable, Dict, Tuple
 
-import sinter
 import stim
 
 from midout import gen
@@ -19,6 +18,7 @@ from midout.toric._toric_heavyhex import make_heavyhex_toric_cx_code
 from midout.toric._toric_semiheavyhex_3cycle import \
     make_semiheavyhex_toric_cx_3cycle_code
 from midout.walking._make_walking_circuit_cases import make_walking_code
+from midout.stage_profile import profile_stage
 
 
 def make_construction_dict() -> Dict[str, Callable]:
@@ -67,6 +67,32 @@ def hide_long_range_tiles(patch: gen.Patch, remove_entirely: bool = False) -> ge
     return gen.Patch(back_tiles + tiles, do_not_sort=True)
 
 
+def _write_circuit_html(
+        circuit: stim.Circuit,
+        *,
+        patch: Optional[gen.Patch],
+        path: pathlib.Path,
+        ticks_per_page: Optional[int]):
+    if ticks_per_page is None:
+        with open(path, "w") as f:
+            gen.stim_circuit_html_viewer(circuit, patch=patch, out=f)
+        print(f'wrote file://{path.absolute()}')
+        return
+
+    # Large circuits are split into linked pages, starting from the given path.
+    pages = gen.stim_circuit_html_viewer_pages(
+        circuit,
+        patch=patch,
+        ticks_per_page=ticks_per_page,
+        page_name=lambda start, stop: path.name if start == 0 else f'{path.stem}_ticks={start}-{stop}{path.suffix}',
+    )
+    for k, (name, html) in enumerate(pages):
+        with open(path.parent / name, "w") as f:
+            print(html, file=f)
+        if k == 0:
+            print(f'wrote file://{path.absolute()} (and following pages)')
+
+
 def make_requested_surface_code(
         *,
         basis: str,
@@ -75,47 +101,214 @@ def make_requested_surface_code(
         style: str,
         rounds: int,
         debug_out_dir: Optional[pathlib.Path] = None,
+        debug_ticks_per_page: Optional[int] = None,
+        noise_tags: Optional[Dict[str, Any]] = None,
 ) -> Tuple[CircuitCase, stim.Circuit]:
-    if style not in CONSTRUCTIONS:
-        raise NotImplementedError(f'{style}=')
-    result: CircuitCase = CONSTRUCTIONS[style](
-        distance=distance,
+    """Makes a circuit of the given style, and its noisy version.
+
+    Args:
+        noise_tags: Extra tags (e.g. the noise model's name and strength) for
+            the stages that depend on the noise, so that an active
+            midout.stage_profile.StageProfiler can tell them apart.
+    """
+    result = _make_ideal_surface_code(
         basis=basis,
+        distance=distance,
+        style=style,
         rounds=rounds,
+        debug_out_dir=debug_out_dir,
+        debug_ticks_per_page=debug_ticks_per_page,
+    )
+    noisy_circuit = _make_noisy_circuit(
+        result,
+        noise=noise,
+        tags=dict(style=style, d=distance, b=basis, r=rounds, **(noise_tags or {})),
+        debug_out_dir=debug_out_dir,
+        debug_ticks_per_page=debug_ticks_per_page,
     )
-    assert isinstance(result, CircuitCase)
+    return result, noisy_circuit
+
+
+def _make_ideal_surface_code(
+        *,
+        basis: str,
+        distance: int,
+        style: str,
+        rounds: int,
+        debug_out_dir: Optional[pathlib.Path],
+        debug_ticks_per_page: Optional[int],
+) -> CircuitCase:
+    if style not in CONSTRUCTIONS:
+        raise NotImplementedError(f'{style=}')
+    # Tags for the stages measured by an active midout.stage_profile.StageProfiler.
+    tags = dict(style=style, d=distance, b=basis, r=rounds)
+    with profile_stage('construction', **tags) as stage:
+        result: CircuitCase = CONSTRUCTIONS[style](
+            distance=distance,
+            basis=basis,
+            rounds=rounds,
+        )
+        assert isinstance(result, CircuitCase)
+        stage.record_output(result.circuit)
 
-    main_patch = None
     if debug_out_dir is not None:
-        patches = [hide_long_range_tiles(patch) for patch in result.patches]
-        main_patch = hide_long_range_tiles(patches[0], True)
+        with profile_stage('hide_long_range_tiles', **tags):
+            patches = [hide_long_range_tiles(patch) for patch in result.patches]
+            main_patch = hide_long_range_tiles(patches[0], True)
 
-        path = debug_out_dir / "tiles.svg"
-        with open(path, "w") as f:
-            print(gen.patch_svg_viewer(
-                patches,
-                show_order=result.show_patch_order,
-                show_measure_qubits=result.show_patch_measure_qubits,
-            ), file=f)
-        print(f'wrote file://{path.absolute()}')
+        with profile_stage('render_ideal_viewers', **tags):
+            path = debug_out_dir / "tiles.svg"
+            with open(path, "w") as f:
+                print(gen.patch_svg_viewer(
+                    patches,
+                    show_order=result.show_patch_order,
+                    show_measure_qubits=result.show_patch_measure_qubits,
+                ), file=f)
+            print(f'wrote file://{path.absolute()}')
 
-        path = debug_out_dir / "ideal_circuit.html"
-        with open(debug_out_dir / "ideal_circuit.html", "w") as f:
-            print(gen.stim_circuit_html_viewer(result.circuit, patch=main_patch), file=f)
-        print(f'wrote file://{path.absolute()}')
+            _write_circuit_html(result.circuit, patch=main_patch, path=debug_out_dir / "ideal_circuit.html", ticks_per_page=debug_ticks_per_page)
 
-    noisy_circuit = noise.noisy_circuit(result.circuit)
+    return result
+
+
+def _make_noisy_circuit(
+        result: CircuitCase,
+        *,
+        noise: gen.NoiseModel,
+        tags: Dict[str, Any],
+        debug_out_dir: Optional[pathlib.Path],
+        debug_ticks_per_page: Optional[int],
+) -> stim.Circuit:
+    with profile_stage('noise', **tags) as stage:
+        noisy_circuit = noise.noisy_circuit(result.circuit)
+        stage.record_output(noisy_circuit)
 
     if debug_out_dir is not None:
-        path = debug_out_dir / "circuit.html"
-        with open(debug_out_dir / "circuit.html", "w") as f:
-            print(gen.stim_circuit_html_viewer(noisy_circuit, patch=main_patch), file=f)
-        print(f'wrote file://{path.absolute()}')
+        with profile_stage('render_noisy_viewer', **tags):
+            main_patch = hide_long_range_tiles(result.patches[0], True)
+            _write_circuit_html(noisy_circuit, patch=main_patch, path=debug_out_dir / "circuit.html", ticks_per_page=debug_ticks_per_page)
+
+    return noisy_circuit
+
+
+NOISE_MODELS: Dict[str, Callable[[float], gen.NoiseModel]] = {
+    'SI1000': gen.NoiseModel.si1000,
+    'UniformDepolarizing': gen.NoiseModel.uniform_depolarizing,
+}
 
-    return result, noisy_circuit
+
+def grid_point_metadata(
+        *,
+        basis: str,
+        distance: int,
+        noise_model_name: str,
+        noise_strength: float,
+        style: str,
+) -> Dict[str, Any]:
+    """Returns the metadata of a grid point, except for its qubit count `q`.
+
+    The keys are in the order used by the circuit file names, so that the
+    metadata matches what `sinter.comma_separated_key_values` parses back.
+    """
+    return {
+        'r': 4 * distance,
+        'd': distance,
+        'p': noise_strength,
+        'noise': noise_model_name,
+        'b': basis,
+        'style': style,
+    }
+
+
+def make_grid_circuit(
+        *,
+        basis: str,
+        distance: int,
+        noise_model_name: str,
+        noise_strength: float,
+        style: str,
+        debug_out_dir: Optional[pathlib.Path] = None,
+        debug_ticks_per_page: Optional[int] = None,
+) -> Tuple[Dict[str, Any], stim.Circuit]:
+    """Makes the noisy circuit for one point of the benchmarking grid.
+
+    Returns:
+        A (json_metadata, circuit) tuple. The metadata is the grid point's
+        metadata plus its qubit count `q`.
+    """
+    if noise_model_name not in NOISE_MODELS:
+        raise NotImplementedError(f'{noise_model_name=}')
+    noise = NOISE_MODELS[noise_model_name](noise_strength)
+    metadata = grid_point_metadata(
+        basis=basis,
+        distance=distance,
+        noise_model_name=noise_model_name,
+        noise_strength=noise_strength,
+        style=style,
+    )
+
+    metadata['q'], ideal = make_grid_ideal_circuit(
+        basis=basis,
+        distance=distance,
+        style=style,
+        debug_out_dir=debug_out_dir,
+        debug_ticks_per_page=debug_ticks_per_page,
+    )
+    circuit = _make_noisy_circuit(
+        ideal,
+        noise=noise,
+        tags=dict(style=style, d=distance, b=basis, r=metadata['r'], noise=noise_model_name, p=noise_strength),
+        debug_out_dir=debug_out_dir,
+        debug_ticks_per_page=debug_ticks_per_page,
+    )
+    return metadata, circuit
+
+
+def make_grid_ideal_circuit(
+        *,
+        basis: str,
+        distance: int,
+        style: str,
+        debug_out_dir: Optional[pathlib.Path] = None,
+        debug_ticks_per_page: Optional[int] = None,
+) -> Tuple[int, CircuitCase]:
+    """Makes the noiseless circuit shared by every noise model and strength of a grid point.
+
+    Applying `NOISE_MODELS[name](p).noisy_circuit` to the result's circuit
+    gives the circuit `make_grid_circuit` makes for that noise model and
+    strength.
+
+    Returns:
+        A (q, circuit case) tuple, where q is the qubit count put into the
+        grid point's metadata.
+    """
+    rounds = grid_point_metadata(
+        basis=basis,
+        distance=distance,
+        noise_model_name='',
+        noise_strength=0,
+        style=style,
+    )['r']
+    result = _make_ideal_surface_code(
+        basis=basis,
+        distance=distance,
+        style=style,
+        rounds=rounds,
+        debug_out_dir=debug_out_dir,
+        debug_ticks_per_page=debug_ticks_per_page,
+    )
+    if style.split("-")[0] in ["GLIDING", "SLIDING"]:
+        # these should have the same qubit count as wiggling, regardless of how far they move
+        wiggling_equiv = CONSTRUCTIONS[f"WIGGLING-{style.split('-')[1]}"](distance=distance, basis=basis, rounds=3)
+        q = wiggling_equiv.circuit.num_qubits
+    else:
+        q = result.circuit.num_qubits
+    return q, result
 
 
 def xz_piece_error_rate(p_combo: float, *, pieces: float, combo: bool) -> float:
+    import sinter
+
     if not combo:
         return sinter.shot_error_rate_to_piece_error_rate(p_combo, pieces=pieces)
     p_solo = 1 - (1 - p_combo)**0.5
@@ -1,4 +1,8 @@
 import itertools
+import os
+import pathlib
+import subprocess
+import sys
 from typing import Set
 
 import pytest
@@ -110,3 +114,28 @@ def test_xz_piece_error_rate():
     assert xz_piece_error_rate(0.74, pieces=10, combo=True) < 0.74
     assert xz_piece_error_rate(0.75, pieces=10, combo=True) == 0.75
     assert xz_piece_error_rate(0.76, pieces=10, combo=True) > 0.76
+
+
+def test_import_time_budget():
+    # Every circuit generation process (and every sinter worker unpickling midout tasks)
+    # pays this cost, so keep heavy optional modules (e.g. plotting) out of it.
+    src_dir = pathlib.Path(__file__).parent.parent
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join([str(src_dir), env.get('PYTHONPATH', '')])
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', 'import midout.all_circuits'],
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    cumulative_micros = {}
+    for line in result.stderr.splitlines():
+        if line.startswith('import time:') and '|' in line:
+            _, cumulative, name = line[len('import time:'):].split('|')
+            if cumulative.strip().isdigit():
+                cumulative_micros[name.strip()] = int(cumulative)
+    imported = set(cumulative_micros)
+    assert 'midout.all_circuits' in imported
+    assert not {m for m in imported if m.split('.')[0] in ['matplotlib', 'sinter', 'scipy']}
+    assert cumulative_micros['midout.all_circuits'] < 2_000_000
@@ -0,0 +1,189 @@
+import json
+import os
+import pathlib
+import struct
+import zlib
+from typing import Any, Dict, Iterator, List, Optional, Union, TYPE_CHECKING
+
+import stim
+
+from midout.all_circuits import NOISE_MODELS
+
+if TYPE_CHECKING:
+    import sinter
+
+PathLike = Union[str, pathlib.Path]
+
+# An archive is this magic, then zlib compressed ideal circuits back to back, then the zlib
+# compressed json index, then a footer with the index's offset and length followed by the magic.
+_MAGIC = b'MIDOUTARCHIVE1\n'
+_FOOTER = struct.Struct('<QQ')
+
+
+class CircuitArchiveWriter:
+    """Writes benchmarking circuits into a single archive file.
+
+    Each ideal (noiseless) circuit is stored once, compressed. A noisy
+    circuit is stored as an index entry holding only its metadata, whose
+    'noise' and 'p' values say which of `midout.all_circuits.NOISE_MODELS`
+    to apply to which ideal circuit. See `CircuitArchive` for reading.
+
+    The archive is written to a temporary file, which only replaces the
+    file at path when the writer exits without an exception. A failed run
+    leaves an existing archive at path untouched.
+
+    Usage:
+        with CircuitArchiveWriter(path) as writer:
+            ideal = writer.add_ideal_circuit(circuit)
+            writer.add_variant(json_metadata, ideal=ideal)
+    """
+
+    def __init__(self, path: PathLike):
+        self.path = pathlib.Path(path)
+        self._tmp_path = self.path.with_name(f'.{self.path.name}.{os.getpid()}.tmp')
+        self._file = None
+        self._blobs: List[List[int]] = []
+        self._variants: List[Dict[str, Any]] = []
+
+    def __enter__(self) -> 'CircuitArchiveWriter':
+        self._file = open(self._tmp_path, 'wb')
+        self._file.write(_MAGIC)
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        try:
+            if exc_type is None:
+                index = zlib.compress(json.dumps({
+                    'blobs': self._blobs,
+                    'variants': self._variants,
+                }).encode('utf8'))
+                offset = self._file.tell()
+                self._file.write(index)
+                self._file.write(_FOOTER.pack(offset, len(index)))
+                self._file.write(_MAGIC)
+        finally:
+            self._file.close()
+            self._file = None
+        if exc_type is None:
+            os.replace(self._tmp_path, self.path)
+        else:
+            self._tmp_path.unlink(missing_ok=True)
+
+    def add_ideal_circuit(self, circuit: stim.Circuit) -> int:
+        """Stores a noiseless circuit, and returns the id that variants refer to it by."""
+        data = zlib.compress(str(circuit).encode('utf8'), level=9)
+        self._blobs.append([self._file.tell(), len(data)])
+        self._file.write(data)
+        return len(self._blobs) - 1
+
+    def add_variant(self, json_metadata: Dict[str, Any], *, ideal: int) -> None:
+        """Adds a noisy circuit, made by applying the metadata's noise model and strength to an ideal circuit."""
+        if json_metadata['noise'] not in NOISE_MODELS:
+            raise NotImplementedError(f"{json_metadata['noise']=}")
+        if not 0 <= ideal < len(self._blobs):
+            raise ValueError(f'{ideal=} is not the id of an ideal circuit in the archive.')
+        self._variants.append({'metadata': json_metadata, 'ideal': ideal})
+
+
+class CircuitArchive:
+    """Reads the circuits written by CircuitArchiveWriter.
+
+    Only the index is read up front. Circuits are materialized on demand,
+    decompressing their ideal circuit (which is kept for the next variant
+    of the same circuit) and applying their noise model.
+    """
+
+    def __init__(self, path: PathLike):
+        self.path = pathlib.Path(path)
+        with open(self.path, 'rb') as f:
+            if f.read(len(_MAGIC)) != _MAGIC:
+                raise ValueError(f'{self.path} is not a circuit archive.')
+            truncated = ValueError(f'{self.path} is truncated (was it still being written?).')
+            if os.fstat(f.fileno()).st_size < 2 * len(_MAGIC) + _FOOTER.size:
+                raise truncated
+            f.seek(-(_FOOTER.size + len(_MAGIC)), 2)
+            offset, length = _FOOTER.unpack(f.read(_FOOTER.size))
+            if f.read(len(_MAGIC)) != _MAGIC:
+                raise truncated
+            f.seek(offset)
+            index = json.loads(zlib.decompress(f.read(length)))
+        self._blobs: List[List[int]] = index['blobs']
+        self._variants: List[Dict[str, Any]] = index['variants']
+        self._by_key = {_metadata_key(v['metadata']): v for v in self._variants}
+        self._cached_ideal: Optional[int] = None
+        self._cached_ideal_circuit: Optional[stim.Circuit] = None
+
+    @property
+    def metadatas(self) -> List[Dict[str, Any]]:
+        """The metadata of every circuit in the archive, in the order they were added."""
+        return [v['metadata'] for v in self._variants]
+
+    def find(self, **query: Any) -> List[Dict[str, Any]]:
+        """Returns the metadata of the circuits whose metadata has all the given values."""
+        return [
+            m
+            for m in self.metadatas
+            if all(k in m and m[k] == v for k, v in query.items())
+        ]
+
+    def _lookup(self, json_metadata: Dict[str, Any]) -> Dict[str, Any]:
+        variant = self._by_key.get(_metadata_key(json_metadata))
+        if variant is None:
+            raise KeyError(f'No circuit with metadata {json_metadata} in {self.path}.')
+        return variant
+
+    def _ideal_circuit(self, ideal: int) -> stim.Circuit:
+        if self._cached_ideal != ideal:
+            offset, length = self._blobs[ideal]
+            with open(self.path, 'rb') as f:
+                f.seek(offset)
+                text = zlib.decompress(f.read(length)).decode('utf8')
+            self._cached_ideal_circuit = stim.Circuit(text)
+            self._cached_ideal = ideal
+        return self._cached_ideal_circuit
+
+    def circuit(self, json_metadata: Dict[str, Any]) -> stim.Circuit:
+        """Materializes the noisy circuit with the given metadata (e.g. from `find`)."""
+        variant = self._lookup(json_metadata)
+        m = variant['metadata']
+        noise = NOISE_MODELS[m['noise']](m['p'])
+        noisy_circuit = noise.noisy_circuit(self._ideal_circuit(variant['ideal']))
+        # Round trip through text, like a .stim file does, so that noise probabilities whose
+        # printed form isn't exact come out bit for bit the same as when read from a file.
+        return stim.Circuit(str(noisy_circuit))
+
+    def sinter_task(self, json_metadata: Dict[str, Any], *, decoder: str) -> 'sinter.Task':
+        """Makes the sinter task that `sinter collect --metadata_func auto` makes for the circuit's .stim file.
+
+        The metadata keeps the key order of the .stim file names, so the
+        strong ids match stats collected from the files.
+        """
+        task, = self._sinter_tasks(json_metadata, decoders=[decoder])
+        return task
+
+    def _sinter_tasks(self, json_metadata: Dict[str, Any], *, decoders: List[str]) -> Iterator['sinter.Task']:
+        import sinter
+        from midout.sinter_tasks import sinter_dem
+
+        variant = self._lookup(json_metadata)
+        circuit = self.circuit(json_metadata)
+        dem = sinter_dem(circuit)
+        for decoder in decoders:
+            yield sinter.Task(
+                circuit=circuit,
+                decoder=decoder,
+                detector_error_model=dem,
+                json_metadata=variant['metadata'],
+            )
+
+    def iter_sinter_tasks(self, *, decoders: List[str]) -> Iterator['sinter.Task']:
+        """Lazily yields a task per circuit and decoder, in the order the circuits were added.
+
+        Each circuit (and its detector error model) is made once, and shared by its decoders' tasks.
+        """
+        for m in self.metadatas:
+            yield from self._sinter_tasks(m, decoders=decoders)
+
+
+def _metadata_key(json_metadata: Dict[str, Any]) -> str:
+    return json.dumps(json_metadata, sort_keys=True)
@@ -0,0 +1,117 @@
+import pytest
+import stim
+
+from midout.all_circuits import grid_point_metadata, make_grid_circuit, make_grid_ideal_circuit
+from midout.circuit_archive import CircuitArchive, CircuitArchiveWriter
+from midout.sinter_tasks import load_sinter_task
+
+
+def _write_archive(path, *, styles, noise_strengths=(1e-3, 2e-3)):
+    with CircuitArchiveWriter(path) as writer:
+        for style in styles:
+            q, ideal_case = make_grid_ideal_circuit(distance=3, style=style, basis='X')
+            ideal = writer.add_ideal_circuit(ideal_case.circuit)
+            for p in noise_strengths:
+                json_metadata = grid_point_metadata(
+                    distance=3,
+                    noise_model_name='SI1000',
+                    noise_strength=p,
+                    style=style,
+                    basis='X',
+                )
+                json_metadata['q'] = q
+                writer.add_variant(json_metadata, ideal=ideal)
+
+
+def test_archive_matches_grid_circuits(tmp_path):
+    path = tmp_path / 'circuits.midout'
+    styles = ['4-CZ', 'WIGGLING-CZ', 'GLIDING-CZ']
+    _write_archive(path, styles=styles)
+
+    archive = CircuitArchive(path)
+    assert len(archive.metadatas) == 6
+    for m in archive.metadatas:
+        expected_metadata, expected_circuit = make_grid_circuit(
+            distance=3,
+            noise_model_name='SI1000',
+            noise_strength=m['p'],
+            style=m['style'],
+            basis='X',
+        )
+        assert m == expected_metadata
+        assert list(m) == list(expected_metadata)
+        assert archive.circuit(m) == expected_circuit
+
+
+def test_archive_sinter_task_strong_id(tmp_path):
+    path = tmp_path / 'circuits.midout'
+    _write_archive(path, styles=['4-CZ'], noise_strengths=[1e-3])
+    archive = CircuitArchive(path)
+    m, = archive.metadatas
+
+    stim_path = tmp_path / (','.join(f'{k}={v}' for k, v in m.items()) + '.stim')
+    archive.circuit(m).to_file(stim_path)
+    expected = load_sinter_task(stim_path, decoder='pymatching')
+    task = archive.sinter_task(m, decoder='pymatching')
+    assert task.json_metadata == expected.json_metadata
+    assert task.strong_id() == expected.strong_id()
+
+    tasks = list(archive.iter_sinter_tasks(decoders=['pymatching', 'internal']))
+    assert [t.decoder for t in tasks] == ['pymatching', 'internal']
+    assert tasks[0].strong_id() == expected.strong_id()
+    # The decoders' tasks share one circuit and detector error model.
+    assert tasks[0].circuit is tasks[1].circuit
+    assert tasks[0].detector_error_model is tasks[1].detector_error_model
+
+
+def test_archive_find(tmp_path):
+    path = tmp_path / 'circuits.midout'
+    _write_archive(path, styles=['4-CZ', 'WIGGLING-CZ'])
+    archive = CircuitArchive(path)
+
+    assert [m['style'] for m in archive.find(p=2e-3)] == ['4-CZ', 'WIGGLING-CZ']
+    assert [m['p'] for m in archive.find(style='4-CZ')] == [1e-3, 2e-3]
+    assert archive.find(style='4-CZ', p=5e-3) == []
+    assert archive.find(nope=1) == []
+    with pytest.raises(KeyError):
+        archive.circuit({'style': '4-CZ'})
+
+
+def test_archive_rejects_bad_files(tmp_path):
+    path = tmp_path / 'circuits.midout'
+    _write_archive(path, styles=['4-CZ'], noise_strengths=[1e-3])
+
+    truncated = tmp_path / 'truncated.midout'
+    truncated.write_bytes(path.read_bytes()[:-5])
+    with pytest.raises(ValueError, match='truncated'):
+        CircuitArchive(truncated)
+
+    # Interrupted before its first circuit.
+    magic_only = tmp_path / 'magic_only.midout'
+    magic_only.write_bytes(path.read_bytes()[:len(b'MIDOUTARCHIVE1\n')])
+    with pytest.raises(ValueError, match='truncated'):
+        CircuitArchive(magic_only)
+
+    other = tmp_path / 'other.midout'
+    other.write_bytes(b'QUBIT_COORDS(0, 0) 0\n' * 10)
+    with pytest.raises(ValueError, match='not a circuit archive'):
+        CircuitArchive(other)
+
+    with CircuitArchiveWriter(tmp_path / 'x.midout') as writer:
+        with pytest.raises(NotImplementedError):
+            writer.add_variant({'noise': 'nope'}, ideal=0)
+        with pytest.raises(ValueError, match='ideal'):
+            writer.add_variant({'noise': 'SI1000'}, ideal=0)
+
+
+def test_failed_write_keeps_previous_archive(tmp_path):
+    path = tmp_path / 'circuits.midout'
+    _write_archive(path, styles=['4-CZ'], noise_strengths=[1e-3])
+    good = path.read_bytes()
+
+    with pytest.raises(RuntimeError):
+        with CircuitArchiveWriter(path) as writer:
+            writer.add_ideal_circuit(stim.Circuit('H 0'))
+            raise RuntimeError('interrupted')
+    assert path.read_bytes() == good
+    assert [p.name for p in tmp_path.iterdir()] == ['circuits.midout']
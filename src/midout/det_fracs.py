@@ -0,0 +1,110 @@
+import math
+from typing import Dict, Optional
+
+import numpy as np
+import stim
+
+# The number of set bits in each byte value.
+_POPCOUNT = np.array([bin(k).count('1') for k in range(256)], dtype=np.uint16)
+
+# The most shots taken from the sampler at once. Counting unpacks a batch into a byte per shot and
+# detector, so this bounds memory use (a 5000 detector circuit needs about 80MB per batch).
+MAX_SAMPLER_BATCH_SHOTS = 2**14
+
+
+class DetectionFractions:
+    """How often each detector of a circuit fires, from sampling it.
+
+    Attributes:
+        shots: The number of shots that were sampled.
+        detector_counts: The number of shots in which each detector fired.
+        detector_rounds: The last coordinate (the time) of each detector, or
+            None for detectors without coordinates.
+    """
+
+    def __init__(self, *, shots: int, detector_counts: np.ndarray, detector_rounds: np.ndarray):
+        self.shots = shots
+        self.detector_counts = detector_counts
+        self.detector_rounds = detector_rounds
+
+    @property
+    def mean(self) -> float:
+        """The fraction of detectors that fire, averaged over shots and detectors."""
+        if not len(self.detector_counts) or not self.shots:
+            return 0
+        return float(np.sum(self.detector_counts)) / len(self.detector_counts) / self.shots
+
+    @property
+    def per_detector(self) -> np.ndarray:
+        return self.detector_counts / self.shots
+
+    def per_round(self) -> Dict[float, float]:
+        """The detection fraction of the detectors in each round, keyed by the round's time coordinate."""
+        known = np.array([e is not None for e in self.detector_rounds], dtype=np.bool_)
+        if not np.any(known):
+            return {}
+        rounds, inverse = np.unique(self.detector_rounds[known].astype(np.float64), return_inverse=True)
+        counts = np.bincount(inverse, weights=self.detector_counts[known], minlength=len(rounds))
+        sizes = np.bincount(inverse, minlength=len(rounds))
+        return {float(r): float(c) / n / self.shots for r, c, n in zip(rounds, counts, sizes)}
+
+
+def _detector_rounds(circuit: stim.Circuit) -> np.ndarray:
+    coords = circuit.get_detector_coordinates()
+    result = np.empty(circuit.num_detectors, dtype=object)
+    for k in range(circuit.num_detectors):
+        c = coords.get(k)
+        result[k] = c[-1] if c else None
+    return result
+
+
+def sample_detection_fractions(
+        circuit: stim.Circuit,
+        *,
+        target_relative_error: float = 0.01,
+        min_shots: int = 2**10,
+        max_shots: int = 2**20,
+        seed: Optional[int] = None,
+) -> DetectionFractions:
+    """Samples a circuit's detectors until the mean detection fraction is known well enough.
+
+    Sampling starts with min_shots and keeps doubling the number of shots
+    until the standard error of the mean detection fraction (over shots) is
+    at most target_relative_error times the mean, or max_shots is reached.
+
+    Set bits are counted directly on the bit packed samples, with a byte
+    lookup table for each shot's total and `np.unpackbits` for the per
+    detector counts. The sampler is called with at most
+    MAX_SAMPLER_BATCH_SHOTS shots at a time.
+    """
+    num_detectors = circuit.num_detectors
+    sampler = circuit.compile_detector_sampler(seed=seed)
+    detector_counts = np.zeros(num_detectors, dtype=np.int64)
+    shots = 0
+    # Running sums of the number of detection events per shot, and their squares.
+    sum_events = 0
+    sum_squared_events = 0
+    batch = min_shots
+    while True:
+        for start in range(0, batch, MAX_SAMPLER_BATCH_SHOTS):
+            packed = sampler.sample(shots=min(MAX_SAMPLER_BATCH_SHOTS, batch - start), bit_packed=True)
+            events = _POPCOUNT[packed].sum(axis=1, dtype=np.int64)
+            sum_events += int(events.sum())
+            sum_squared_events += int((events * events).sum())
+            detector_counts += np.unpackbits(packed, axis=1, count=num_detectors, bitorder='little').sum(axis=0, dtype=np.int64)
+        shots += batch
+
+        if shots >= max_shots or not num_detectors:
+            break
+        mean = sum_events / shots
+        if mean:
+            variance = max(0.0, sum_squared_events / shots - mean * mean)
+            if math.sqrt(variance / shots) <= target_relative_error * mean:
+                break
+        batch = min(shots, max_shots - shots)
+
+    return DetectionFractions(
+        shots=shots,
+        detector_counts=detector_counts,
+        detector_rounds=_detector_rounds(circuit),
+    )
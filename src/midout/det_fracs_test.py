@@ -0,0 +1,57 @@
+import numpy as np
+import stim
+
+from midout.det_fracs import sample_detection_fractions
+
+
+def test_sample_detection_fractions():
+    circuit = stim.Circuit.generated(
+        'surface_code:rotated_memory_x',
+        distance=3,
+        rounds=5,
+        after_clifford_depolarization=1e-2,
+    )
+    fracs = sample_detection_fractions(circuit, target_relative_error=0.01, seed=0)
+    assert 2**10 <= fracs.shots <= 2**20
+    assert len(fracs.per_detector) == circuit.num_detectors
+
+    # Agrees with counting the unpacked samples.
+    expected = circuit.compile_detector_sampler(seed=0).sample(shots=fracs.shots)
+    assert abs(fracs.mean - np.mean(expected)) < 0.05 * np.mean(expected)
+    assert fracs.mean == np.sum(fracs.detector_counts) / circuit.num_detectors / fracs.shots
+
+    # Rounds are keyed by the detectors' time coordinate.
+    rounds = fracs.per_round()
+    assert sorted(rounds) == [float(t) for t in range(6)]
+    assert 0 < rounds[0] < rounds[3]
+
+    # A looser target needs fewer shots.
+    loose = sample_detection_fractions(circuit, target_relative_error=0.2, seed=0)
+    assert loose.shots == 2**10
+
+
+def test_sample_detection_fractions_max_shots():
+    circuit = stim.Circuit('''
+        X_ERROR(0.001) 0
+        M 0
+        DETECTOR rec[-1]
+    ''')
+    fracs = sample_detection_fractions(circuit, target_relative_error=1e-6, max_shots=5000, seed=0)
+    assert fracs.shots == 5000
+    assert fracs.per_round() == {}
+
+
+def test_sample_detection_fractions_caps_sampler_batches(monkeypatch):
+    from midout import det_fracs
+
+    monkeypatch.setattr(det_fracs, 'MAX_SAMPLER_BATCH_SHOTS', 1000)
+    circuit = stim.Circuit('''
+        X_ERROR(0.25) 0 1
+        M 0 1
+        DETECTOR rec[-1]
+        DETECTOR rec[-2]
+    ''')
+    fracs = sample_detection_fractions(circuit, target_relative_error=1e-6, max_shots=5000, seed=0)
+    assert fracs.shots == 5000
+    assert abs(fracs.mean - 0.25) < 0.02
+    assert np.all(np.abs(fracs.per_detector - 0.25) < 0.03)
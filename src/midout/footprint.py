@@ -0,0 +1,249 @@
+import contextlib
+import hashlib
+import json
+import math
+import os
+import pathlib
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import sinter
+
+from midout.all_circuits import xz_piece_error_rate
+
+FailureUnitFunc = Callable[[sinter.TaskStats], float]
+
+# Maps a failure unit's name to its target error rate and to the number of those units in a shot.
+FAILURE_UNITS: Dict[str, Tuple[float, FailureUnitFunc]] = {
+    'megaround': (1e-6, lambda stat: stat.json_metadata['r']),
+    'teraquop': (1e-12, lambda stat: stat.json_metadata['r'] / stat.json_metadata['d']),
+    'terashot': (1e-12, lambda _: 1),
+}
+
+# The extra squared error of the line fits bounding an extrapolated footprint (like sinter's `max_extra_squared_error`).
+MAX_EXTRA_SQUARED_ERROR = 1
+
+# Shot error rates at or above this are too saturated to say anything about the footprint.
+MAX_FITTED_SHOT_ERROR_RATE = 0.3
+
+
+# Part of the key of cached fits. Bump it when the cache's format changes.
+FOOTPRINT_FITS_CACHE_VERSION = 1
+
+FootprintGroupKey = Tuple[Any, ...]
+
+
+def footprint_group_key(stat: sinter.TaskStats) -> FootprintGroupKey:
+    """Stats with equal keys lie on the same footprint line, differing only in code size."""
+    return (stat.decoder,) + tuple(sorted(
+        (k, v) for k, v in stat.json_metadata.items() if k not in ('d', 'r', 'q')
+    ))
+
+
+def footprint_fit_points(
+        group: List[sinter.TaskStats],
+        *,
+        failure_unit_func: FailureUnitFunc,
+) -> List[Tuple[sinter.TaskStats, float, float]]:
+    """Returns (stat, log of its per-unit error rate, sqrt of its qubit count) for each usable stat.
+
+    Stats without shots, without errors, or with a shot error rate at or above
+    MAX_FITTED_SHOT_ERROR_RATE aren't usable.
+    """
+    result = []
+    for stat in group:
+        if stat.shots:
+            p_shot = stat.errors / stat.shots
+            if 0 < p_shot < MAX_FITTED_SHOT_ERROR_RATE:
+                p_unit = xz_piece_error_rate(p_shot, pieces=failure_unit_func(stat), combo=stat.json_metadata['b'] == 'XZ')
+                result.append((stat, math.log(p_unit), math.sqrt(stat.json_metadata['q'])))
+    return result
+
+
+def fit_footprints(
+        groups: Sequence[List[sinter.TaskStats]],
+        *,
+        target_p: float,
+        failure_unit_func: FailureUnitFunc,
+) -> List[Optional[sinter.Fit]]:
+    """Extrapolates the footprint achieving the target error rate, for every group at once.
+
+    Each group's footprint fit is a least squares line of sqrt(qubit count)
+    against log(per-unit error rate), evaluated at log(target_p) and squared.
+    The sums defining the lines of all groups are accumulated together with
+    numpy, instead of fitting group by group.
+
+    The low and high values come from the lines whose squared error is at
+    most MAX_EXTRA_SQUARED_ERROR more than the best line's, like
+    `sinter.fit_line_y_at_x`. Forcing the line through (x0, y) costs an
+    extra (y - y_best)^2 / (1/n + (x0 - mean_x)^2 / Sxx), so the bounds are
+    solved for directly instead of by searching.
+
+    Returns:
+        The fit for each group, or None for groups that have less than two
+        usable points or whose error rate doesn't decrease with size.
+    """
+    indices = []
+    xs = []
+    ys = []
+    for k, group in enumerate(groups):
+        for _, log_p, sqrt_q in footprint_fit_points(group, failure_unit_func=failure_unit_func):
+            indices.append(k)
+            xs.append(log_p)
+            ys.append(sqrt_q)
+    indices = np.array(indices, dtype=np.int64)
+    xs = np.array(xs, dtype=np.float64)
+    ys = np.array(ys, dtype=np.float64)
+
+    n = np.bincount(indices, minlength=len(groups))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mean_x = np.bincount(indices, xs, minlength=len(groups)) / n
+        mean_y = np.bincount(indices, ys, minlength=len(groups)) / n
+        dxs = xs - mean_x[indices]
+        sxx = np.bincount(indices, dxs * dxs, minlength=len(groups))
+        sxy = np.bincount(indices, dxs * (ys - mean_y[indices]), minlength=len(groups))
+        slope = sxy / sxx
+        target_x = math.log(target_p)
+        best = mean_y + slope * (target_x - mean_x)
+        delta = np.sqrt(MAX_EXTRA_SQUARED_ERROR * (1 / n + (target_x - mean_x)**2 / sxx))
+
+    result: List[Optional[sinter.Fit]] = []
+    for k in range(len(groups)):
+        if n[k] < 2 or not sxx[k] > 0:
+            # Can't interpolate a slope from 1 data point.
+            result.append(None)
+        elif slope[k] >= 0:
+            # Slope is going the wrong way! Definitely over threshold.
+            result.append(None)
+        else:
+            result.append(sinter.Fit(
+                low=float(best[k] - delta[k])**2,
+                best=float(best[k])**2,
+                high=float(best[k] + delta[k])**2,
+            ))
+    return result
+
+
+def extrapolate_footprint_achieving_error_rate(
+        group: List[sinter.TaskStats],
+        *,
+        target_p: float,
+        failure_unit_func: FailureUnitFunc,
+) -> Optional[sinter.Fit]:
+    assert len({stat.json_metadata['p'] for stat in group}) == 1
+    return fit_footprints([group], target_p=target_p, failure_unit_func=failure_unit_func)[0]
+
+
+def footprint_fits_path(stats_path: Union[str, pathlib.Path]) -> pathlib.Path:
+    """Returns where the cached footprint fits of a stats csv are stored."""
+    stats_path = pathlib.Path(stats_path)
+    return stats_path.with_name(stats_path.name + '.footprint_fits.json')
+
+
+def _footprint_fits_cache_key(csv_contents: bytes) -> Dict[str, Any]:
+    """Everything that cached fits depend on: the stats, the fit parameters, and the fitting code."""
+    return {
+        'version': FOOTPRINT_FITS_CACHE_VERSION,
+        'csv_sha256': hashlib.sha256(csv_contents).hexdigest(),
+        'max_extra_squared_error': MAX_EXTRA_SQUARED_ERROR,
+        'max_fitted_shot_error_rate': MAX_FITTED_SHOT_ERROR_RATE,
+        'failure_units': {unit: target_p for unit, (target_p, _) in FAILURE_UNITS.items()},
+        # The failure unit functions and the fits themselves are code, defined in this file.
+        'code_sha256': hashlib.sha256(pathlib.Path(__file__).read_bytes()).hexdigest(),
+    }
+
+
+class FootprintFits:
+    """The footprint fits of every footprint group of a stats csv, for every failure unit.
+
+    Built once per stats csv and cached next to it, keyed by a hash of the
+    csv's contents and by the fit parameters and code, so that plots of the
+    same stats only read the fits.
+    """
+
+    def __init__(self, fits: Dict[FootprintGroupKey, Tuple[int, Dict[str, Optional[sinter.Fit]]]]):
+        # group key -> (number of stats in the group, unit name -> fit)
+        self.fits = fits
+
+    @staticmethod
+    def from_stats(stats: Sequence[sinter.TaskStats]) -> 'FootprintFits':
+        groups = list(sinter.group_by(stats, key=footprint_group_key).items())
+        fits = {key: (len(group), {}) for key, group in groups}
+        for unit, (target_p, failure_unit_func) in FAILURE_UNITS.items():
+            unit_fits = fit_footprints(
+                [group for _, group in groups],
+                target_p=target_p,
+                failure_unit_func=failure_unit_func,
+            )
+            for (key, _), fit in zip(groups, unit_fits):
+                fits[key][1][unit] = fit
+        return FootprintFits(fits)
+
+    @staticmethod
+    def from_stats_csv(stats_path: Union[str, pathlib.Path]) -> 'FootprintFits':
+        """Reads the cached fits of a stats csv, computing (and caching, when possible) them if they're missing or stale."""
+        stats_path = pathlib.Path(stats_path)
+        with open(stats_path, 'rb') as f:
+            cache_key = _footprint_fits_cache_key(f.read())
+
+        cache_path = footprint_fits_path(stats_path)
+        try:
+            with open(cache_path) as f:
+                cached = json.load(f)
+        except (OSError, ValueError):
+            cached = None
+        if isinstance(cached, dict) and cached.get('key') == cache_key:
+            return FootprintFits._from_json(cached['groups'])
+
+        result = FootprintFits.from_stats(sinter.stats_from_csv_files(stats_path))
+        # Readers in other processes never see a partially written file.
+        tmp = cache_path.with_name(f'.{cache_path.name}.{os.getpid()}.tmp')
+        try:
+            with open(tmp, 'w') as f:
+                json.dump({'key': cache_key, 'groups': result._to_json()}, f)
+            os.replace(tmp, cache_path)
+        except OSError:
+            # E.g. the stats are in a read-only directory. The fits are just recomputed next time.
+            with contextlib.suppress(OSError):
+                os.remove(tmp)
+        return result
+
+    def _to_json(self) -> List[Any]:
+        return [
+            {
+                'key': list(key),
+                'num_stats': num_stats,
+                'fits': {
+                    unit: None if fit is None else [fit.low, fit.best, fit.high]
+                    for unit, fit in unit_fits.items()
+                },
+            }
+            for key, (num_stats, unit_fits) in self.fits.items()
+        ]
+
+    @staticmethod
+    def _from_json(groups: List[Any]) -> 'FootprintFits':
+        fits = {}
+        for group in groups:
+            decoder, *items = group['key']
+            key = (decoder,) + tuple(tuple(item) for item in items)
+            fits[key] = (group['num_stats'], {
+                unit: None if fit is None else sinter.Fit(low=fit[0], best=fit[1], high=fit[2])
+                for unit, fit in group['fits'].items()
+            })
+        return FootprintFits(fits)
+
+    def fit_for(self, group: List[sinter.TaskStats], *, unit: str) -> Optional[sinter.Fit]:
+        """Returns the footprint fit of a group of stats.
+
+        Uses the cached fit when the group is a whole footprint group, and
+        fits the group directly otherwise (e.g. when some of its code sizes
+        were filtered out).
+        """
+        keys = {footprint_group_key(stat) for stat in group}
+        if len(keys) == 1:
+            cached = self.fits.get(next(iter(keys)))
+            if cached is not None and cached[0] == len(group):
+                return cached[1][unit]
+        target_p, failure_unit_func = FAILURE_UNITS[unit]
+        return extrapolate_footprint_achieving_error_rate(group, target_p=target_p, failure_unit_func=failure_unit_func)
@@ -0,0 +1,99 @@
+import math
+
+import pytest
+import sinter
+
+from midout import footprint
+from midout._stats_test_util import grid_stat
+from midout.footprint import FAILURE_UNITS, FootprintFits, fit_footprints, footprint_fit_points, \
+    footprint_fits_path
+
+
+def _group(p: float, style: str = 'A'):
+    return [
+        grid_stat(d, p=p, p_shot=min(0.5, 0.2 * math.exp(-math.sqrt(2 * d * d - 1) * 3e-4 / p)), style=style)
+        for d in [3, 5, 7, 9]
+    ]
+
+
+def test_fit_footprints_matches_sinter_fits():
+    target_p, unit_func = FAILURE_UNITS['teraquop']
+    groups = [_group(1e-3), _group(2e-3), _group(5e-4, style='B')]
+    fits = fit_footprints(groups, target_p=target_p, failure_unit_func=unit_func)
+
+    for group, fit in zip(groups, fits):
+        points = footprint_fit_points(group, failure_unit_func=unit_func)
+        expected = sinter.fit_line_y_at_x(
+            xs=[log_p for _, log_p, _ in points],
+            ys=[sqrt_q for _, _, sqrt_q in points],
+            target_x=math.log(target_p),
+            max_extra_squared_error=1,
+        )
+        assert math.sqrt(fit.best) == pytest.approx(expected.best)
+        assert math.sqrt(fit.low) == pytest.approx(expected.low, abs=1e-4)
+        assert math.sqrt(fit.high) == pytest.approx(expected.high, abs=1e-4)
+
+
+def test_fit_footprints_unfittable():
+    target_p, unit_func = FAILURE_UNITS['teraquop']
+    one_point = [grid_stat(3, p_shot=0.01), grid_stat(5, p_shot=0)]
+    over_threshold = [grid_stat(d, p_shot=0.01 * d, style='B') for d in [3, 5, 7]]
+    fits = fit_footprints([one_point, over_threshold, []], target_p=target_p, failure_unit_func=unit_func)
+    assert fits == [None, None, None]
+
+
+def test_footprint_fits_cache(tmp_path):
+    path = tmp_path / 'stats.csv'
+    stats = _group(1e-3) + _group(2e-3)
+    with open(path, 'w') as f:
+        print(sinter.CSV_HEADER, file=f)
+        for stat in stats:
+            print(stat, file=f)
+
+    fits = FootprintFits.from_stats_csv(path)
+    assert footprint_fits_path(path).exists()
+    cached = FootprintFits.from_stats_csv(path)
+    assert cached.fits == fits.fits
+
+    whole = _group(1e-3)
+    target_p, unit_func = FAILURE_UNITS['megaround']
+    expected, = fit_footprints([whole], target_p=target_p, failure_unit_func=unit_func)
+    assert cached.fit_for(whole, unit='megaround') == expected
+    # Partial groups aren't in the cache, and get fit directly.
+    expected, = fit_footprints([whole[1:]], target_p=target_p, failure_unit_func=unit_func)
+    assert cached.fit_for(whole[1:], unit='megaround') == expected
+
+    # Changing the stats invalidates the cache.
+    with open(path, 'a') as f:
+        print(grid_stat(11, p_shot=1e-4), file=f)
+    updated = FootprintFits.from_stats_csv(path)
+    assert updated.fits != fits.fits
+
+
+def test_footprint_fits_cache_write_failure_is_a_miss(tmp_path):
+    path = tmp_path / 'stats.csv'
+    with open(path, 'w') as f:
+        print(sinter.CSV_HEADER, file=f)
+        for stat in _group(1e-3):
+            print(stat, file=f)
+    # The cache can't be written over a directory.
+    footprint_fits_path(path).mkdir()
+
+    fits = FootprintFits.from_stats_csv(path)
+    assert fits.fits == FootprintFits.from_stats(_group(1e-3)).fits
+    assert sorted(p.name for p in tmp_path.iterdir()) == ['stats.csv', footprint_fits_path(path).name]
+
+
+def test_footprint_fits_cache_depends_on_fit_parameters(tmp_path, monkeypatch):
+    path = tmp_path / 'stats.csv'
+    with open(path, 'w') as f:
+        print(sinter.CSV_HEADER, file=f)
+        for stat in _group(1e-3):
+            print(stat, file=f)
+    fits = FootprintFits.from_stats_csv(path)
+
+    monkeypatch.setattr(footprint, 'MAX_EXTRA_SQUARED_ERROR', 4)
+    wider = FootprintFits.from_stats_csv(path)
+    assert wider.fits != fits.fits
+    monkeypatch.setattr(footprint, 'FAILURE_UNITS', {'terashot': footprint.FAILURE_UNITS['terashot']})
+    assert set(next(iter(FootprintFits.from_stats_csv(path).fits.values()))[1]) == {'terashot'}
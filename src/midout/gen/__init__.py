@@ -25,6 +25,7 @@ from midout.gen._util import (
 )
 from midout.gen._viz_circuit_html import (
     stim_circuit_html_viewer,
+    stim_circuit_html_viewer_pages,
 )
 from midout.gen._viz_patch_svg import (
     patch_svg_viewer,
@@ -33,8 +34,11 @@ from midout.gen._surface_code import (
     surface_code_patch,
     checkerboard_basis,
 )
-from midout.gen._flow_util import (
+from midout.gen._detector_completeness import (
+    measurements_lacking_detectors,
     verify_circuit_has_all_possible_detectors,
+)
+from midout.gen._flow_util import (
     standard_surface_code_chunk,
     compile_chunks_into_circuit,
     build_surface_code_round_circuit,
@@ -50,3 +54,7 @@ from midout.gen._flow import (
 from midout.gen._flow_verifier import (
     FlowStabilizerVerifier,
 )
+from midout.gen._verify_chunks import (
+    chunk_content_hash,
+    verify_chunks,
+)
@@ -1,6 +1,5 @@
 from typing import Iterable, Dict, Callable, Union
 
-import sinter
 import stim
 
 from midout.gen._util import stim_circuit_with_transformed_coords
@@ -66,6 +65,8 @@ class Chunk:
 
     def verify(self):
         """Checks that this chunk's circuit actually implements its flows."""
+        import sinter
+
         for key, group in sinter.group_by(self.flows, key=lambda flow: (flow.start, flow.obs_index)).items():
             if key[0] and len(group) > 1:
                 raise ValueError(f"Multiple flows with same non-empty end: {group}")
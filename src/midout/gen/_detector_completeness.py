@@ -0,0 +1,221 @@
+from typing import Dict, List, Any, Optional
+
+import numpy as np
+import stim
+
+# Basis change mapping the measured basis onto the Z axis (each is self-inverse).
+_MEASURE_BASIS_CHANGE = {
+    'M': None,
+    'MR': None,
+    'MX': 'H',
+    'MRX': 'H',
+    'MY': 'H_YZ',
+    'MRY': 'H_YZ',
+}
+
+
+class _DeterminismScan:
+    """Walks a circuit, recording which measurements are determined by earlier ones.
+
+    REPEAT blocks are only simulated until the stabilizer group (ignoring signs)
+    at the end of an iteration matches the one at the end of the previous
+    iteration. At that point every remaining iteration is guaranteed to behave
+    identically, so the recorded data for the last simulated iteration is
+    copied forward instead of being simulated.
+    """
+
+    def __init__(self, circuit: stim.Circuit):
+        self.sim = stim.TableauSimulator()
+        self.sim.set_num_qubits(circuit.num_qubits)
+        self.tick = 0
+        self.measure_ticks: List[int] = []
+        self.measure_labels: List[Any] = []
+        self.determined: List[bool] = []
+        self.closers: List[int] = []
+        self.obs_closers: Dict[int, int] = {}
+
+    def _record(self, label: Any, known: bool):
+        self.measure_ticks.append(self.tick)
+        self.measure_labels.append(label)
+        self.determined.append(known)
+
+    def _rec_to_abs(self, t: stim.GateTarget) -> int:
+        return len(self.determined) + t.value
+
+    def _do_measure(self, inst: stim.CircuitInstruction):
+        basis_change = _MEASURE_BASIS_CHANGE[inst.name]
+        resets = inst.name.startswith('MR')
+        qs = [t.value for t in inst.targets_copy()]
+        if basis_change is not None:
+            self.sim.do(stim.CircuitInstruction(basis_change, sorted(set(qs))))
+        for q in qs:
+            self._record(q, self.sim.peek_z(q) != 0)
+            self.sim.measure(q)
+            if resets:
+                self.sim.reset(q)
+        if basis_change is not None:
+            self.sim.do(stim.CircuitInstruction(basis_change, sorted(set(qs))))
+
+    def _do_mpp(self, inst: stim.CircuitInstruction):
+        targets = inst.targets_copy()
+        start = 0
+        while start < len(targets):
+            end = start + 1
+            while end < len(targets) and targets[end].is_combiner:
+                end += 2
+            product = stim.PauliString(self.sim.num_qubits)
+            for t in targets[start:end:2]:
+                term = stim.PauliString(self.sim.num_qubits)
+                if t.is_x_target:
+                    term[t.value] = 'X'
+                elif t.is_y_target:
+                    term[t.value] = 'Y'
+                elif t.is_z_target:
+                    term[t.value] = 'Z'
+                else:
+                    raise NotImplementedError(f'{inst=}')
+                product *= term
+            known = self.sim.peek_observable_expectation(product) != 0
+            self.sim.measure_observable(product)
+            self._record(stim.CircuitInstruction('MPP', targets[start:end]), known)
+            start = end
+
+    def _stabilizer_key(self) -> bytes:
+        """Returns the row-reduced stabilizer generators of the current state, ignoring signs.
+
+        (Computed by hand because `canonical_stabilizers` is wrong for large
+        qubit counts in some stim versions.)
+        """
+        x2x, _, z2x, _, _, _ = self.sim.current_inverse_tableau().to_numpy()
+        # The forward tableau's Z outputs are the transposed inverse X/Z-to-X blocks.
+        m = np.packbits(np.concatenate([z2x.T, x2x.T], axis=1), axis=1)
+        n = m.shape[0]
+        r = 0
+        for c in range(2 * n):
+            if r == n:
+                break
+            byte = c >> 3
+            mask = np.uint8(0x80 >> (c & 7))
+            hits = np.flatnonzero(m[r:, byte] & mask)
+            if not len(hits):
+                continue
+            p = r + hits[0]
+            if p != r:
+                m[[r, p]] = m[[p, r]]
+            others = np.flatnonzero(m[:, byte] & mask)
+            others = others[others != r]
+            if len(others):
+                m[others] ^= m[r]
+            r += 1
+        return m.tobytes()
+
+    def _run_repeat(self, body: stim.Circuit, repetitions: int):
+        prev_key: Optional[bytes] = None
+        for k in range(repetitions):
+            m0 = len(self.determined)
+            c0 = len(self.closers)
+            t0 = self.tick
+            self.run(body)
+            if k == repetitions - 1:
+                break
+            key = self._stabilizer_key()
+            if key == prev_key:
+                # Periodic. Copy this iteration's records forward for the remaining iterations.
+                remaining = repetitions - k - 1
+                dm = len(self.determined) - m0
+                dt = self.tick - t0
+                ticks = self.measure_ticks[m0:]
+                labels = self.measure_labels[m0:]
+                determined = self.determined[m0:]
+                closers = self.closers[c0:]
+                for j in range(1, remaining + 1):
+                    self.measure_ticks.extend(t + j * dt for t in ticks)
+                    self.measure_labels.extend(labels)
+                    self.determined.extend(determined)
+                    self.closers.extend(c + j * dm for c in closers)
+                for obs, c in list(self.obs_closers.items()):
+                    if c >= m0:
+                        self.obs_closers[obs] = c + remaining * dm
+                self.tick += remaining * dt
+                break
+            prev_key = key
+
+    def run(self, circuit: stim.Circuit):
+        for inst in circuit:
+            if isinstance(inst, stim.CircuitRepeatBlock):
+                self._run_repeat(inst.body_copy(), inst.repeat_count)
+            elif inst.name == 'TICK':
+                self.tick += 1
+            elif inst.name == 'DETECTOR':
+                targets = inst.targets_copy()
+                if targets:
+                    self.closers.append(max(self._rec_to_abs(t) for t in targets))
+            elif inst.name == 'OBSERVABLE_INCLUDE':
+                obs = int(inst.gate_args_copy()[0])
+                for t in inst.targets_copy():
+                    m = self._rec_to_abs(t)
+                    self.obs_closers[obs] = max(self.obs_closers.get(obs, m), m)
+            elif inst.name in _MEASURE_BASIS_CHANGE:
+                self._do_measure(inst)
+            elif inst.name == 'MPP':
+                self._do_mpp(inst)
+            elif inst.name in ['QUBIT_COORDS', 'SHIFT_COORDS']:
+                pass
+            else:
+                self.sim.do(inst)
+
+
+def _scan(circuit: stim.Circuit) -> _DeterminismScan:
+    scan = _DeterminismScan(circuit)
+    scan.run(circuit.without_noise())
+    return scan
+
+
+def measurements_lacking_detectors(circuit: stim.Circuit) -> Dict[int, List[Any]]:
+    """Finds determined measurements that aren't the last measurement of any declaration.
+
+    A measurement is "determined" when its result is a deterministic function of
+    earlier measurement results. In a circuit with every possible detector, each
+    determined measurement is normally the last measurement of exactly one
+    detector or observable.
+
+    Args:
+        circuit: The circuit to analyze. Noise is ignored.
+
+    Returns:
+        A dictionary mapping tick indices to the offending measurements in that
+        tick. Each measurement is described by the coordinates of its qubit (or
+        the qubit index, if it has no coordinates), or by the MPP instruction
+        for pauli product measurements.
+    """
+    return _lacking_detectors(_scan(circuit), circuit)
+
+
+def _lacking_detectors(scan: _DeterminismScan, circuit: stim.Circuit) -> Dict[int, List[Any]]:
+    closed = set(scan.closers) | set(scan.obs_closers.values())
+    coords = circuit.get_final_qubit_coordinates()
+    result: Dict[int, List[Any]] = {}
+    for m, known in enumerate(scan.determined):
+        if known and m not in closed:
+            label = scan.measure_labels[m]
+            if isinstance(label, int):
+                label = tuple(coords.get(label, (label,)))
+            result.setdefault(scan.measure_ticks[m], []).append(label)
+    return result
+
+
+def verify_circuit_has_all_possible_detectors(circuit: stim.Circuit):
+    """Checks that the number of predictable measurements is equal to dets+obs.
+
+    Raises:
+        ValueError: The counts differ. The message includes, per tick, the
+            determined measurements that don't end any detector or observable.
+    """
+    num_declarations = circuit.num_detectors + circuit.num_observables
+    scan = _scan(circuit)
+    num_determined_measurements = sum(scan.determined)
+    if num_declarations != num_determined_measurements:
+        lines = [f"{num_declarations=} != {num_determined_measurements=}"]
+        for tick, ms in sorted(_lacking_detectors(scan, circuit).items()):
+            lines.append(f"    tick {tick}: determined measurements without a detector: {ms!r}")
+        raise ValueError('\n'.join(lines))
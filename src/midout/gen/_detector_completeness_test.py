@@ -0,0 +1,73 @@
+import pytest
+import stim
+
+from midout import gen
+
+
+def test_verify_circuit_has_all_possible_detectors():
+    gen.verify_circuit_has_all_possible_detectors(stim.Circuit("""
+        R 0 1
+        M 0
+        DETECTOR rec[-1]
+        MPP X0*X1 Z0*Z1
+        DETECTOR rec[-1]
+        MPP X0*X1
+        DETECTOR rec[-1] rec[-3]
+    """))
+
+    with pytest.raises(ValueError, match='num_declarations=0 != num_determined_measurements=1'):
+        gen.verify_circuit_has_all_possible_detectors(stim.Circuit("""
+            QUBIT_COORDS(2, 3) 0
+            RX 0
+            TICK
+            MX 0
+        """))
+
+
+def test_measurements_lacking_detectors():
+    assert gen.measurements_lacking_detectors(stim.Circuit("""
+        QUBIT_COORDS(2, 3) 0
+        R 0 1
+        TICK
+        M 0
+        DETECTOR rec[-1]
+        TICK
+        MPP Z0*Z1
+        MX 1
+        TICK
+        MY 0
+    """)) == {
+        2: [stim.CircuitInstruction('MPP', [stim.target_z(0), stim.target_combiner(), stim.target_z(1)])],
+    }
+
+
+def test_measurements_lacking_detectors_loop():
+    circuit = stim.Circuit.generated(
+        'surface_code:rotated_memory_x',
+        distance=3,
+        rounds=100,
+        after_clifford_depolarization=1e-3,
+    )
+    assert gen.measurements_lacking_detectors(circuit) == {}
+    gen.verify_circuit_has_all_possible_detectors(circuit)
+
+    # Dropping a detector from the loop body leaves a hole in every iteration.
+    k = next(k for k, inst in enumerate(circuit) if isinstance(inst, stim.CircuitRepeatBlock))
+    loop = circuit[k]
+    body = loop.body_copy()
+    d = next(k for k, inst in enumerate(body) if inst.name == 'DETECTOR')
+    body = body[:d] + body[d + 1:]
+    head = circuit[:k]
+    tail = circuit[k + 1:]
+    flat = head + body * loop.repeat_count + tail
+    looped = head + stim.Circuit(f"""
+        REPEAT {loop.repeat_count} {{
+            {body}
+        }}
+    """) + tail
+
+    expected = gen.measurements_lacking_detectors(flat)
+    assert sum(len(v) for v in expected.values()) == loop.repeat_count
+    assert gen.measurements_lacking_detectors(looped) == expected
+    with pytest.raises(ValueError, match='determined measurements without a detector'):
+        gen.verify_circuit_has_all_possible_detectors(looped)
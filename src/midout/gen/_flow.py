@@ -1,17 +1,100 @@
-from typing import Iterable, Tuple, Any, Optional, Dict, Callable
+import threading
+from typing import Iterable, Tuple, Any, Optional, Dict, Callable, List
 
 import stim
 
-from midout import gen
 from midout.gen._tile import Tile
 from midout.gen._util import sorted_complex
 
 
+_QUBIT_TO_INDEX: Dict[complex, int] = {}
+_INDEX_TO_QUBIT: List[complex] = []
+_INTERN_LOCK = threading.Lock()
+
+
+def _interned_qubit_index(q: complex) -> int:
+    """Returns the process-wide bit position used to represent the given qubit.
+
+    The table only grows, so a PauliString's masks are as wide as the number
+    of distinct qubit coordinates interned before its highest qubit, not as
+    wide as its support. Circuits reuse the same coordinates (every distance
+    of a construction sits on the same grid, starting at the origin), so the
+    table tracks the union of the coordinates generated in the process rather
+    than the number of circuits: generating every construction at every
+    distance up to 15 interns under 500 qubits, fewer than the largest single
+    circuit has. Regenerating a circuit interns nothing new.
+    """
+    i = _QUBIT_TO_INDEX.get(q)
+    if i is None:
+        with _INTERN_LOCK:
+            i = _QUBIT_TO_INDEX.get(q)
+            if i is None:
+                i = len(_INDEX_TO_QUBIT)
+                _INDEX_TO_QUBIT.append(q)
+                _QUBIT_TO_INDEX[q] = i
+    return i
+
+
+def _iter_set_bits(mask: int) -> Iterable[int]:
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+
 class PauliString:
-    """A qubit-to-pauli mapping."""
+    """A qubit-to-pauli mapping.
+
+    The paulis are stored as a pair of x/z bitmasks over a process-wide table
+    of interned qubit positions. Hashing, equality, multiplication and
+    commutation checks are integer operations on those masks. The qubit
+    dictionary is only materialized when `qubits` is accessed.
+    """
     def __init__(self, qubits: Dict[complex, str]):
-        self.qubits = {q: qubits[q] for q in gen.sorted_complex(qubits.keys())}
-        self._hash = hash(tuple(self.qubits.items()))
+        xs = 0
+        zs = 0
+        for q, p in qubits.items():
+            if p == 'I':
+                continue
+            bit = 1 << _interned_qubit_index(q)
+            if p == 'X':
+                xs |= bit
+            elif p == 'Z':
+                zs |= bit
+            elif p == 'Y':
+                xs |= bit
+                zs |= bit
+            else:
+                raise ValueError(f'Not a pauli: {p!r}')
+        self._xs = xs
+        self._zs = zs
+        self._hash = hash((xs, zs))
+        self._qubits: Optional[Dict[complex, str]] = {
+            q: qubits[q]
+            for q in sorted_complex(qubits.keys())
+            if qubits[q] != 'I'
+        }
+
+    @staticmethod
+    def _from_masks(xs: int, zs: int) -> 'PauliString':
+        result = PauliString.__new__(PauliString)
+        result._xs = xs
+        result._zs = zs
+        result._hash = hash((xs, zs))
+        result._qubits = None
+        return result
+
+    @property
+    def qubits(self) -> Dict[complex, str]:
+        if self._qubits is None:
+            xs = self._xs
+            zs = self._zs
+            unsorted = {
+                _INDEX_TO_QUBIT[k]: '_XZY'[((xs >> k) & 1) + ((zs >> k) & 1) * 2]
+                for k in _iter_set_bits(xs | zs)
+            }
+            self._qubits = {q: unsorted[q] for q in sorted_complex(unsorted.keys())}
+        return self._qubits
 
     @staticmethod
     def from_stim_pauli_string(stim_pauli_string: stim.PauliString) -> 'PauliString':
@@ -22,44 +105,30 @@ class PauliString:
         })
 
     def __bool__(self):
-        return bool(self.qubits)
+        return bool(self._xs | self._zs)
 
     def __mul__(self, other: 'PauliString') -> 'PauliString':
-        result = {}
-        for q in self.qubits.keys() | other.qubits.keys():
-            a = self.qubits.get(q, 'I')
-            b = other.qubits.get(q, 'I')
-            ax = a in 'XY'
-            az = a in 'YZ'
-            bx = b in 'XY'
-            bz = b in 'YZ'
-            cx = ax ^ bx
-            cz = az ^ bz
-            c = 'IXZY'[cx + cz*2]
-            if c != 'I':
-                result[q] = c
-        return PauliString(result)
+        return PauliString._from_masks(self._xs ^ other._xs, self._zs ^ other._zs)
 
     def __repr__(self):
         return f'PauliString(qubits={self.qubits!r})'
 
     def __str__(self):
         return '*'.join(
-            f'{self.qubits[q]}{q}'
-            for q in sorted_complex(self.qubits.keys())
+            f'{p}{q}'
+            for q, p in self.qubits.items()
         )
 
+    def __reduce__(self):
+        # Interned bit positions are process-local, so pickle the qubit dictionary.
+        return PauliString, (self.qubits,)
 
     def with_xz_flipped(self) -> 'PauliString':
-        return PauliString({
-            q: "Z" if p == 'X' else 'X' if p == 'Z' else p for q, p in self.qubits.items()
-        })
+        return PauliString._from_masks(self._zs, self._xs)
 
     def anticommutes(self, other: 'PauliString') -> bool:
-        t = 0
-        for q in self.qubits.keys() & other.qubits.keys():
-            t += self.qubits[q] != other.qubits[q]
-        return t % 2 == 1
+        t = (self._xs & other._zs) ^ (self._zs & other._xs)
+        return bin(t).count('1') % 2 == 1
 
     def with_transformed_coords(self, transform: Callable[[complex], complex]) -> 'PauliString':
         return PauliString({
@@ -80,11 +149,36 @@ class PauliString:
     def __eq__(self, other):
         if not isinstance(other, PauliString):
             return NotImplemented
-        return self.qubits == other.qubits
+        return self._xs == other._xs and self._zs == other._zs
+
+
+def _xor_merge_sorted(a: Tuple[int, ...], b: Tuple[int, ...]) -> Tuple[int, ...]:
+    """Returns the sorted symmetric difference of two sorted tuples."""
+    result = []
+    i = 0
+    j = 0
+    while i < len(a) and j < len(b):
+        if a[i] < b[j]:
+            result.append(a[i])
+            i += 1
+        elif b[j] < a[i]:
+            result.append(b[j])
+            j += 1
+        else:
+            i += 1
+            j += 1
+    result.extend(a[i:])
+    result.extend(b[j:])
+    return tuple(result)
 
 
 class Flow:
     """A rule for how a stabilizer travels into, through, and/or out of a chunk.
+
+    The measurement indices are stored as a base offset plus an immutable
+    tuple that is shared between flows derived from each other, so shifting
+    a flow's measurements (e.g. when placing a chunk later in a circuit) does
+    not copy them.
     """
 
     def __init__(self,
@@ -97,21 +191,55 @@ class Flow:
                  postselect: bool = False,
                  allow_vacuous: bool = False,
                  ):
+        measurement_indices = tuple(measurement_indices)
         if not allow_vacuous:
             assert start or end or measurement_indices, "vacuous flow"
         self.start = PauliString({}) if start is None else start
         self.end = PauliString({}) if end is None else end
-        self.measurement_indices: Tuple[int, ...] = tuple(measurement_indices)
+        self._measure_base = 0
+        self._measure_offsets: Tuple[int, ...] = measurement_indices
+        self._measurement_indices: Optional[Tuple[int, ...]] = measurement_indices
         self.obs_index = obs_index
         self.center = center
         self.postselect = postselect
 
+    def _with(self,
+              *,
+              start: PauliString,
+              end: PauliString,
+              measure_base: int,
+              measure_offsets: Tuple[int, ...],
+              obs_index: Any,
+              center: complex,
+              postselect: bool) -> 'Flow':
+        result = Flow.__new__(Flow)
+        result.start = start
+        result.end = end
+        result._measure_base = measure_base
+        result._measure_offsets = measure_offsets
+        result._measurement_indices = measure_offsets if measure_base == 0 else None
+        result.obs_index = obs_index
+        result.center = center
+        result.postselect = postselect
+        return result
+
+    @property
+    def measurement_indices(self) -> Tuple[int, ...]:
+        if self._measurement_indices is None:
+            b = self._measure_base
+            self._measurement_indices = tuple(m + b for m in self._measure_offsets)
+        return self._measurement_indices
+
     def __eq__(self, other):
         if not isinstance(other, Flow):
             return NotImplemented
+        if self._measure_offsets is other._measure_offsets:
+            same_measurements = self._measure_base == other._measure_base
+        else:
+            same_measurements = self.measurement_indices == other.measurement_indices
         return (self.start == other.start and
                 self.end == other.end and
-                self.measurement_indices == other.measurement_indices and
+                same_measurements and
                 self.obs_index == other.obs_index and
                 self.center == other.center and
                 self.postselect == other.postselect)
@@ -119,31 +247,48 @@ class Flow:
     def __repr__(self):
         return f'Flow(start={self.start!r}, end={self.end!r}, measurement_indices={self.measurement_indices!r}, obs_index={self.obs_index!r}, postselect={self.postselect!r})'
 
+    def with_measurement_offset(self, offset: int) -> 'Flow':
+        """Returns the same flow, but with every measurement index shifted by the offset."""
+        if offset == 0:
+            return self
+        return self._with(
+            start=self.start,
+            end=self.end,
+            measure_base=self._measure_base + offset,
+            measure_offsets=self._measure_offsets,
+            obs_index=self.obs_index,
+            center=self.center,
+            postselect=self.postselect,
+        )
+
     def postselected(self) -> 'Flow':
-        return Flow(
+        return self._with(
             start=self.start,
             end=self.end,
-            measurement_indices=self.measurement_indices,
+            measure_base=self._measure_base,
+            measure_offsets=self._measure_offsets,
             obs_index=self.obs_index,
             center=self.center,
             postselect=True,
         )
 
     def with_xz_flipped(self) -> 'Flow':
-        return Flow(
+        return self._with(
             start=self.start.with_xz_flipped(),
             end=self.end.with_xz_flipped(),
-            measurement_indices=self.measurement_indices,
+            measure_base=self._measure_base,
+            measure_offsets=self._measure_offsets,
             obs_index=self.obs_index,
             center=self.center,
             postselect=self.postselect,
         )
 
     def with_transformed_coords(self, transform: Callable[[complex], complex]) -> 'Flow':
-        return Flow(
+        return self._with(
             start=self.start.with_transformed_coords(transform),
             end=self.end.with_transformed_coords(transform),
-            measurement_indices=self.measurement_indices,
+            measure_base=self._measure_base,
+            measure_offsets=self._measure_offsets,
             obs_index=self.obs_index,
             center=transform(self.center),
             postselect=self.postselect,
@@ -152,11 +297,23 @@ class Flow:
     def concat(self, other: 'Flow', other_measure_offset: int) -> 'Flow':
         if other.start != self.end or other.obs_index != self.obs_index:
             raise ValueError('other.start != self.end')
-        return Flow(
+        a = self.measurement_indices
+        b = other.with_measurement_offset(other_measure_offset).measurement_indices
+        if not a:
+            ms = b
+        elif not b:
+            ms = a
+        elif max(a) < min(b):
+            # Typical case: the other flow's measurements all come later. Nothing can cancel.
+            ms = a + b
+        else:
+            ms = _xor_merge_sorted(tuple(sorted(a)), tuple(sorted(b)))
+        return self._with(
             start=self.start,
             end=other.end,
             center=(self.center + other.center) / 2,
-            measurement_indices=self.measurement_indices + tuple(m + other_measure_offset for m in other.measurement_indices),
+            measure_base=0,
+            measure_offsets=ms,
             obs_index=self.obs_index,
             postselect=self.postselect or other.postselect,
         )
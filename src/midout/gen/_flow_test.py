@@ -1,3 +1,5 @@
+import pickle
+
 from midout import gen
 
 
@@ -10,3 +12,74 @@ def test_mul():
     c = gen.PauliString({q: p for q, p in enumerate(c) if p != 'I'})
     assert a * b == c
 
+
+
+def test_eq_hash():
+    a = gen.PauliString({1j: 'X', 2: 'Z', 3: 'Y'})
+    b = gen.PauliString({3: 'Y', 1j: 'X', 2: 'Z'})
+    c = gen.PauliString({1j: 'X', 2: 'Z'})
+    assert a == b
+    assert hash(a) == hash(b)
+    assert a != c
+    assert a * c == gen.PauliString({3: 'Y'})
+    assert (a * c).qubits == {3: 'Y'}
+    assert not (a * b)
+    assert {(a, None): 1}[(b, None)] == 1
+
+
+def test_anticommutes():
+    xx = gen.PauliString({0: 'X', 1: 'X'})
+    zz = gen.PauliString({0: 'Z', 1: 'Z'})
+    zi = gen.PauliString({0: 'Z'})
+    assert not xx.anticommutes(zz)
+    assert xx.anticommutes(zi)
+    assert zz.with_xz_flipped() == xx
+    assert gen.PauliString({0: 'Y'}).with_xz_flipped() == gen.PauliString({0: 'Y'})
+
+
+def test_pickle():
+    a = gen.PauliString({1j: 'X', 2 + 1j: 'Z', 3: 'Y'})
+    b = pickle.loads(pickle.dumps(a))
+    assert a == b
+    assert b.qubits == {3: 'Y', 1j: 'X', 2 + 1j: 'Z'}
+
+
+def test_flow_measurement_offset_and_concat():
+    a = gen.Flow(
+        center=0,
+        end=gen.PauliString({0: 'Z'}),
+        measurement_indices=[3, 1],
+    )
+    b = gen.Flow(
+        center=2,
+        start=gen.PauliString({0: 'Z'}),
+        measurement_indices=[0, 2],
+    )
+    assert a.with_measurement_offset(0) is a
+    assert a.with_measurement_offset(5).measurement_indices == (8, 6)
+    assert a.with_measurement_offset(5).with_measurement_offset(-5) == a
+
+    c = a.concat(b, 10)
+    assert c.measurement_indices == (3, 1, 10, 12)
+    assert c.start == gen.PauliString({})
+    assert not c.end
+    assert c.center == 1
+
+    # Overlapping measurements cancel.
+    assert a.concat(b, 3).measurement_indices == (1, 5)
+
+
+def test_interned_qubits_track_coordinates_not_circuits():
+    from midout.all_circuits import CONSTRUCTIONS
+    from midout.gen._flow import _INDEX_TO_QUBIT
+
+    def make(d: int):
+        return CONSTRUCTIONS['4-ISWAP-ALT'](distance=d, basis='X', rounds=3).circuit
+
+    make(5)
+    size = len(_INDEX_TO_QUBIT)
+    assert size > 0
+    for _ in range(3):
+        make(5)
+        make(3)
+    assert len(_INDEX_TO_QUBIT) == size
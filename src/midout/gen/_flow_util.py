@@ -1,5 +1,7 @@
+import functools
 from typing import Union, List, Tuple, Any, Optional, Dict, Literal, Iterable
 
+import numpy as np
 import stim
 
 from midout.gen._builder import MeasurementTracker, Builder, AtLayer
@@ -218,22 +220,49 @@ def standard_surface_code_chunk(
     )
 
 
+@functools.lru_cache(maxsize=256)
+def _qubit_relabel_array(
+        old_q2i_items: Tuple[Tuple[complex, int], ...],
+        new_q2i_items: Tuple[Tuple[complex, int], ...],
+) -> np.ndarray:
+    """Returns an array mapping old qubit indices to new qubit indices.
+
+    Old indices that don't correspond to any qubit are mapped to -1.
+    """
+    new_q2i = dict(new_q2i_items)
+    perm = np.full(shape=max((i for _, i in old_q2i_items), default=-1) + 1, fill_value=-1, dtype=np.int64)
+    for q, i in old_q2i_items:
+        perm[i] = new_q2i[q]
+    return perm
+
+
 def relabel_circuit_into(*, circuit: stim.Circuit, old_q2i: Dict[complex, int], new_q2i: Dict[complex, int], out: stim.Circuit):
-    i2i = {i: new_q2i[q] for q, i in old_q2i.items()}
+    perm = _qubit_relabel_array(tuple(old_q2i.items()), tuple(new_q2i.items()))
 
     for inst in circuit:
         if inst.name == 'QUBIT_COORDS':
             continue
+        old_targets = inst.targets_copy()
+        values = [t.value for t in old_targets]
+        if all(t.is_qubit_target and not t.is_inverted_result_target for t in old_targets):
+            # Fast path: a plain gate acting on qubits.
+            new_values = perm[values]
+            if np.any(new_values < 0):
+                raise KeyError(f'Qubit not in old_q2i: {inst=}')
+            out.append(inst.name, new_values, inst.gate_args_copy())
+            continue
+
         targets = []
-        for t in inst.targets_copy():
+        for t, v in zip(old_targets, values):
+            inv = t.is_inverted_result_target
             if t.is_qubit_target:
-                targets.append(i2i[t.value])
+                targets.append(stim.target_inv(int(perm[v])) if inv else int(perm[v]))
             elif t.is_x_target:
-                targets.append(stim.target_x(i2i[t.value]))
+                targets.append(stim.target_x(int(perm[v]), inv))
             elif t.is_y_target:
-                targets.append(stim.target_y(i2i[t.value]))
+                targets.append(stim.target_y(int(perm[v]), inv))
             elif t.is_z_target:
-                targets.append(stim.target_z(i2i[t.value]))
+                targets.append(stim.target_z(int(perm[v]), inv))
             elif t.is_combiner:
                 targets.append(t)
             elif t.is_measurement_record_target:
@@ -336,14 +365,7 @@ def _compile_chunk_into_circuit_atomic(
     dumped_flows: List[Flow] = []
     if include_detectors:
         for flow in chunk.flows:
-            flow = Flow(
-                center=flow.center,
-                start=flow.start,
-                end=flow.end,
-                obs_index=flow.obs_index,
-                measurement_indices=[m + state.measure_offset for m in flow.measurement_indices],
-                postselect=flow.postselect,
-            )
+            flow = flow.with_measurement_offset(state.measure_offset)
             if flow.start:
                 prev = prev_flows.pop((flow.start, flow.obs_index), None)
                 if prev is None:
@@ -479,52 +501,3 @@ def compile_chunks_into_circuit(
                 raise ValueError("Unterminated")
     return full_circuit
 
-
-def verify_circuit_has_all_possible_detectors(circuit: stim.Circuit):
-    """Checks that the number of predictable measurements is equal to dets+obs.
-    """
-
-    num_declarations = circuit.num_detectors + circuit.num_observables
-    num_determined_measurements = 0
-    num_detectors_seen = 0
-    sim = stim.TableauSimulator()
-
-    tick = 0
-    def run_block(block: stim.Circuit, reps: int):
-        nonlocal num_determined_measurements, tick, num_detectors_seen
-        for _ in range(reps):
-            for inst in block:
-                if isinstance(inst, stim.CircuitRepeatBlock):
-                    run_block(inst.body_copy(), inst.repeat_count)
-                elif inst.name == 'DETECTOR':
-                    num_detectors_seen += 1
-                elif inst.name == 'TICK':
-                    tick += 1
-                elif inst.name == 'M' or inst.name == 'MR':
-                    args = inst.gate_args_copy()
-                    for t in inst.targets_copy():
-                        assert t.is_qubit_target
-                        known = sim.peek_z(t.value) != 0
-                        num_determined_measurements += known
-                        sim.do(stim.CircuitInstruction(inst.name, [t.value], args))
-                elif inst.name == 'MX' or inst.name == 'MRX':
-                    args = inst.gate_args_copy()
-                    for t in inst.targets_copy():
-                        assert t.is_qubit_target
-                        known = sim.peek_x(t.value) != 0
-                        num_determined_measurements += known
-                        sim.do(stim.CircuitInstruction(inst.name, [t.value], args))
-                elif inst.name == 'MY' or inst.name == 'MRY':
-                    args = inst.gate_args_copy()
-                    for t in inst.targets_copy():
-                        assert t.is_qubit_target
-                        known = sim.peek_y(t.value) != 0
-                        num_determined_measurements += known
-                        sim.do(stim.CircuitInstruction(inst.name, [t.value], args))
-                elif inst.name == 'MPP':
-                    raise NotImplementedError(f'{inst=}')
-                else:
-                    sim.do(inst)
-    run_block(circuit, 1)
-    if num_declarations != num_determined_measurements:
-        raise ValueError(f"{num_declarations=} != {num_determined_measurements=}")
@@ -1,6 +1,7 @@
 import stim
 
 from midout import gen
+from midout.gen._flow_util import relabel_circuit_into
 
 
 def test_magic_init_for_chunk():
@@ -143,3 +144,27 @@ def test_compile_postselected_chunks():
         DETECTOR(0, 0, 1) rec[-2] rec[-1]
         TICK
     """)
+
+
+def test_relabel_circuit_into():
+    out = stim.Circuit()
+    relabel_circuit_into(
+        circuit=stim.Circuit("""
+            QUBIT_COORDS(0, 0) 0
+            H 0 1
+            M !1 0
+            MPP X0*!Z1 Y1
+            DETECTOR rec[-1]
+            CX rec[-1] 1
+        """),
+        old_q2i={0: 0, 1j: 1},
+        new_q2i={2: 0, 0: 3, 1j: 5},
+        out=out,
+    )
+    assert out == stim.Circuit("""
+        H 3 5
+        M !5 3
+        MPP X3*!Z5 Y5
+        DETECTOR rec[-1]
+        CX rec[-1] 5
+    """)
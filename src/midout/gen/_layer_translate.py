@@ -4,7 +4,6 @@ from typing import List, TypeVar, Dict, Type, Optional, cast, Set, Tuple, \
     Iterable
 
 import numpy as np
-import sinter
 import stim
 
 R_XYZ = 0
@@ -402,10 +401,12 @@ class RotationLayer(Layer):
         return RotationLayer(rotations={q: R_YZX if r == R_ZXY else R_ZXY if r == R_YZX else r for q, r in self.rotations.items()})
 
     def append_into_stim_circuit(self, out: stim.Circuit) -> None:
-        v = sinter.group_by(self.rotations.items(), key=lambda e: e[1])
-        for r, items in sorted(v.items(), key=lambda e: ORIENTATIONS[e[0]]):
+        v = collections.defaultdict(list)
+        for q, r in self.rotations.items():
+            v[r].append(q)
+        for r, qs in sorted(v.items(), key=lambda e: ORIENTATIONS[e[0]]):
             if r:
-                out.append(ORIENTATIONS[r], sorted(q for q, _ in items))
+                out.append(ORIENTATIONS[r], sorted(qs))
 
     def prepend_rotation(self, rotation_index: int, target: int):
         r1 = self.rotations.setdefault(target, R_XYZ)
@@ -0,0 +1,114 @@
+import concurrent.futures
+import hashlib
+import pathlib
+from typing import Iterable, List, Optional, Set, Union
+
+import stim
+
+from midout.gen._chunk import Chunk, ChunkLoop
+
+# Part of every content hash, so that passes recorded in a cache directory stop counting once
+# verification changes. Bump this whenever Chunk.verify or FlowStabilizerVerifier gets stricter.
+VERIFIER_VERSION = 1
+
+# Content hashes of chunks that passed verification in this process.
+_VERIFIED_HASHES: Set[str] = set()
+
+
+def chunk_content_hash(chunk: Chunk) -> str:
+    """Returns a hex digest identifying everything that affects a chunk's verification.
+
+    This includes the verifier itself, via VERIFIER_VERSION and the stim version.
+    """
+    parts = [
+        f'verifier={VERIFIER_VERSION} stim={stim.__version__}',
+        f'magic={chunk.magic!r}',
+        f'repetitions={chunk.repetitions!r}',
+        'q2i=' + repr(sorted(chunk.q2i.items(), key=lambda e: e[1])),
+        'circuit=' + str(chunk.circuit),
+    ]
+    for flow in chunk.flows:
+        parts.append(f'flow={flow!r} center={flow.center!r}')
+    for p in chunk.discarded_inputs:
+        parts.append(f'discarded_input={p!r}')
+    for p in chunk.discarded_outputs:
+        parts.append(f'discarded_output={p!r}')
+    return hashlib.sha256('\n'.join(parts).encode('utf8')).hexdigest()
+
+
+def _flattened(chunks: Iterable[Union[Chunk, ChunkLoop]]) -> List[Chunk]:
+    result = []
+    for c in chunks:
+        if isinstance(c, ChunkLoop):
+            result.extend(_flattened(c.chunks))
+        else:
+            result.append(c)
+    return result
+
+
+def _verify_one(chunk: Chunk) -> Optional[str]:
+    try:
+        chunk.verify()
+    except Exception as ex:
+        return f'{type(ex).__name__}: {ex}'
+    return None
+
+
+def verify_chunks(
+        chunks: Iterable[Union[Chunk, ChunkLoop]],
+        *,
+        workers: int = 1,
+        cache_dir: Union[None, str, pathlib.Path] = None) -> None:
+    """Verifies many chunks, optionally in parallel, skipping ones already known to pass.
+
+    Args:
+        chunks: The chunks to verify. Chunk loops are expanded into their chunks.
+        workers: Number of worker processes to verify with. When set to 1, the
+            chunks are verified in the current process.
+        cache_dir: Optional directory recording the content hashes of chunks
+            that passed verification, so they aren't verified again by later
+            runs (of the same VERIFIER_VERSION and stim version). Chunks that
+            passed earlier in the same process are always skipped.
+
+    Raises:
+        ValueError: One or more chunks failed verification. The message lists
+            every failing chunk with its position in the given sequence.
+    """
+    flat = _flattened(chunks)
+    if cache_dir is not None:
+        cache_dir = pathlib.Path(cache_dir)
+        cache_dir.mkdir(parents=True, exist_ok=True)
+
+    pending = {}
+    for k, chunk in enumerate(flat):
+        h = chunk_content_hash(chunk)
+        if h in _VERIFIED_HASHES:
+            if cache_dir is not None:
+                (cache_dir / h).touch()
+            continue
+        if cache_dir is not None and (cache_dir / h).exists():
+            _VERIFIED_HASHES.add(h)
+            continue
+        pending.setdefault(h, []).append(k)
+
+    hashes = list(pending.keys())
+    to_check = [flat[pending[h][0]] for h in hashes]
+    if workers > 1 and len(to_check) > 1:
+        with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as pool:
+            errors = list(pool.map(_verify_one, to_check))
+    else:
+        errors = [_verify_one(chunk) for chunk in to_check]
+
+    failures = []
+    for h, chunk, err in zip(hashes, to_check, errors):
+        if err is None:
+            _VERIFIED_HASHES.add(h)
+            if cache_dir is not None:
+                (cache_dir / h).touch()
+        else:
+            failures.append(
+                f'chunk #{pending[h][0]}'
+                f' (qubits={len(chunk.q2i)}, flows={len(chunk.flows)}, repetitions={chunk.repetitions},'
+                f' same content at {pending[h]}): {err}')
+    if failures:
+        raise ValueError(f'{len(failures)} of {len(flat)} chunks failed verification:\n' + '\n'.join(failures))
@@ -0,0 +1,52 @@
+import pytest
+import stim
+
+from midout import gen
+from midout.gen import _verify_chunks
+
+
+def _reset_chunk(basis: str) -> gen.Chunk:
+    return gen.Chunk(
+        circuit=stim.Circuit("""
+            R 0
+        """),
+        q2i={0: 0},
+        flows=[gen.Flow(
+            center=0,
+            end=gen.PauliString({0: basis}),
+        )],
+    )
+
+
+def test_chunk_content_hash():
+    assert gen.chunk_content_hash(_reset_chunk('Z')) == gen.chunk_content_hash(_reset_chunk('Z'))
+    assert gen.chunk_content_hash(_reset_chunk('Z')) != gen.chunk_content_hash(_reset_chunk('X'))
+    assert gen.chunk_content_hash(_reset_chunk('Z')) != gen.chunk_content_hash(_reset_chunk('Z') * 2)
+
+
+def test_chunk_content_hash_includes_verifier_version(monkeypatch):
+    h = gen.chunk_content_hash(_reset_chunk('Z'))
+    monkeypatch.setattr(_verify_chunks, 'VERIFIER_VERSION', _verify_chunks.VERIFIER_VERSION + 1)
+    assert gen.chunk_content_hash(_reset_chunk('Z')) != h
+
+
+def test_verify_chunks():
+    good = _reset_chunk('Z')
+    bad = _reset_chunk('X')
+    gen.verify_chunks([good, gen.ChunkLoop([good], repetitions=5)])
+    with pytest.raises(ValueError, match=r'1 of 3 chunks failed verification:\nchunk #1 .*same content at \[1, 2\]'):
+        gen.verify_chunks([good, bad, bad])
+    with pytest.raises(ValueError, match='chunk #0'):
+        gen.verify_chunks([bad, good, good], workers=2)
+
+
+def test_verify_chunks_cache_dir(tmp_path):
+    good = _reset_chunk('Z')
+    gen.verify_chunks([good], cache_dir=tmp_path)
+    assert (tmp_path / gen.chunk_content_hash(good)).exists()
+
+    # A fresh process only knows about the chunk through the cache directory.
+    _verify_chunks._VERIFIED_HASHES.clear()
+    gen.verify_chunks([good], cache_dir=tmp_path)
+    assert gen.chunk_content_hash(good) in _verify_chunks._VERIFIED_HASHES
+    assert len(list(tmp_path.iterdir())) == 1
@@ -1,10 +1,10 @@
-import base64
 import collections
 import dataclasses
+import io
 import math
 import random
 import sys
-from typing import Tuple, Dict, List, Set, Optional, Union, Iterable, Callable
+from typing import Tuple, Dict, List, Set, Optional, Union, Iterable, Callable, Iterator, FrozenSet, TextIO
 
 import stim
 
@@ -92,92 +92,40 @@ def tag_str(tag, *, content: Union[bool, str] = False, **kwargs) -> str:
 class _SvgLayer:
     def __init__(self):
         self.svg_instructions: List[str] = []
-        self.q2i_dict: Dict[int, Tuple[float, float]] = {}
-        self.used_indices: Set[int] = set()
-        self.used_positions: Set[Tuple[float, float]] = set()
+        self.mark_instructions: List[str] = []
+        self.used_position_ids: Set[int] = set()
         self.measurement_positions: Dict[int, Tuple[float, float]] = {}
 
     def add(self, tag, *, content: Union[bool, str] = False, **kwargs) -> None:
         self.svg_instructions.append("    " + tag_str(tag, content=content, **kwargs))
 
-    def bounds(self) -> Tuple[float, float, float, float]:
-        min_y = min(e for _, e in self.used_positions)
-        max_y = max(e for _, e in self.used_positions)
-        min_x = min(e for e, _ in self.used_positions)
-        max_x = max(e for e, _ in self.used_positions)
-        min_x -= PITCH
-        min_y -= PITCH
-        max_x += PITCH
-        max_y += PITCH
-        return min_x, min_y, max_x, max_y
-
-    def add_idles(self, all_used_positions: Set[Tuple[float, float]]):
-        for x, y in all_used_positions - self.used_positions:
-            self.add("circle", cx=x, cy=y, r=5, fill="gray", stroke="black")
-        self.used_positions |= all_used_positions
-        min_x, min_y, max_x, max_y = self.bounds()
-        xs = {e for e, _ in self.used_positions}
-        ys = {e for _, e in self.used_positions}
-        for x in xs:
-            x2 = x
-            x2 /= PITCH
-            if x2 == int(x2):
-                x2 = int(x2)
-            self.add("text",
-                     x=x,
-                     y=max_y - 5,
-                     fill="black",
-                     content=str(x2),
-                     text_anchor="middle",
-                     dominant_baseline="auto",
-                     font_size=24)
-        for y in ys:
-            y2 = y
-            y2 /= PITCH
-            if y2 == int(y2):
-                y2 = int(y2)
-            self.add("text",
-                     x=min_x + 5,
-                     y=y,
-                     fill="black",
-                     content=str(y2),
-                     text_anchor="left",
-                     alignment_baseline="middle",
-                     font_size=24)
-
-    def svg(self,
-            *,
-            html_id: Optional[str] = None,
-            as_img_with_data_uri: bool = False,
-            width: int,
-            height: int) -> str:
-        min_x, min_y, max_x, max_y = self.bounds()
-        kwargs = {} if html_id is None or as_img_with_data_uri else {'id': html_id}
-        svg = "\n".join([
-            tag_str("svg",
-                    xmlns="http://www.w3.org/2000/svg",
-                    viewBox=f"{min_x} {min_y} {max_x - min_x} {max_y - min_y}",
-                    content=True,
-                    **kwargs),
-            *self.svg_instructions,
-            "</svg>",
-        ])
-        if as_img_with_data_uri:
-            kwargs = {} if html_id is None else {'id': html_id}
-            svg = tag_str("img",
-                          width=width,
-                          height=height,
-                          **kwargs,
-                          src="data:image/svg+xml;base64," + base64.standard_b64encode(svg.encode('utf-8')).decode('utf-8'))
-            svg = svg.replace("/>", ">")
-        return svg
+    def add_mark(self, tag, *, content: Union[bool, str] = False, **kwargs) -> None:
+        """Adds an annotation specific to this layer (e.g. a detector label).
+
+        Unlike the gates, annotations differ between otherwise repeated layers,
+        so they are kept out of the shared layer body.
+        """
+        self.mark_instructions.append("    " + tag_str(tag, content=content, **kwargs))
+
+    def body_key(self) -> Tuple[str, FrozenSet[int]]:
+        return "\n".join(self.svg_instructions), frozenset(self.used_position_ids)
 
 
 class _SvgState:
-    def __init__(self):
+    def __init__(self, *, tick_window: Optional[Tuple[int, int]] = None):
         self.layers: List[_SvgLayer] = [_SvgLayer()]
+        self.tick_window = tick_window
+        self.first_tick = 0 if tick_window is None else tick_window[0]
+        self.tick_index = 0
+        self.q2i_dict: Dict[int, Tuple[float, float]] = {}
+        self.position_ids: Dict[Tuple[float, float], int] = {}
+        self.positions: List[Tuple[float, float]] = []
+        self.coords_version = 0
+        self.draw_cache: Dict[Tuple[int, stim.CircuitInstruction], Tuple[List[str], FrozenSet[int]]] = {}
+        self.recorded_ids: Optional[Set[int]] = None
         self.coord_shift: List[int] = [0, 0]
-        self.measurement_layer_indices: List[int] = []
+        self.num_measurements = 0
+        self.measurement_layer_indices: Dict[int, int] = {}
         self.detector_index = 0
         self.detector_coords = {}
         self.measurement_marks = collections.Counter()
@@ -186,18 +134,84 @@ class _SvgState:
         self.flipped_measurements: Set[int] = set()
         self.noted_errors: List[Tuple[int, int, str]] = []
         self.control_count = 0
+        self.window_end_measurement: Optional[int] = None
+        self.marks_into_window = 0
+
+    def in_window(self) -> bool:
+        return self.tick_window is None or self.tick_window[0] <= self.tick_index < self.tick_window[1]
+
+    def past_window(self) -> bool:
+        return self.tick_window is not None and self.tick_index >= self.tick_window[1]
+
+    def layer_index(self, tick: int) -> Optional[int]:
+        k = tick - self.first_tick
+        if 0 <= k < len(self.layers):
+            return k
+        return None
+
+    def counters(self) -> Tuple[float, ...]:
+        return (
+            self.tick_index,
+            self.num_measurements,
+            self.detector_index,
+            self.control_count,
+            self.coord_shift[0],
+            self.coord_shift[1],
+        )
+
+    def advance_counters(self, delta: Tuple[float, ...]) -> None:
+        self.tick_index += delta[0]
+        self.num_measurements += delta[1]
+        self.detector_index += delta[2]
+        self.control_count += delta[3]
+        self.coord_shift[0] += delta[4]
+        self.coord_shift[1] += delta[5]
 
     def tick(self) -> None:
-        self.layers.append(_SvgLayer())
-        self.layers[-1].q2i_dict = dict(self.layers[-2].q2i_dict)
+        self.tick_index += 1
+        if self.tick_index > self.first_tick and self.in_window():
+            self.layers.append(_SvgLayer())
+        if self.tick_window is not None and self.tick_index == self.tick_window[1]:
+            self.window_end_measurement = self.num_measurements
+
+    def position(self, i: int) -> Tuple[float, float]:
+        x, y = self.q2i_dict.setdefault(i, (i, 0))
+        return x * PITCH, y * PITCH
 
     def q2i(self, i: int) -> Tuple[float, float]:
-        x, y = self.layers[-1].q2i_dict.setdefault(i, (i, 0))
-        pt = x * PITCH, y * PITCH
-        self.layers[-1].used_indices.add(i)
-        self.layers[-1].used_positions.add(pt)
+        pt = self.position(i)
+        pid = self.position_ids.get(pt)
+        if pid is None:
+            pid = len(self.positions)
+            self.position_ids[pt] = pid
+            self.positions.append(pt)
+        self.layers[-1].used_position_ids.add(pid)
+        if self.recorded_ids is not None:
+            self.recorded_ids.add(pid)
         return pt
 
+    def draw_cached(self,
+                    instruction: stim.CircuitInstruction,
+                    draw: Callable[..., None]) -> None:
+        """Draws an instruction, reusing the drawing from when it last appeared.
+
+        Only valid for drawings that depend on nothing but the instruction and
+        the qubit coordinates (e.g. not on measurement indices).
+        """
+        layer = self.layers[-1]
+        key = (self.coords_version, instruction)
+        cached = self.draw_cache.get(key)
+        if cached is None:
+            start = len(layer.svg_instructions)
+            self.recorded_ids = set()
+            draw(instruction, out=self)
+            cached = layer.svg_instructions[start:], frozenset(self.recorded_ids)
+            self.recorded_ids = None
+            self.draw_cache[key] = cached
+        else:
+            layer.svg_instructions.extend(cached[0])
+            layer.used_position_ids |= cached[1]
+
     def add(self, tag, *, content="", **kwargs) -> None:
         self.layers[-1].add(tag, content=content, **kwargs)
 
@@ -214,8 +228,9 @@ class _SvgState:
 
     def add_measurement(self, target: stim.GateTarget) -> None:
         assert target.is_qubit_target or target.is_x_target or target.is_y_target or target.is_z_target
-        m_index = len(self.measurement_layer_indices)
-        self.measurement_layer_indices.append(len(self.layers) - 1)
+        m_index = self.num_measurements
+        self.num_measurements += 1
+        self.measurement_layer_indices[m_index] = len(self.layers) - 1
         self.layers[-1].measurement_positions[m_index] = self.q2i(target.value)
 
     def mark_measurements(self, targets: List[stim.GateTarget], prefix: str, index: Optional[int]) -> None:
@@ -235,27 +250,31 @@ class _SvgState:
             color = 'black'
         name = f"{prefix}{index}"
         for t in targets:
-            m_index = len(self.measurement_layer_indices) + t.value
+            m_index = self.num_measurements + t.value
             if m_index < 0:
                 print("Attempted to mark a measurement before the beginning of time.\n"
                       "Skipping this mark.", file=sys.stderr)
                 continue
-            assert m_index >= 0, m_index
             assert t.is_measurement_record_target
+            if self.window_end_measurement is not None and m_index < self.window_end_measurement:
+                self.marks_into_window += 1
+            if m_index not in self.measurement_layer_indices:
+                # The measurement happened before the rendered window.
+                continue
             layer = self.layers[self.measurement_layer_indices[m_index]]
             x, y = layer.measurement_positions[m_index]
             x += RAD + 1
             y -= RAD
             y += self.measurement_marks[m_index] * 15
             self.measurement_marks[m_index] += 1
-            layer.add("text",
-                      x=x,
-                      y=y,
-                      fill=color,
-                      content=name,
-                      text_anchor="left",
-                      alignment_baseline="hanging",
-                      font_size=16)
+            layer.add_mark("text",
+                           x=x,
+                           y=y,
+                           fill=color,
+                           content=name,
+                           text_anchor="left",
+                           alignment_baseline="hanging",
+                           font_size=16)
 
 
 def _draw_endpoint(x: float, y: float, style: str, *, out: _SvgState) -> None:
@@ -393,9 +412,6 @@ def _draw_mpp(instruction: stim.CircuitInstruction, *, out: _SvgState) -> None:
 
 def _draw_1q(instruction: stim.CircuitInstruction, *, out: _SvgState):
     targets = instruction.targets_copy()
-    if instruction.name in MEASUREMENT_NAMES:
-        for t in targets:
-            out.add_measurement(t)
     for t in targets:
         assert t.is_qubit_target
         x, y = out.q2i(t.value)
@@ -403,12 +419,76 @@ def _draw_1q(instruction: stim.CircuitInstruction, *, out: _SvgState):
         out.add_box(x, y, style.label, fill=style.fill_color, text_color=style.text_color)
 
 
+def _skip_instruction(instruction: stim.CircuitInstruction, state: _SvgState) -> None:
+    """Advances the counters an instruction outside the rendered window would have advanced.
+
+    Annotations after the window are still applied, because they can mark
+    measurements inside the window.
+    """
+    name = instruction.name
+    if name == "DETECTOR" and state.past_window():
+        state.mark_measurements(instruction.targets_copy(), prefix='D', index=None)
+    elif name == "OBSERVABLE_INCLUDE" and state.past_window():
+        state.mark_measurements(instruction.targets_copy(), prefix='L', index=int(instruction.gate_args_copy()[0]))
+    elif name in MEASUREMENT_NAMES:
+        state.num_measurements += len(instruction.targets_copy())
+    elif name == "MPP":
+        targets = instruction.targets_copy()
+        state.num_measurements += len(targets) - 2 * sum(t.is_combiner for t in targets)
+    elif name == "DETECTOR":
+        state.detector_index += 1
+    elif name in TWO_QUBIT_GATE_STYLES:
+        targets = instruction.targets_copy()
+        for t1, t2 in zip(targets[::2], targets[1::2]):
+            if t1.is_measurement_record_target or t2.is_measurement_record_target:
+                if t1.is_qubit_target or t2.is_qubit_target:
+                    state.control_count += 1
+
+
+def _iterations_before_window(body: stim.Circuit, repetitions: int, state: _SvgState) -> int:
+    """Counts the leading iterations of a loop that end before the rendered window starts."""
+    if state.tick_window is None:
+        return 0
+    start = state.tick_window[0]
+    if state.tick_index >= start:
+        return 0
+    body_ticks = _count_ticks(body)
+    if body_ticks == 0:
+        return repetitions
+    # Iteration k covers ticks [tick_index + k*body_ticks, tick_index + (k+1)*body_ticks].
+    n = -(-(start - state.tick_index) // body_ticks) - 1
+    return max(0, min(repetitions, n))
+
+
 def _stim_circuit_to_svg_helper(circuit: stim.Circuit, state: _SvgState) -> None:
     for instruction in circuit:
         if isinstance(instruction, stim.CircuitRepeatBlock):
             body = instruction.body_copy()
-            for _ in range(instruction.repeat_count):
+            repetitions = instruction.repeat_count
+            skipped = _iterations_before_window(body, repetitions, state)
+            if skipped >= 2:
+                # Measure one skipped iteration, jump over all but the last, then replay
+                # the last one so that coordinates set inside the loop are up to date.
+                before = state.counters()
+                _stim_circuit_to_svg_helper(body, state)
+                delta = tuple(b - a for a, b in zip(before, state.counters()))
+                state.advance_counters(tuple(e * (skipped - 2) for e in delta))
+                _stim_circuit_to_svg_helper(body, state)
+            elif skipped == 1:
                 _stim_circuit_to_svg_helper(body, state)
+            remaining = repetitions - skipped
+            while remaining > 0:
+                was_past_window = state.past_window()
+                before = state.counters()
+                marks_before = state.marks_into_window
+                _stim_circuit_to_svg_helper(body, state)
+                remaining -= 1
+                if was_past_window and state.marks_into_window == marks_before:
+                    # Later iterations only refer to later measurements, so they can't
+                    # mark anything inside the window either.
+                    delta = tuple(b - a for a, b in zip(before, state.counters()))
+                    state.advance_counters(tuple(e * remaining for e in delta))
+                    break
         elif isinstance(instruction, stim.CircuitInstruction):
             targets: List[stim.GateTarget] = instruction.targets_copy()
             if instruction.name == "QUBIT_COORDS":
@@ -417,19 +497,28 @@ def _stim_circuit_to_svg_helper(circuit: stim.Circuit, state: _SvgState) -> None
                     assert t.is_qubit_target
                     if len(pos) == 1:
                         pos = (pos[0], 0)
-                    state.layers[-1].q2i_dict[t.value] = (pos[0] + state.coord_shift[0], pos[1] + state.coord_shift[1])
+                    state.q2i_dict[t.value] = (pos[0] + state.coord_shift[0], pos[1] + state.coord_shift[1])
+                state.coords_version += 1
             elif instruction.name == "SHIFT_COORDS":
                 pos = instruction.gate_args_copy()
                 if len(pos) >= 1:
                     state.coord_shift[0] += pos[0]
                 if len(pos) >= 2:
                     state.coord_shift[1] += pos[1]
-            elif instruction.name in GATE_BOX_LABELS:
-                _draw_1q(instruction, out=state)
-            elif instruction.name in TWO_QUBIT_GATE_STYLES:
-                _draw_2q(instruction, out=state)
             elif instruction.name == "TICK":
                 state.tick()
+            elif not state.in_window():
+                _skip_instruction(instruction, state)
+            elif instruction.name in GATE_BOX_LABELS:
+                if instruction.name in MEASUREMENT_NAMES:
+                    for t in targets:
+                        state.add_measurement(t)
+                state.draw_cached(instruction, _draw_1q)
+            elif instruction.name in TWO_QUBIT_GATE_STYLES:
+                if any(t.is_measurement_record_target for t in targets):
+                    _draw_2q(instruction, out=state)
+                else:
+                    state.draw_cached(instruction, _draw_2q)
             elif instruction.name == "MPP":
                 _draw_mpp(instruction, out=state)
             elif instruction.name == 'DETECTOR':
@@ -468,26 +557,242 @@ def append_patch_polygons(*, out: List[str], patch: Patch, q2i: Dict[complex, in
         out.append(line)
 
 
+def _axis_labels(positions: Iterable[Tuple[float, float]],
+                 bounds: Tuple[float, float, float, float]) -> List[str]:
+    min_x, min_y, max_x, max_y = bounds
+    result = []
+    for x in sorted({e for e, _ in positions}):
+        x2 = x
+        x2 /= PITCH
+        if x2 == int(x2):
+            x2 = int(x2)
+        result.append("    " + tag_str("text",
+                                       x=x,
+                                       y=max_y - 5,
+                                       fill="black",
+                                       content=str(x2),
+                                       text_anchor="middle",
+                                       dominant_baseline="auto",
+                                       font_size=24))
+    for y in sorted({e for _, e in positions}):
+        y2 = y
+        y2 /= PITCH
+        if y2 == int(y2):
+            y2 = int(y2)
+        result.append("    " + tag_str("text",
+                                       x=min_x + 5,
+                                       y=y,
+                                       fill="black",
+                                       content=str(y2),
+                                       text_anchor="left",
+                                       alignment_baseline="middle",
+                                       font_size=24))
+    return result
+
+
+def _write_layer_svgs(state: _SvgState, out: TextIO) -> None:
+    """Writes the layers as inline svgs, sharing the drawing of repeated layers."""
+    all_ids = set()
+    for layer in state.layers:
+        all_ids |= layer.used_position_ids
+    positions = [state.positions[k] for k in sorted(all_ids)]
+    if positions:
+        bounds = (
+            min(x for x, _ in positions) - PITCH,
+            min(y for _, y in positions) - PITCH,
+            max(x for x, _ in positions) + PITCH,
+            max(y for _, y in positions) + PITCH,
+        )
+    else:
+        bounds = (-PITCH, -PITCH, PITCH, PITCH)
+    min_x, min_y, max_x, max_y = bounds
+
+    body_ids: Dict[Tuple[str, FrozenSet[int]], int] = {}
+    layer_body_ids = []
+    out.write('<svg xmlns="http://www.w3.org/2000/svg" style="position: absolute; width: 0; height: 0"><defs>\n')
+    out.write('<symbol id="layer_axes" overflow="visible">\n')
+    out.write('\n'.join(_axis_labels(positions, bounds)))
+    out.write('\n</symbol>\n')
+    for layer in state.layers:
+        key = layer.body_key()
+        body_id = body_ids.get(key)
+        if body_id is None:
+            body_id = len(body_ids)
+            body_ids[key] = body_id
+            out.write(f'<symbol id="layer_body{body_id}" overflow="visible">\n')
+            out.write(key[0])
+            out.write('\n')
+            for k in sorted(all_ids - layer.used_position_ids):
+                x, y = state.positions[k]
+                out.write("    " + tag_str("circle", cx=x, cy=y, r=5, fill="gray", stroke="black") + "\n")
+            out.write('</symbol>\n')
+        layer_body_ids.append(body_id)
+    out.write('</defs></svg>\n')
+
+    for k, (layer, body_id) in enumerate(zip(state.layers, layer_body_ids)):
+        out.write(tag_str("svg",
+                          id=f"layer{k}",
+                          xmlns="http://www.w3.org/2000/svg",
+                          viewBox=f"{min_x} {min_y} {max_x - min_x} {max_y - min_y}",
+                          style="max-width: 95%; max-height: 95%; display: none",
+                          content=True) + "\n")
+        out.write(f'    <use href="#layer_body{body_id}" />\n')
+        out.write('    <use href="#layer_axes" />\n')
+        for line in layer.mark_instructions:
+            out.write(line)
+            out.write('\n')
+        out.write('</svg>\n')
+
+
+def _count_ticks(circuit: stim.Circuit) -> int:
+    total = 0
+    for instruction in circuit:
+        if isinstance(instruction, stim.CircuitRepeatBlock):
+            total += _count_ticks(instruction.body_copy()) * instruction.repeat_count
+        elif instruction.name == 'TICK':
+            total += 1
+    return total
+
+
+def _repeat_window_to_tick_window(circuit: stim.Circuit, repeat_window: Tuple[int, int]) -> Tuple[int, int]:
+    """Converts iterations of the circuit's first top-level loop into a range of ticks."""
+    ticks_before = 0
+    for instruction in circuit:
+        if isinstance(instruction, stim.CircuitRepeatBlock):
+            body_ticks = _count_ticks(instruction.body_copy())
+            start, stop = repeat_window
+            start = max(0, min(start, instruction.repeat_count))
+            stop = max(start, min(stop, instruction.repeat_count))
+            return ticks_before + start * body_ticks, ticks_before + stop * body_ticks
+        if instruction.name == 'TICK':
+            ticks_before += 1
+    raise ValueError("repeat_window was specified but the circuit has no REPEAT block.")
+
+
+def _shortest_error(circuit: stim.Circuit,
+                    dem: Optional[stim.DetectorErrorModel]) -> Optional[List[stim.ExplainedError]]:
+    """Finds a shortest graphlike logical error, explained in terms of the circuit.
+
+    The search happens on the detector error model, and only the found error is
+    explained, which is much faster than `circuit.shortest_graphlike_error` for
+    large circuits.
+    """
+    # noinspection PyBroadException
+    try:
+        if dem is None:
+            try:
+                dem = circuit.detector_error_model(decompose_errors=True)
+            except ValueError:
+                dem = circuit.detector_error_model()
+        dem_error = dem.shortest_graphlike_error(ignore_ungraphlike_errors=True)
+        return circuit.explain_detector_error_model_errors(
+            dem_filter=dem_error,
+            reduce_to_one_representative_error=True,
+        )
+    except Exception:
+        return None
+
+
+def _crumble_url(circuit: stim.Circuit,
+                 *,
+                 patch: Dict[int, Patch],
+                 q2i: Dict[complex, int],
+                 tick_window: Optional[Tuple[int, int]]) -> str:
+    flattened = circuit.flattened()
+    circuit_coords = [str(inst) for inst in flattened if inst.name == "QUBIT_COORDS"]
+    if tick_window is not None:
+        # Only the window's operations are included. Annotations are dropped because
+        # they can refer to measurements from before the window.
+        patch = {0: patch[tick_window[0]]} if tick_window[0] in patch else {}
+    tick = 0
+    circuit_tick = 0
+    circuit_rest = []
+    for inst in flattened:
+        if tick_window is not None:
+            if inst.name == 'TICK':
+                circuit_tick += 1
+                if not tick_window[0] < circuit_tick < tick_window[1]:
+                    continue
+            elif not tick_window[0] <= circuit_tick < tick_window[1]:
+                continue
+            elif inst.name in ['DETECTOR', 'OBSERVABLE_INCLUDE']:
+                continue
+        if tick in patch:
+            append_patch_polygons(out=circuit_rest, patch=patch[tick], q2i=q2i)
+            circuit_rest.append('TICK')
+            tick += 1
+        if inst.name == 'TICK':
+            tick += 1
+        if inst.name != 'QUBIT_COORDS':
+            circuit_rest.append(str(inst))
+    max_patch_tick = max(patch.keys(), default=0)
+    while tick <= max_patch_tick:
+        if tick in patch:
+            circuit_rest.append('TICK')
+            append_patch_polygons(out=circuit_rest, patch=patch[tick], q2i=q2i)
+        tick += 1
+
+    escaped = ';'.join(circuit_coords + circuit_rest)
+    escaped = escaped.replace(', ', ',').replace(' ', '_')
+    escaped = escaped.replace('QUBIT_COORDS', 'Q')
+    escaped = escaped.replace('DETECTOR', 'DT')
+    escaped = escaped.replace('(', '%28').replace(')', '%29')
+    escaped = escaped.replace('[', '%5B').replace(']', '%5D')
+    return f"""http://localhost:8000/crumble.html#circuit={escaped}"""
+
+
 def stim_circuit_html_viewer(circuit: stim.Circuit,
                              *,
                              patch: Union[None, Patch, Dict[int, Patch]] = None,
                              width: int = 500,
                              height: int = 500,
-                             known_error: Optional[Iterable[stim.ExplainedError]] = None) -> str:
+                             known_error: Optional[Iterable[stim.ExplainedError]] = None,
+                             tick_window: Optional[Tuple[int, int]] = None,
+                             repeat_window: Optional[Tuple[int, int]] = None,
+                             dem: Optional[stim.DetectorErrorModel] = None,
+                             page_links: Tuple[Optional[str], Optional[str]] = (None, None),
+                             out: Optional[TextIO] = None) -> Optional[str]:
+    """Returns an html page stepping through the layers of a circuit.
+
+    Layers with identical gates (e.g. the rounds of a memory experiment) are
+    drawn once, as a shared svg symbol, and only their annotations (detector
+    labels, highlighted errors) are drawn per layer.
+
+    Args:
+        circuit: The circuit to show.
+        patch: A patch (or a dictionary from ticks to patches) to show as
+            polygons when the circuit is opened in crumble.
+        width: Width of the viewer, in pixels.
+        height: Height of the viewer, in pixels.
+        known_error: An error to highlight. Defaults to a shortest graphlike
+            logical error of the circuit.
+        tick_window: A half-open range of ticks to render. Layers outside the
+            window aren't drawn, and loop iterations entirely before it are
+            skipped over instead of being unrolled. Defaults to every tick.
+        repeat_window: A half-open range of iterations of the circuit's first
+            top-level REPEAT block to render, as an alternative to tick_window.
+        dem: A detector error model of the circuit (e.g. a cached one) to
+            search for the highlighted error, instead of deriving it again.
+        page_links: Hrefs of the previous and next pages, when the circuit is
+            split over several pages.
+        out: A file to write the html into as it's produced, instead of
+            returning it.
+
+    Returns:
+        The html, or None if it was written to `out`.
+    """
+    if repeat_window is not None:
+        if tick_window is not None:
+            raise ValueError("Specified both tick_window and repeat_window.")
+        tick_window = _repeat_window_to_tick_window(circuit, repeat_window)
+
     q2i = {v[0] + 1j * v[1]: k
            for k, v in circuit.get_final_qubit_coordinates().items()}
 
-    state = _SvgState()
+    state = _SvgState(tick_window=tick_window)
     state.detector_coords = circuit.get_detector_coordinates()
     if known_error is None:
-        # noinspection PyBroadException
-        try:
-            known_error = circuit.shortest_graphlike_error(
-                ignore_ungraphlike_errors=True,
-                canonicalize_circuit_errors=True,
-            )
-        except Exception:
-            pass
+        known_error = _shortest_error(circuit, dem)
     if known_error is not None:
         for product in known_error:
             loc = next(iter(product.circuit_error_locations))
@@ -509,95 +814,80 @@ def stim_circuit_html_viewer(circuit: stim.Circuit,
                     state.highlighted_detectors.add(target.val)
 
     _stim_circuit_to_svg_helper(circuit, state)
-    all_pos = {pt for layer in state.layers for pt in layer.used_positions}
     while state.layers and not state.layers[-1].svg_instructions:
         state.layers.pop()
-    for layer in state.layers:
-        layer.add_idles(all_pos)
 
     for m in state.flipped_measurements:
+        if m not in state.measurement_layer_indices:
+            continue
         layer = state.layers[state.measurement_layer_indices[m]]
         x, y = layer.measurement_positions[m]
-        layer.add("rect", x=x - RAD, y=y - RAD, width=DIAM, height=DIAM, fill="#FF000080", stroke="#FF0000")
+        layer.add_mark("rect", x=x - RAD, y=y - RAD, width=DIAM, height=DIAM, fill="#FF000080", stroke="#FF0000")
     for qubit, time, basis in state.highlighted_errors:
-        layer = state.layers[time]
-        x, y = state.q2i(qubit)
-        layer.add("text",
-                  x=x,
-                  y=y,
-                  fill="red",
-                  content=basis,
-                  text_anchor="middle",
-                  dominant_baseline="middle",
-                  font_size=64)
-    for qubit, time, basis in set(state.noted_errors):
-        layer = state.layers[time]
-        x, y = state.q2i(qubit)
-        layer.add("text",
-                  x=x - RAD,
-                  y=y,
-                  fill="red",
-                  content=basis,
-                  text_anchor="end",
-                  dominant_baseline="middle",
-                  font_size=12)
-
-    svg_image_tags = []
-    for k, layer in enumerate(state.layers):
-        svg = layer.svg(html_id=f"layer{k}", width=width, height=height)
-        data = base64.standard_b64encode(svg.encode('utf-8')).decode('utf-8')
-        svg_image_tags.append(
-            f'<img style="max-width: 95%; max-height: 95%; display: none" '
-            f'id=layer{k} '
-            f'src="data:image/svg+xml;base64,{data}" />'
-        )
-    all_svg_image_tags = '\n'.join(svg_image_tags)
+        k = state.layer_index(time)
+        if k is None:
+            continue
+        layer = state.layers[k]
+        x, y = state.position(qubit)
+        layer.add_mark("text",
+                       x=x,
+                       y=y,
+                       fill="red",
+                       content=basis,
+                       text_anchor="middle",
+                       dominant_baseline="middle",
+                       font_size=64)
+    noted_error_tags: Dict[Tuple[int, str], str] = {}
+    for qubit, time, basis in sorted(set(state.noted_errors)):
+        tag = noted_error_tags.get((qubit, basis))
+        if tag is None:
+            x, y = state.position(qubit)
+            tag = "    " + tag_str("text",
+                                   x=x - RAD,
+                                   y=y,
+                                   fill="red",
+                                   content=basis,
+                                   text_anchor="end",
+                                   dominant_baseline="middle",
+                                   font_size=12)
+            noted_error_tags[(qubit, basis)] = tag
+        state.layers[time].svg_instructions.append(tag)
 
-    flattened = circuit.flattened()
-    circuit_coords = [str(inst) for inst in flattened if inst.name == "QUBIT_COORDS"]
     if isinstance(patch, Patch):
         patch = {0: patch}
     if patch is None:
         patch = {}
-    tick = 0
-    circuit_rest = []
-    for inst in flattened:
-        if tick in patch:
-            append_patch_polygons(out=circuit_rest, patch=patch[tick], q2i=q2i)
-            circuit_rest.append('TICK')
-            tick += 1
-        if inst.name == 'TICK':
-            tick += 1
-        if inst.name != 'QUBIT_COORDS':
-            circuit_rest.append(str(inst))
-    max_patch_tick = max(patch.keys(), default=0)
-    while tick <= max_patch_tick:
-        if tick in patch:
-            circuit_rest.append('TICK')
-            append_patch_polygons(out=circuit_rest, patch=patch[tick], q2i=q2i)
-        tick += 1
+    local_server_crumble_url = _crumble_url(circuit, patch=patch, q2i=q2i, tick_window=tick_window)
 
-    escaped = ';'.join(circuit_coords + circuit_rest)
-    escaped = escaped.replace(', ', ',').replace(' ', '_')
-    escaped = escaped.replace('QUBIT_COORDS', 'Q')
-    escaped = escaped.replace('DETECTOR', 'DT')
-    escaped = escaped.replace('(', '%28').replace(')', '%29')
-    escaped = escaped.replace('[', '%5B').replace(']', '%5D')
-    local_server_crumble_url = f"""http://localhost:8000/crumble.html#circuit={escaped}"""
-
-    return (
-            f"""<div id="step">Loading...</div>
+    if tick_window is None:
+        first_layer = 0
+        num_layers = len(state.layers)
+    else:
+        first_layer = tick_window[0]
+        num_layers = _count_ticks(circuit) + 1
+    page_nav = ''
+    prev_page, next_page = page_links
+    if prev_page is not None:
+        page_nav += f'\n    <a href="{prev_page}">Previous Page</a>'
+    if next_page is not None:
+        page_nav += f'\n    <a href="{next_page}">Next Page</a>'
+
+    result = io.StringIO() if out is None else out
+    result.write(f"""<div id="step">Loading...</div>
     <button id="btnPrev">Previous Layer (hotkey: a)</button>
     <button id="btnNext">Next Layer (hotkey: d)</button>
-    <a href="{local_server_crumble_url}">Open in Crumble</a>
+    <a href="{local_server_crumble_url}">Open in Crumble</a>{page_nav}
     <div id="viewer" style="border: 1px solid black; margin-bottom: 50px; width: {width}px; 
              resize: both; overflow: auto">
-        """
-            + all_svg_image_tags
-            + """
+""")
+    _write_layer_svgs(state, result)
+    result.write(f"""
 </div>
 <script>
-    let layer_index = 0;
+    let first_layer = {first_layer};
+    let num_layers = {num_layers};
+""")
+    result.write("""    let layer_index = 0;
     let layers = [];
     while (true) {
         let svg = document.getElementById('layer' + layers.length);
@@ -615,8 +905,8 @@ def stim_circuit_html_viewer(circuit: stim.Circuit,
             layer_index = layers.length - 1;
         }
 
-        let layerName = layer_index + 1;
-        document.getElementById('step').innerHTML = "Layer: " + layerName + "/" + layers.length;
+        let layerName = first_layer + layer_index + 1;
+        document.getElementById('step').innerHTML = "Layer: " + layerName + "/" + num_layers;
         for (let k = 0; k < layers.length; k++) {
             let svg = layers[k];
             if (layer_index === k) {
@@ -647,5 +937,61 @@ def stim_circuit_html_viewer(circuit: stim.Circuit,
     });
 
     handleLayerIndexChange();
-</script>"""
-    )
+</script>""")
+    if out is None:
+        return result.getvalue()
+    return None
+
+
+def stim_circuit_html_viewer_pages(
+        circuit: stim.Circuit,
+        *,
+        ticks_per_page: int,
+        patch: Union[None, Patch, Dict[int, Patch]] = None,
+        width: int = 500,
+        height: int = 500,
+        known_error: Optional[Iterable[stim.ExplainedError]] = None,
+        dem: Optional[stim.DetectorErrorModel] = None,
+        page_name: Callable[[int, int], str] = lambda start, stop: f'ticks={start}-{stop}.html',
+) -> Iterator[Tuple[str, str]]:
+    """Yields the circuit's layers as a sequence of linked html pages.
+
+    Each page is only rendered when the iterator reaches it, so callers can stop
+    early or write pages out one at a time. The highlighted error is found once,
+    when the first page is requested, and shared by every page.
+
+    Args:
+        circuit: The circuit to show.
+        ticks_per_page: How many layers each page shows.
+        patch: Passed to `stim_circuit_html_viewer`.
+        width: Passed to `stim_circuit_html_viewer`.
+        height: Passed to `stim_circuit_html_viewer`.
+        known_error: Passed to `stim_circuit_html_viewer`.
+        dem: Passed to `stim_circuit_html_viewer`.
+        page_name: Names the page showing a half-open range of ticks. Pages
+            link to each other using these names.
+
+    Yields:
+        (name, html) pairs, in tick order.
+    """
+    if ticks_per_page < 1:
+        raise ValueError(f'{ticks_per_page=} < 1')
+    if known_error is None:
+        known_error = _shortest_error(circuit, dem)
+    if known_error is None:
+        known_error = []
+    num_layers = _count_ticks(circuit) + 1
+    windows = [(start, min(start + ticks_per_page, num_layers))
+               for start in range(0, num_layers, ticks_per_page)]
+    for k, window in enumerate(windows):
+        prev_page = page_name(*windows[k - 1]) if k > 0 else None
+        next_page = page_name(*windows[k + 1]) if k + 1 < len(windows) else None
+        yield page_name(*window), stim_circuit_html_viewer(
+            circuit,
+            patch=patch,
+            width=width,
+            height=height,
+            known_error=known_error,
+            tick_window=window,
+            page_links=(prev_page, next_page),
+        )
@@ -0,0 +1,81 @@
+import io
+import re
+from typing import List
+
+import pytest
+import stim
+
+from midout import gen
+
+
+def _drawn_layers(html: str) -> List[List[str]]:
+    """Expands the layers of a viewer page, dropping idle marks and axis labels."""
+    symbols = {
+        name: body.splitlines()
+        for name, body in re.findall(r'<symbol id="([^"]*)"[^>]*>\n(.*?)</symbol>', html, re.DOTALL)
+    }
+    result = []
+    for body in re.findall(r"<svg id='layer\d+'[^>]*>\n(.*?)</svg>", html, re.DOTALL):
+        lines = []
+        for line in body.splitlines():
+            used = re.fullmatch(r'    <use href="#([^"]*)" />', line)
+            lines.extend(symbols[used.group(1)] if used else [line])
+        result.append(sorted(
+            line for line in lines
+            if "r='5'" not in line and "font-size='24'" not in line
+        ))
+    return result
+
+
+def _circuit() -> stim.Circuit:
+    return stim.Circuit.generated(
+        'surface_code:rotated_memory_x',
+        distance=3,
+        rounds=20,
+        after_clifford_depolarization=1e-3,
+    )
+
+
+def test_tick_window_matches_full_render():
+    circuit = _circuit()
+    err = circuit.shortest_graphlike_error(ignore_ungraphlike_errors=True, canonicalize_circuit_errors=True)
+    full = _drawn_layers(gen.stim_circuit_html_viewer(circuit, known_error=err))
+    for start, stop in [(0, 5), (3, 17), (40, 59), (120, 200)]:
+        window = _drawn_layers(gen.stim_circuit_html_viewer(circuit, known_error=err, tick_window=(start, stop)))
+        assert window == full[start:stop]
+
+
+def test_repeat_window():
+    circuit = _circuit()
+    body_ticks = 7
+    a = gen.stim_circuit_html_viewer(circuit, known_error=[], repeat_window=(2, 4))
+    b = gen.stim_circuit_html_viewer(circuit, known_error=[], tick_window=(7 + 2 * body_ticks, 7 + 4 * body_ticks))
+    assert _drawn_layers(a) == _drawn_layers(b)
+    assert len(_drawn_layers(a)) == 2 * body_ticks
+
+    with pytest.raises(ValueError, match='both'):
+        gen.stim_circuit_html_viewer(circuit, tick_window=(0, 1), repeat_window=(0, 1))
+    with pytest.raises(ValueError, match='no REPEAT'):
+        gen.stim_circuit_html_viewer(circuit.flattened(), repeat_window=(0, 1))
+
+
+def test_stim_circuit_html_viewer_pages():
+    circuit = _circuit()
+    pages = list(gen.stim_circuit_html_viewer_pages(circuit, ticks_per_page=50, known_error=[]))
+    full = _drawn_layers(gen.stim_circuit_html_viewer(circuit, known_error=[]))
+    assert [name for name, _ in pages] == ['ticks=0-50.html', 'ticks=50-100.html', 'ticks=100-141.html']
+    assert [layer for _, html in pages for layer in _drawn_layers(html)] == full
+    assert 'href="ticks=50-100.html">Next Page' in pages[0][1]
+    assert 'Previous Page' not in pages[0][1]
+    assert 'href="ticks=50-100.html">Previous Page' in pages[-1][1]
+
+
+def test_repeated_layers_are_shared():
+    circuit = _circuit()
+    html = gen.stim_circuit_html_viewer(circuit, known_error=[])
+    assert html.count('<use href="#layer_body') == 141
+    assert html.count('<symbol id="layer_body') < 30
+
+    out = io.StringIO()
+    assert gen.stim_circuit_html_viewer(circuit, known_error=[], out=out) is None
+    assert out.getvalue() == html
@@ -175,14 +175,13 @@ def make_cx_swap_surface_code_chunk(
     )
 
 
-def make_square_planar_cxswap_code(
+def make_square_planar_cxswap_chunks(
         *,
         distance: int,
         basis: Union[Literal['X', 'Z'], str],
         rounds: int,
-        use_iswaps: bool = False,
-) -> CircuitCase:
-    """Creates a full 4-CXSWAP memory experiment from init to measure."""
+) -> List[Union[gen.Chunk, gen.ChunkLoop]]:
+    """Creates the chunks of a 4-CXSWAP memory experiment, from init to measure."""
     assert rounds >= 2
     chunks = []
 
@@ -230,7 +229,18 @@ def make_square_planar_cxswap_code(
         round_parity=rounds % 2 == 0,
         is_first_round=True,
     ).inverted())
+    return chunks
 
+
+def make_square_planar_cxswap_code(
+        *,
+        distance: int,
+        basis: Union[Literal['X', 'Z'], str],
+        rounds: int,
+        use_iswaps: bool = False,
+) -> CircuitCase:
+    """Creates a full 4-CXSWAP memory experiment from init to measure."""
+    chunks = make_square_planar_cxswap_chunks(distance=distance, basis=basis, rounds=rounds)
     circuit = gen.compile_chunks_into_circuit(chunks).with_inlined_feedback()
     if use_iswaps:
         circuit = gen.to_z_basis_interaction_circuit(circuit)
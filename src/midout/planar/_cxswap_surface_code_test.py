@@ -5,7 +5,7 @@ import stim
 
 from midout import gen
 from midout.planar._cxswap_surface_code import make_cx_swap_surface_code_patch, \
-    make_cx_swap_surface_code_chunk, make_square_planar_cxswap_code
+    make_cx_swap_surface_code_chunk, make_square_planar_cxswap_chunks, make_square_planar_cxswap_code
 
 
 def test_make_cx_swap_surface_code_patch():
@@ -80,6 +80,14 @@ def test_make_cx_swap_surface_code_chunk(distance: int, basis: str, round_parity
     gen.compile_chunks_into_circuit([r1.magic_init_chunk(), r1, r2, r2.magic_end_chunk()])
 
 
+@pytest.mark.parametrize('distance,basis,rounds', itertools.product([3, 4], 'XZ', [2, 5]))
+def test_make_square_planar_cxswap_chunks(distance: int, basis: str, rounds: int):
+    gen.verify_chunks(
+        make_square_planar_cxswap_chunks(distance=distance, basis=basis, rounds=rounds),
+        workers=2,
+    )
+
+
 def test_make_square_planar_cxswap_code():
     assert make_square_planar_cxswap_code(
         distance=3,
@@ -0,0 +1,202 @@
+import itertools
+import math
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+import sinter
+
+# (noise model, decoder, style, distance, noise strength, basis)
+CostKey = Tuple[str, str, str, int, float, str]
+
+# (noise model, decoder)
+CostGroup = Tuple[str, str]
+
+
+def cost_key(stat: sinter.TaskStats) -> CostKey:
+    m = stat.json_metadata
+    return m['noise'], stat.decoder, m['style'], m['d'], m['p'], m['b']
+
+
+class CostRow:
+    """The samples collected for one (noise model, decoder, style, distance, noise strength, basis) point."""
+
+    def __init__(self, key: CostKey, *, shots: int, errors: int, seconds: float):
+        self.key = key
+        self.shots = shots
+        self.errors = errors
+        self.seconds = seconds
+
+    @property
+    def seconds_per_shot(self) -> Optional[float]:
+        return self.seconds / self.shots if self.shots else None
+
+    @property
+    def seconds_per_error(self) -> Optional[float]:
+        return self.seconds / self.errors if self.errors else None
+
+
+def cost_breakdown(stats: Iterable[sinter.TaskStats]) -> List[CostRow]:
+    """Sums shots, errors, and core-seconds per cost key, sorted by key."""
+    totals: Dict[CostKey, List[float]] = {}
+    for stat in stats:
+        t = totals.setdefault(cost_key(stat), [0, 0, 0.0])
+        t[0] += stat.shots
+        t[1] += stat.errors
+        t[2] += stat.seconds
+    return [
+        CostRow(key, shots=shots, errors=errors, seconds=seconds)
+        for key, (shots, errors, seconds) in sorted(totals.items())
+    ]
+
+
+def _fit(features: np.ndarray, values: np.ndarray) -> Optional[np.ndarray]:
+    if len(values) < features.shape[1] or np.linalg.matrix_rank(features) < features.shape[1]:
+        return None
+    coefs, *_ = np.linalg.lstsq(features, values, rcond=None)
+    return coefs
+
+
+def _time_features(d: float, p: float) -> List[float]:
+    return [1, math.log(d), math.log(p)]
+
+
+def _error_features(d: float, p: float) -> List[float]:
+    return [1, d, math.log(p), d * math.log(p)]
+
+
+class CostModel:
+    """Predicts core-seconds per shot and shot error rates at (style, distance, noise strength) points.
+
+    Noise models and decoders differ in both cost and error rate, so the
+    stats of each (noise model, decoder) group are fit separately. Within a
+    group, both are fit per style, by least squares on the logs:
+
+        log(seconds per shot) ~ 1, log(d), log(p)
+        log(shot error rate) ~ 1, d, log(p), d log(p)
+
+    The second is the usual (p / p_threshold)^((d + 1) / 2) scaling with the
+    exponent's coefficients left free. Styles with too few points for a fit
+    use the fit over all styles of their group instead.
+    """
+
+    def __init__(self, rows: Sequence[CostRow]):
+        time_rows = [row for row in rows if row.shots and row.seconds > 0]
+        error_rows = [row for row in rows if row.shots and 0 < row.errors < row.shots]
+
+        self._time_coefs: Dict[Tuple[CostGroup, Optional[str]], np.ndarray] = {}
+        self._error_coefs: Dict[Tuple[CostGroup, Optional[str]], np.ndarray] = {}
+        for group in sorted({row.key[:2] for row in rows}):
+            group_time_rows = [row for row in time_rows if row.key[:2] == group]
+            group_error_rows = [row for row in error_rows if row.key[:2] == group]
+            for style in [None] + sorted({row.key[2] for row in rows if row.key[:2] == group}):
+                t = [row for row in group_time_rows if style is None or row.key[2] == style]
+                coefs = _fit(
+                    np.array([_time_features(row.key[3], row.key[4]) for row in t]).reshape(-1, 3),
+                    np.array([math.log(row.seconds_per_shot) for row in t]),
+                )
+                if coefs is not None:
+                    self._time_coefs[(group, style)] = coefs
+
+                e = [row for row in group_error_rows if style is None or row.key[2] == style]
+                coefs = _fit(
+                    np.array([_error_features(row.key[3], row.key[4]) for row in e]).reshape(-1, 4),
+                    np.array([math.log(row.errors / row.shots) for row in e]),
+                )
+                if coefs is not None:
+                    self._error_coefs[(group, style)] = coefs
+
+    def _coefs(
+            self,
+            table: Dict[Tuple[CostGroup, Optional[str]], np.ndarray],
+            group: CostGroup,
+            style: Optional[str],
+    ) -> np.ndarray:
+        if (group, style) in table:
+            return table[(group, style)]
+        if (group, None) in table:
+            return table[(group, None)]
+        raise ValueError(f"Not enough stats to fit a cost model for noise={group[0]!r} decoder={group[1]!r}.")
+
+    def seconds_per_shot(self, *, noise: str, decoder: str, style: str, d: int, p: float) -> float:
+        return math.exp(self._coefs(self._time_coefs, (noise, decoder), style) @ _time_features(d, p))
+
+    def pooled_seconds_per_shot(self, *, noise: str, decoder: str, d: int, p: float) -> float:
+        """The cost predicted by the fit over all styles with the given noise model and decoder."""
+        return math.exp(self._coefs(self._time_coefs, (noise, decoder), None) @ _time_features(d, p))
+
+    def shot_error_rate(self, *, noise: str, decoder: str, style: str, d: int, p: float) -> float:
+        return min(0.5, math.exp(self._coefs(self._error_coefs, (noise, decoder), style) @ _error_features(d, p)))
+
+
+def style_cost_ratios(rows: Sequence[CostRow], model: CostModel) -> Dict[Tuple[str, str, str], float]:
+    """The geometric mean, per (noise model, decoder, style), of measured seconds per shot over the all-styles prediction.
+
+    Each style is only compared against styles sampled with the same noise
+    model and decoder. Ratios far above 1 are more expensive to sample than
+    their size and noise strength would suggest.
+    """
+    logs: Dict[Tuple[str, str, str], List[float]] = {}
+    for row in rows:
+        if row.shots and row.seconds > 0:
+            noise, decoder, style, d, p, _ = row.key
+            predicted = model.pooled_seconds_per_shot(noise=noise, decoder=decoder, d=d, p=p)
+            logs.setdefault((noise, decoder, style), []).append(math.log(row.seconds_per_shot / predicted))
+    return {key: math.exp(sum(v) / len(v)) for key, v in sorted(logs.items())}
+
+
+class PlannedPoint:
+    """The projected cost of bringing one point of a planned sweep up to its target."""
+
+    def __init__(self, key: CostKey, *, shots: int, seconds: float):
+        self.key = key
+        self.shots = shots
+        self.seconds = seconds
+
+
+def project_sweep(
+        model: CostModel,
+        rows: Sequence[CostRow],
+        *,
+        noise_model_names: Iterable[str],
+        decoders: Iterable[str],
+        styles: Iterable[str],
+        distances: Iterable[int],
+        noise_strengths: Iterable[float],
+        bases: Iterable[str],
+        max_errors: int,
+        max_shots: int,
+) -> List[PlannedPoint]:
+    """Projects the remaining shots and core-seconds for each point of a planned sweep.
+
+    A point is sampled until it has max_errors errors or max_shots shots,
+    like `sinter collect`. Points that already have stats are projected from
+    their measured error rate and cost, and only the shots they are still
+    missing are counted. Other points use the model's predictions.
+    """
+    existing = {row.key: row for row in rows}
+    result = []
+    for noise, decoder, style, d, p, b in itertools.product(
+            noise_model_names,
+            decoders,
+            styles,
+            distances,
+            noise_strengths,
+            bases):
+        key = (noise, decoder, style, d, p, b)
+        row = existing.get(key)
+        done_shots = row.shots if row is not None else 0
+        if row is not None and (row.errors >= max_errors or row.shots >= max_shots):
+            result.append(PlannedPoint(key, shots=0, seconds=0))
+            continue
+        if row is not None and row.errors:
+            p_shot = row.errors / row.shots
+        else:
+            p_shot = model.shot_error_rate(noise=noise, decoder=decoder, style=style, d=d, p=p)
+        if row is not None and row.shots and row.seconds > 0:
+            seconds_per_shot = row.seconds_per_shot
+        else:
+            seconds_per_shot = model.seconds_per_shot(noise=noise, decoder=decoder, style=style, d=d, p=p)
+        needed = min(max_shots, math.ceil(max_errors / p_shot))
+        shots = max(0, needed - done_shots)
+        result.append(PlannedPoint(key, shots=shots, seconds=shots * seconds_per_shot))
+    return result
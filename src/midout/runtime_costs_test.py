@@ -0,0 +1,130 @@
+import math
+
+import pytest
+import sinter
+
+from midout._stats_test_util import grid_stat
+from midout.runtime_costs import CostModel, cost_breakdown, project_sweep, style_cost_ratios
+
+
+def _seconds_per_shot(d: int, p: float, style: str, noise: str = 'SI1000') -> float:
+    return (3 if style == 'B' else 1) * (5 if noise == 'UniformDepolarizing' else 1) * 1e-6 * d**3 * (p / 1e-3)
+
+
+def _shot_error_rate(d: int, p: float) -> float:
+    return 0.1 * (p / 1e-2)**((d + 1) / 2)
+
+
+def _stat(
+        d: int,
+        p: float,
+        *,
+        style: str = 'A',
+        b: str = 'X',
+        noise: str = 'SI1000',
+        decoder: str = 'pymatching',
+        shots: int = 1_000_000,
+) -> sinter.TaskStats:
+    return grid_stat(
+        d,
+        p=p,
+        b=b,
+        style=style,
+        noise=noise,
+        decoder=decoder,
+        shots=shots,
+        p_shot=_shot_error_rate(d, p),
+        seconds=shots * _seconds_per_shot(d, p, style, noise),
+    )
+
+
+def _stats():
+    return [
+        _stat(d, p, style=style)
+        for style in ['A', 'B']
+        for d in [3, 5, 7]
+        for p in [1e-3, 2e-3, 4e-3]
+    ]
+
+
+def test_cost_breakdown():
+    rows = cost_breakdown([
+        _stat(3, 1e-3),
+        _stat(3, 1e-3, shots=500_000),
+        _stat(5, 1e-3),
+        _stat(3, 1e-3, noise='UniformDepolarizing'),
+        _stat(3, 1e-3, decoder='internal'),
+    ])
+    assert [row.key for row in rows] == [
+        ('SI1000', 'internal', 'A', 3, 1e-3, 'X'),
+        ('SI1000', 'pymatching', 'A', 3, 1e-3, 'X'),
+        ('SI1000', 'pymatching', 'A', 5, 1e-3, 'X'),
+        ('UniformDepolarizing', 'pymatching', 'A', 3, 1e-3, 'X'),
+    ]
+    assert rows[1].shots == 1_500_000
+    assert rows[1].seconds_per_shot == pytest.approx(_seconds_per_shot(3, 1e-3, 'A'))
+    assert rows[1].seconds_per_error == rows[1].seconds / rows[1].errors
+
+
+def test_cost_model():
+    rows = cost_breakdown(_stats())
+    model = CostModel(rows)
+    group = dict(noise='SI1000', decoder='pymatching')
+    # The power laws extrapolate exactly.
+    assert model.seconds_per_shot(**group, style='B', d=11, p=3e-3) == pytest.approx(_seconds_per_shot(11, 3e-3, 'B'), rel=1e-6)
+    assert model.shot_error_rate(**group, style='A', d=9, p=3e-3) == pytest.approx(_shot_error_rate(9, 3e-3), rel=0.05)
+    # Unknown styles fall back to the fit over all styles.
+    assert _seconds_per_shot(9, 1e-3, 'A') < model.seconds_per_shot(**group, style='C', d=9, p=1e-3) < _seconds_per_shot(9, 1e-3, 'B')
+
+    ratios = style_cost_ratios(rows, model)
+    assert ratios[('SI1000', 'pymatching', 'B')] / ratios[('SI1000', 'pymatching', 'A')] == pytest.approx(3)
+
+    with pytest.raises(ValueError, match='Not enough'):
+        CostModel([]).seconds_per_shot(**group, style='A', d=3, p=1e-3)
+    with pytest.raises(ValueError, match='Not enough'):
+        model.seconds_per_shot(noise='UniformDepolarizing', decoder='pymatching', style='A', d=3, p=1e-3)
+
+
+def test_cost_model_separates_noise_models():
+    # Style A is only sampled under the expensive noise model, and styles B and C only under the cheap one.
+    stats = [
+        _stat(d, p, style=style, noise=noise)
+        for style, noise in [('A', 'UniformDepolarizing'), ('B', 'SI1000'), ('C', 'SI1000')]
+        for d in [3, 5, 7]
+        for p in [1e-3, 2e-3, 4e-3]
+    ]
+    rows = cost_breakdown(stats)
+    model = CostModel(rows)
+    assert model.seconds_per_shot(noise='UniformDepolarizing', decoder='pymatching', style='A', d=9, p=1e-3) == pytest.approx(
+        _seconds_per_shot(9, 1e-3, 'A', 'UniformDepolarizing'), rel=1e-6)
+    assert model.seconds_per_shot(noise='SI1000', decoder='pymatching', style='C', d=9, p=1e-3) == pytest.approx(
+        _seconds_per_shot(9, 1e-3, 'C'), rel=1e-6)
+
+    # A is alone in its group, so its ratio isn't skewed by the cheaper noise model.
+    ratios = style_cost_ratios(rows, model)
+    assert ratios[('UniformDepolarizing', 'pymatching', 'A')] == pytest.approx(1)
+    assert ratios[('SI1000', 'pymatching', 'B')] / ratios[('SI1000', 'pymatching', 'C')] == pytest.approx(3)
+
+
+def test_project_sweep():
+    rows = cost_breakdown(_stats())
+    model = CostModel(rows)
+    points = project_sweep(
+        model,
+        rows,
+        noise_model_names=['SI1000'],
+        decoders=['pymatching'],
+        styles=['A'],
+        distances=[3, 11],
+        noise_strengths=[1e-3],
+        bases=['X'],
+        max_errors=100,
+        max_shots=10**12,
+    )
+    done, planned = points
+    # d=3 already has a million shots, with more than 100 errors.
+    assert done.key == ('SI1000', 'pymatching', 'A', 3, 1e-3, 'X')
+    assert done.shots == 0 and done.seconds == 0
+    expected_shots = math.ceil(100 / _shot_error_rate(11, 1e-3))
+    assert planned.shots == pytest.approx(expected_shots, rel=0.5)
+    assert planned.seconds == pytest.approx(planned.shots * _seconds_per_shot(11, 1e-3, 'A'), rel=1e-6)
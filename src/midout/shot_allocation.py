@@ -0,0 +1,142 @@
+import math
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+import sinter
+
+from midout.footprint import FailureUnitFunc, MAX_FITTED_SHOT_ERROR_RATE, \
+    extrapolate_footprint_achieving_error_rate, footprint_fit_points, footprint_group_key
+
+
+def footprint_shot_gains(
+        group: List[sinter.TaskStats],
+        *,
+        target_p: float,
+        failure_unit_func: FailureUnitFunc,
+) -> Dict[str, float]:
+    """Estimates how much one more shot of each task would tighten the group's footprint fit.
+
+    The footprint fit is a line of log(per-unit error rate) against
+    sqrt(qubit count), extrapolated to the target error rate. Each usable
+    point's log error rate has a variance of roughly (1 - p) / (shots * p),
+    so a weighted least squares fit gives the variance of the extrapolated
+    sqrt(footprint). Adding shots to a point adds to its weight, and the
+    derivative of the variance with respect to that weight is the point's
+    marginal contribution.
+
+    Points that aren't part of the fit yet (e.g. ones without errors so far)
+    get the contribution they would have at the error rate the current line
+    predicts for them, capped by what their existing shots allow.
+
+    Returns:
+        A dictionary from strong id to the decrease in the variance of
+        log(footprint) per additional shot. Empty if the group's footprint
+        can't be extrapolated yet.
+    """
+    if extrapolate_footprint_achieving_error_rate(group, target_p=target_p, failure_unit_func=failure_unit_func) is None:
+        return {}
+    points = footprint_fit_points(group, failure_unit_func=failure_unit_func)
+    xs = np.array([log_p for _, log_p, _ in points])
+    zs = np.array([[1, sqrt_q] for _, _, sqrt_q in points])
+    # The inverse variance of a point's log error rate, i.e. its number of errors adjusted for saturation.
+    weights = np.array([stat.errors / (1 - stat.errors / stat.shots) for stat, _, _ in points])
+
+    covariance = np.linalg.inv(zs.T @ (zs * weights[:, None]))
+    intercept, slope = covariance @ (zs.T @ (weights * xs))
+    if slope >= 0:
+        return {}
+    sqrt_footprint = (math.log(target_p) - intercept) / slope
+    if sqrt_footprint <= 0:
+        return {}
+    # The gradient of sqrt_footprint with respect to (intercept, slope).
+    gradient = np.array([-1 / slope, -sqrt_footprint / slope])
+    # Var(log(footprint)) = (2 / sqrt_footprint)^2 Var(sqrt_footprint).
+    scale = (2 / sqrt_footprint)**2
+
+    result = {}
+    for stat in group:
+        z = np.array([1, math.sqrt(stat.json_metadata['q'])])
+        if stat.shots and 0 < stat.errors / stat.shots < MAX_FITTED_SHOT_ERROR_RATE:
+            p_shot = stat.errors / stat.shots
+        else:
+            p_unit = min(1.0, math.exp(intercept + slope * z[1]))
+            p_shot = 1 - (1 - p_unit)**failure_unit_func(stat)
+            if stat.shots:
+                p_shot = min(p_shot, sinter.fit_binomial(
+                    num_shots=stat.shots,
+                    num_hits=stat.errors,
+                    max_likelihood_factor=1000,
+                ).high)
+        if not 0 < p_shot < MAX_FITTED_SHOT_ERROR_RATE:
+            result[stat.strong_id] = 0
+            continue
+        leverage = gradient @ covariance @ z
+        result[stat.strong_id] = scale * leverage**2 * p_shot / (1 - p_shot)
+    return result
+
+
+def plan_shot_targets(
+        stats: Sequence[sinter.TaskStats],
+        *,
+        target_p: float,
+        failure_unit_func: FailureUnitFunc,
+        budget_seconds: float,
+        min_shots: int,
+        max_shots: Optional[int] = None,
+        max_errors: Optional[int] = None,
+) -> Dict[str, int]:
+    """Decides how many shots each task should have after the next round of collection.
+
+    Tasks with fewer than min_shots are brought up to min_shots, so every
+    footprint line has points to fit. The rest of the round's budget goes to
+    the tasks that shrink footprint fit uncertainty the most per core-second
+    (see footprint_shot_gains), measured by the time their existing shots
+    took. A chosen task's shots are at most doubled per round, so the
+    estimates get refreshed before much is spent on them.
+
+    Args:
+        stats: The stats collected so far, one per task. Tasks that haven't
+            been sampled yet should be included with zero shots.
+        target_p: The per-unit error rate the footprints are extrapolated to.
+        failure_unit_func: The number of failure units in a shot of a task.
+        budget_seconds: Core-seconds to spend on reducing fit uncertainty.
+        min_shots: Shots every task gets regardless of the fits.
+        max_shots: Optional limit on the shots of a task.
+        max_errors: Tasks with this many errors aren't sampled further.
+
+    Returns:
+        A dictionary from strong id to the task's new total number of shots,
+        containing only the tasks that should be sampled more.
+    """
+    targets: Dict[str, int] = {}
+    for stat in stats:
+        if stat.shots < min_shots and (max_errors is None or stat.errors < max_errors):
+            targets[stat.strong_id] = min_shots if max_shots is None else min(min_shots, max_shots)
+
+    gains: Dict[str, float] = {}
+    for group in sinter.group_by(stats, key=footprint_group_key).values():
+        gains.update(footprint_shot_gains(group, target_p=target_p, failure_unit_func=failure_unit_func))
+
+    candidates = []
+    for stat in stats:
+        if stat.strong_id in targets or not stat.shots:
+            continue
+        if max_errors is not None and stat.errors >= max_errors:
+            continue
+        if max_shots is not None and stat.shots >= max_shots:
+            continue
+        gain = gains.get(stat.strong_id, 0)
+        if gain > 0:
+            seconds_per_shot = max(stat.seconds, 1e-9) / stat.shots
+            candidates.append((gain / seconds_per_shot, seconds_per_shot, stat))
+    candidates.sort(key=lambda e: e[0], reverse=True)
+
+    spent = 0.0
+    for _, seconds_per_shot, stat in candidates:
+        target = 2 * stat.shots if max_shots is None else min(2 * stat.shots, max_shots)
+        extra = min(target - stat.shots, int((budget_seconds - spent) / seconds_per_shot))
+        # Tiny increments aren't worth the overhead of scheduling the task.
+        if extra > 0 and extra * 10 >= stat.shots:
+            targets[stat.strong_id] = stat.shots + extra
+            spent += extra * seconds_per_shot
+    return targets
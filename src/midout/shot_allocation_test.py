@@ -0,0 +1,85 @@
+import math
+
+import sinter
+
+from midout._stats_test_util import grid_stat
+from midout.footprint import FAILURE_UNITS
+from midout.shot_allocation import footprint_group_key, footprint_shot_gains, plan_shot_targets
+
+
+def _stat(d: int, *, shots: int, **kwargs) -> sinter.TaskStats:
+    return grid_stat(d, shots=shots, seconds=shots * 1e-5, **kwargs)
+
+
+def _below_threshold_group(shots: int, **kwargs):
+    return [
+        _stat(d, shots=shots, p_shot=0.2 * math.exp(-0.5 * math.sqrt(2 * d * d - 1)), **kwargs)
+        for d in [3, 5, 7, 9]
+    ]
+
+
+def test_footprint_group_key():
+    a, b, c, d = _below_threshold_group(1000)
+    assert footprint_group_key(a) == footprint_group_key(d)
+    assert footprint_group_key(a) != footprint_group_key(_stat(3, p=2e-3, shots=1000, p_shot=0.1))
+
+
+def test_footprint_shot_gains():
+    target_p, unit_func = FAILURE_UNITS['teraquop']
+    group = _below_threshold_group(100_000)
+    gains = footprint_shot_gains(group, target_p=target_p, failure_unit_func=unit_func)
+    assert set(gains) == {stat.strong_id for stat in group}
+    assert all(g > 0 for g in gains.values())
+
+    # The smallest distance is furthest from the extrapolation target, so it matters least.
+    assert min(gains, key=gains.get) == group[0].strong_id
+
+    # More shots make each additional one worth less.
+    more = footprint_shot_gains(_below_threshold_group(1_000_000), target_p=target_p, failure_unit_func=unit_func)
+    assert all(more[k] < gains[k] for k in gains)
+
+    # Can't extrapolate over threshold.
+    over = [
+        _stat(d, shots=100_000, p_shot=0.01 * d, style='B')
+        for d in [3, 5, 7]
+    ]
+    assert footprint_shot_gains(over, target_p=target_p, failure_unit_func=unit_func) == {}
+
+
+def test_plan_shot_targets():
+    target_p, unit_func = FAILURE_UNITS['teraquop']
+    group = _below_threshold_group(100_000)
+    fresh = _stat(11, shots=0, p_shot=0)
+    stats = group + [fresh]
+
+    targets = plan_shot_targets(
+        stats,
+        target_p=target_p,
+        failure_unit_func=unit_func,
+        budget_seconds=1.5,
+        min_shots=1000,
+    )
+    assert targets[fresh.strong_id] == 1000
+
+    # The budget pays for doubling the most useful task, and half of the next one.
+    gains = footprint_shot_gains(group, target_p=target_p, failure_unit_func=unit_func)
+    best, second, *_ = sorted(gains, key=gains.get, reverse=True)
+    assert targets.keys() == {fresh.strong_id, best, second}
+    assert targets[best] == 200_000
+    assert abs(targets[second] - 150_000) <= 1
+
+    # Limits are respected.
+    targets = plan_shot_targets(
+        stats,
+        target_p=target_p,
+        failure_unit_func=unit_func,
+        budget_seconds=1e9,
+        min_shots=1000,
+        max_shots=150_000,
+        max_errors=1000,
+    )
+    for stat in group:
+        if stat.errors >= 1000:
+            assert stat.strong_id not in targets
+        else:
+            assert targets[stat.strong_id] == 150_000
@@ -0,0 +1,274 @@
+import hashlib
+import itertools
+import json
+import os
+import pathlib
+from typing import Any, Dict, FrozenSet, Iterable, Iterator, Optional, Sequence, Set, Tuple, Union, TYPE_CHECKING
+
+import stim
+
+from midout.all_circuits import grid_point_metadata, make_grid_circuit
+
+if TYPE_CHECKING:
+    import sinter
+
+PathLike = Union[str, pathlib.Path]
+
+
+def dem_path_for_circuit(circuit_path: PathLike) -> pathlib.Path:
+    """Returns where the cached detector error model of a circuit file is stored."""
+    return pathlib.Path(circuit_path).with_suffix('.dem')
+
+
+def strong_ids_path_for_circuit(circuit_path: PathLike) -> pathlib.Path:
+    """Returns where the cached sinter strong ids of a circuit file are stored."""
+    return pathlib.Path(circuit_path).with_suffix('.strong_ids.json')
+
+
+def sinter_dem(circuit: stim.Circuit) -> stim.DetectorErrorModel:
+    """Returns the detector error model that `sinter collect` derives for a circuit.
+
+    The options match sinter's, so tasks built from this model have the same
+    strong ids as the ones sinter computes itself (e.g. in existing stats csvs).
+    """
+    return circuit.detector_error_model(
+        allow_gauge_detectors=False,
+        approximate_disjoint_errors=True,
+        block_decomposition_from_introducing_remnant_edges=False,
+        decompose_errors=True,
+        flatten_loops=True,
+        ignore_decomposition_failures=False,
+    )
+
+
+def _write_atomically(path: pathlib.Path, text: str) -> None:
+    # Readers in other processes never see a partially written file.
+    tmp = path.with_name(f'.{path.name}.{os.getpid()}.tmp')
+    with open(tmp, 'w') as f:
+        f.write(text)
+    os.replace(tmp, path)
+
+
+def _text_sha256(text: str) -> str:
+    return hashlib.sha256(text.encode()).hexdigest()
+
+
+# pymatching is what step2_collect_stats.sh collects with. internal_correlated is the decoder of
+# every row in assets/stats.csv, whose strong ids tools/sample_det_fracs looks up.
+DEFAULT_DEM_DECODERS = ('pymatching', 'internal_correlated')
+
+
+def write_circuit_dem(circuit_path: PathLike, *, decoders: Sequence[str] = DEFAULT_DEM_DECODERS) -> pathlib.Path:
+    """Writes the detector error model of a circuit file next to it.
+
+    Also writes the strong ids of the circuit's sinter tasks for the given
+    decoders, using the metadata `sinter collect --metadata_func auto` would,
+    along with a hash of the circuit's text. The cached model and strong ids
+    are only used while the circuit file still has that hash.
+
+    Args:
+        circuit_path: Path to a .stim file.
+        decoders: The decoders to precompute task strong ids for.
+
+    Returns:
+        The path of the written .dem file.
+    """
+    import sinter
+
+    circuit_path = pathlib.Path(circuit_path)
+    circuit_text = circuit_path.read_text()
+    circuit = stim.Circuit(circuit_text)
+    dem = sinter_dem(circuit)
+    json_metadata = sinter.comma_separated_key_values(str(circuit_path))
+    strong_ids = {
+        decoder: sinter.Task(
+            circuit=circuit,
+            decoder=decoder,
+            detector_error_model=dem,
+            json_metadata=json_metadata,
+        ).strong_id()
+        for decoder in decoders
+    }
+
+    dem_path = dem_path_for_circuit(circuit_path)
+    _write_atomically(dem_path, str(dem))
+    _write_atomically(strong_ids_path_for_circuit(circuit_path), json.dumps({
+        'circuit_sha256': _text_sha256(circuit_text),
+        'json_metadata': json_metadata,
+        'strong_ids': strong_ids,
+    }))
+    return dem_path
+
+
+def _cached_strong_ids(circuit_path: pathlib.Path, circuit_text: str) -> Optional[Dict[str, Any]]:
+    """Returns what `write_circuit_dem` cached for a circuit file, if it was written for the given text."""
+    path = strong_ids_path_for_circuit(circuit_path)
+    if not path.exists() or not dem_path_for_circuit(circuit_path).exists():
+        return None
+    with open(path) as f:
+        cached = json.load(f)
+    # Modification times aren't enough: copies and checkouts can give a changed circuit an older one.
+    if cached.get('circuit_sha256') != _text_sha256(circuit_text):
+        return None
+    return cached
+
+
+def load_sinter_task(
+        circuit_path: PathLike,
+        *,
+        decoder: str,
+        json_metadata: Any = None,
+        collection_options: Optional['sinter.CollectionOptions'] = None) -> 'sinter.Task':
+    """Makes a sinter task for a circuit file, reusing its cached detector error model.
+
+    The cached model is only used when it was written for the circuit file's
+    current text. Otherwise the model is derived from the circuit, the same
+    way sinter would.
+
+    Args:
+        circuit_path: Path to a .stim file.
+        decoder: The decoder the task should use.
+        json_metadata: The task's metadata. Defaults to the comma separated
+            key=value terms of the circuit's file name, like
+            `sinter collect --metadata_func auto`.
+        collection_options: Optional per-task collection limits, e.g. from
+            `midout.shot_allocation.plan_shot_targets`.
+    """
+    import sinter
+
+    circuit_path = pathlib.Path(circuit_path)
+    circuit_text = circuit_path.read_text()
+    circuit = stim.Circuit(circuit_text)
+    if json_metadata is None:
+        json_metadata = sinter.comma_separated_key_values(str(circuit_path))
+
+    if _cached_strong_ids(circuit_path, circuit_text) is not None:
+        dem = stim.DetectorErrorModel.from_file(dem_path_for_circuit(circuit_path))
+    else:
+        dem = sinter_dem(circuit)
+
+    return sinter.Task(
+        circuit=circuit,
+        decoder=decoder,
+        detector_error_model=dem,
+        json_metadata=json_metadata,
+        collection_options=collection_options if collection_options is not None else sinter.CollectionOptions(),
+    )
+
+
+def task_strong_id(circuit_path: PathLike, *, decoder: str) -> str:
+    """Returns the strong id of a circuit file's sinter task, without parsing its detector error model when cached.
+
+    The metadata is the one `sinter collect --metadata_func auto` would use.
+    """
+    import sinter
+
+    circuit_path = pathlib.Path(circuit_path)
+    cached = _cached_strong_ids(circuit_path, circuit_path.read_text())
+    if cached is not None:
+        if cached['json_metadata'] == sinter.comma_separated_key_values(str(circuit_path)):
+            strong_id = cached['strong_ids'].get(decoder)
+            if strong_id is not None:
+                return strong_id
+    return load_sinter_task(circuit_path, decoder=decoder).strong_id()
+
+
+def iter_sinter_tasks(
+        circuit_paths: Iterable[PathLike],
+        *,
+        decoders: Sequence[str]) -> Iterator['sinter.Task']:
+    """Lazily yields a task per circuit file and decoder, using cached detector error models."""
+    for path in circuit_paths:
+        for decoder in decoders:
+            yield load_sinter_task(path, decoder=decoder)
+
+
+GridTaskKey = Tuple[Any, ...]
+
+
+def grid_task_key(decoder: str, json_metadata: Dict[str, Any]) -> GridTaskKey:
+    """Identifies a grid task without needing its circuit.
+
+    The qubit count `q` is ignored, because it's only known after the
+    circuit has been generated.
+    """
+    return (decoder,) + tuple(sorted((k, v) for k, v in json_metadata.items() if k != 'q'))
+
+
+def finished_grid_task_keys(
+        stats: Iterable['sinter.TaskStats'],
+        *,
+        max_shots: Optional[int],
+        max_errors: Optional[int]) -> Set[GridTaskKey]:
+    """Returns the keys of tasks whose stats already reached the collection limits."""
+    shots: Dict[GridTaskKey, int] = {}
+    errors: Dict[GridTaskKey, int] = {}
+    for stat in stats:
+        key = grid_task_key(stat.decoder, stat.json_metadata)
+        shots[key] = shots.get(key, 0) + stat.shots
+        errors[key] = errors.get(key, 0) + stat.errors
+    return {
+        key
+        for key in shots
+        if (max_shots is not None and shots[key] >= max_shots)
+        or (max_errors is not None and errors[key] >= max_errors)
+    }
+
+
+def iter_grid_sinter_tasks(
+        *,
+        distances: Iterable[int],
+        noise_strengths: Iterable[float],
+        noise_model_names: Iterable[str],
+        styles: Iterable[str],
+        bases: Iterable[str],
+        decoders: Sequence[str],
+        skip: FrozenSet[GridTaskKey] = frozenset()) -> Iterator['sinter.Task']:
+    """Lazily yields sinter tasks over a benchmarking grid, without writing circuit files.
+
+    The tasks' metadata matches the metadata `gen_circuits` encodes into its
+    file names, so the collected stats are interchangeable with ones
+    collected from the files. A circuit is only generated when at least one of
+    its tasks isn't in `skip`.
+
+    Args:
+        distances: Code distances to iterate over.
+        noise_strengths: Noise strengths to iterate over.
+        noise_model_names: Keys of `midout.all_circuits.NOISE_MODELS`.
+        styles: Keys of `midout.all_circuits.CONSTRUCTIONS`.
+        bases: Observable bases ('X' or 'Z') to iterate over.
+        decoders: The decoders to make a task for, at each grid point.
+        skip: Keys (from `grid_task_key`) of tasks to leave out, e.g. from
+            `finished_grid_task_keys`.
+    """
+    import sinter
+
+    for d, p, noise_model_name, style, b in itertools.product(
+            distances,
+            noise_strengths,
+            noise_model_names,
+            styles,
+            bases):
+        point = dict(
+            distance=d,
+            noise_model_name=noise_model_name,
+            noise_strength=p,
+            style=style,
+            basis=b,
+        )
+        metadata = grid_point_metadata(**point)
+        remaining = [decoder for decoder in decoders if grid_task_key(decoder, metadata) not in skip]
+        if not remaining:
+            continue
+        json_metadata, circuit = make_grid_circuit(**point)
+        # Round trip through text, like the .stim files do. Noise probabilities whose printed
+        # form isn't exact would otherwise give the tasks different strong ids.
+        circuit = stim.Circuit(str(circuit))
+        dem = sinter_dem(circuit)
+        for decoder in remaining:
+            yield sinter.Task(
+                circuit=circuit,
+                decoder=decoder,
+                detector_error_model=dem,
+                json_metadata=json_metadata,
+            )
@@ -0,0 +1,157 @@
+import json
+import os
+
+import sinter
+import stim
+
+from midout.all_circuits import make_grid_circuit
+from midout.sinter_tasks import dem_path_for_circuit, finished_grid_task_keys, grid_task_key, \
+    iter_grid_sinter_tasks, iter_sinter_tasks, load_sinter_task, sinter_dem, strong_ids_path_for_circuit, \
+    task_strong_id, write_circuit_dem
+
+
+def _write_circuit(tmp_path, p: float = 1e-3):
+    path = tmp_path / f'd=3,p={p},b=X.stim'
+    stim.Circuit.generated(
+        'surface_code:rotated_memory_x',
+        distance=3,
+        rounds=3,
+        after_clifford_depolarization=p,
+    ).to_file(path)
+    return path
+
+
+def _expected_task(path, decoder: str) -> sinter.Task:
+    circuit = stim.Circuit.from_file(path)
+    return sinter.Task(
+        circuit=circuit,
+        decoder=decoder,
+        detector_error_model=sinter_dem(circuit),
+        json_metadata=sinter.comma_separated_key_values(str(path)),
+    )
+
+
+def test_load_sinter_task_without_cache(tmp_path):
+    path = _write_circuit(tmp_path)
+    task = load_sinter_task(path, decoder='pymatching')
+    assert task.json_metadata == {'d': 3, 'p': 0.001, 'b': 'X'}
+    assert task.strong_id() == _expected_task(path, 'pymatching').strong_id()
+
+
+def test_write_circuit_dem(tmp_path):
+    path = _write_circuit(tmp_path)
+    assert write_circuit_dem(path, decoders=['pymatching', 'internal']) == dem_path_for_circuit(path)
+    assert stim.DetectorErrorModel.from_file(dem_path_for_circuit(path)) == sinter_dem(stim.Circuit.from_file(path))
+    assert strong_ids_path_for_circuit(path).exists()
+
+    # The cached model is reused instead of being derived again.
+    other_path = tmp_path / 'other.stim'
+    _write_circuit(tmp_path, p=2e-3).rename(other_path)
+    other_dem = sinter_dem(stim.Circuit.from_file(other_path))
+    other_dem.to_file(dem_path_for_circuit(path))
+    tasks = list(iter_sinter_tasks([path], decoders=['pymatching', 'internal', 'other']))
+    assert [t.decoder for t in tasks] == ['pymatching', 'internal', 'other']
+    for t in tasks:
+        assert t.detector_error_model == other_dem
+
+    # With the real model, the tasks agree with sinter's.
+    write_circuit_dem(path, decoders=['pymatching', 'internal'])
+    for t in iter_sinter_tasks([path], decoders=['pymatching', 'internal', 'other']):
+        assert t.strong_id() == _expected_task(path, t.decoder).strong_id()
+
+    for decoder in ['pymatching', 'other']:
+        assert task_strong_id(path, decoder=decoder) == _expected_task(path, decoder).strong_id()
+
+    # Custom metadata gets its own strong id.
+    task = load_sinter_task(path, decoder='pymatching', json_metadata={'x': 1})
+    assert task.strong_id() != _expected_task(path, 'pymatching').strong_id()
+
+
+def test_write_circuit_dem_default_decoders(tmp_path):
+    path = _write_circuit(tmp_path)
+    write_circuit_dem(path)
+    with open(strong_ids_path_for_circuit(path)) as f:
+        cached = json.load(f)
+    assert sorted(cached['strong_ids']) == ['internal_correlated', 'pymatching']
+    assert cached['strong_ids']['internal_correlated'] == _expected_task(path, 'internal_correlated').strong_id()
+
+
+def test_stale_cache_is_ignored(tmp_path):
+    path = _write_circuit(tmp_path)
+    write_circuit_dem(path)
+
+    # Overwrite the circuit with a different one that keeps an older modification time, like `cp -p` can.
+    t = os.stat(dem_path_for_circuit(path)).st_mtime
+    _write_circuit(tmp_path, p=2e-3).rename(path)
+    os.utime(path, (t - 10, t - 10))
+
+    task = load_sinter_task(path, decoder='pymatching')
+    assert task.strong_id() == _expected_task(path, 'pymatching').strong_id()
+    assert task.detector_error_model == sinter_dem(stim.Circuit.from_file(path))
+    assert task_strong_id(path, decoder='pymatching') == _expected_task(path, 'pymatching').strong_id()
+
+
+def test_iter_grid_sinter_tasks():
+    tasks = list(iter_grid_sinter_tasks(
+        distances=[3],
+        noise_strengths=[1e-3],
+        noise_model_names=['UniformDepolarizing'],
+        styles=['4-CX', 'GLIDING-CX'],
+        bases=['X'],
+        decoders=['pymatching', 'internal'],
+    ))
+    assert [t.decoder for t in tasks] == ['pymatching', 'internal'] * 2
+    assert tasks[0].circuit is tasks[1].circuit
+
+    # The metadata round-trips through the file names written by gen_circuits.
+    for t in tasks:
+        name = ','.join(f'{k}={v}' for k, v in t.json_metadata.items()) + '.stim'
+        assert sinter.comma_separated_key_values(name) == t.json_metadata
+    assert tasks[0].json_metadata['q'] == tasks[0].circuit.num_qubits == 17
+
+    skip = {grid_task_key('pymatching', tasks[0].json_metadata)}
+    skip |= {grid_task_key(decoder, tasks[2].json_metadata) for decoder in ['pymatching', 'internal']}
+    remaining = list(iter_grid_sinter_tasks(
+        distances=[3],
+        noise_strengths=[1e-3],
+        noise_model_names=['UniformDepolarizing'],
+        styles=['4-CX', 'GLIDING-CX'],
+        bases=['X'],
+        decoders=['pymatching', 'internal'],
+        skip=frozenset(skip),
+    ))
+    assert [(t.decoder, t.json_metadata['style']) for t in remaining] == [('internal', '4-CX')]
+
+
+def test_iter_grid_sinter_tasks_match_circuit_files(tmp_path):
+    # 3e-4 under SI1000 gives noise probabilities whose printed form isn't exact.
+    point = dict(distance=3, noise_model_name='SI1000', noise_strength=3e-4, style='3-CZ', basis='X')
+    task, = iter_grid_sinter_tasks(
+        distances=[3],
+        noise_strengths=[3e-4],
+        noise_model_names=['SI1000'],
+        styles=['3-CZ'],
+        bases=['X'],
+        decoders=['internal_correlated'],
+    )
+
+    # Written the way gen_circuits writes it.
+    json_metadata, circuit = make_grid_circuit(**point)
+    path = tmp_path / (','.join(f'{k}={v}' for k, v in json_metadata.items()) + '.stim')
+    with open(path, 'w') as f:
+        print(circuit, file=f)
+    assert task.strong_id() == load_sinter_task(path, decoder='internal_correlated').strong_id()
+
+
+def test_finished_grid_task_keys():
+    metadata = {'r': 12, 'd': 3, 'p': 0.001, 'noise': 'SI1000', 'b': 'X', 'style': '4-CZ', 'q': 17}
+    stats = [
+        sinter.TaskStats(strong_id='a', decoder='pymatching', json_metadata=metadata, shots=600, errors=5, discards=0, seconds=1),
+        sinter.TaskStats(strong_id='a', decoder='pymatching', json_metadata=metadata, shots=500, errors=5, discards=0, seconds=1),
+        sinter.TaskStats(strong_id='b', decoder='internal', json_metadata=metadata, shots=100, errors=1, discards=0, seconds=1),
+    ]
+    key = grid_task_key('pymatching', {k: v for k, v in metadata.items() if k != 'q'})
+    assert finished_grid_task_keys(stats, max_shots=1000, max_errors=None) == {key}
+    assert finished_grid_task_keys(stats, max_shots=None, max_errors=10) == {key}
+    assert finished_grid_task_keys(stats, max_shots=None, max_errors=11) == set()
+    assert finished_grid_task_keys(stats, max_shots=None, max_errors=None) == set()
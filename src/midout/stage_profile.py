@@ -0,0 +1,123 @@
+import contextlib
+import contextvars
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+import stim
+
+# The profiler that `profile_stage` reports to in the current context (None means don't profile).
+# Being a context variable, each thread (and each asyncio task) sees its own value.
+_ACTIVE_PROFILER: contextvars.ContextVar[Optional['StageProfiler']] = contextvars.ContextVar(
+    '_ACTIVE_PROFILER', default=None
+)
+
+
+class Stage:
+    """Measurements of one stage, filled in while the stage runs."""
+
+    def __init__(self, name: str, tags: Dict[str, Any]):
+        self.record: Dict[str, Any] = {'stage': name, **tags}
+
+    def record_output(self, circuit: stim.Circuit) -> None:
+        """Records the size of the circuit the stage produced."""
+        self.record['instructions'] = len(circuit)
+        self.record['qubits'] = circuit.num_qubits
+        self.record['detectors'] = circuit.num_detectors
+
+
+class _NullStage(Stage):
+    def __init__(self):
+        super().__init__('', {})
+
+    def record_output(self, circuit: stim.Circuit) -> None:
+        pass
+
+
+_NULL_STAGE = _NullStage()
+
+
+class StageProfiler:
+    """Records the cost of the stages run while it's active (see `profile_stage`).
+
+    Each stage gets a record with its name, its tags, its wall time in
+    seconds, the memory it allocated according to tracemalloc (net and
+    peak bytes), and the sizes of its output circuit when the stage reports
+    one. With count_blocks=True, records also get the net number of
+    allocated blocks. Counting them takes a tracemalloc snapshot before and
+    after each stage, which costs time proportional to the number of live
+    blocks, so it's off by default.
+
+    Usage:
+        with StageProfiler(on_record=print) as profiler:
+            make_requested_surface_code(...)
+        profiler.records
+
+    Stages shouldn't be nested, because tracemalloc only tracks one peak.
+    """
+
+    def __init__(
+            self,
+            *,
+            on_record: Optional[Callable[[Dict[str, Any]], None]] = None,
+            count_blocks: bool = False,
+    ):
+        self.records: List[Dict[str, Any]] = []
+        self.on_record = on_record
+        self.count_blocks = count_blocks
+        self._started_tracemalloc = False
+        self._token: Optional[contextvars.Token] = None
+
+    def __enter__(self) -> 'StageProfiler':
+        if _ACTIVE_PROFILER.get() is not None:
+            raise ValueError("Another StageProfiler is already active.")
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracemalloc = True
+        self._token = _ACTIVE_PROFILER.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        _ACTIVE_PROFILER.reset(self._token)
+        self._token = None
+        if self._started_tracemalloc:
+            tracemalloc.stop()
+            self._started_tracemalloc = False
+
+    @contextlib.contextmanager
+    def stage(self, name: str, **tags: Any) -> Iterator[Stage]:
+        stage = Stage(name, tags)
+        blocks_before = _num_traced_blocks() if self.count_blocks else None
+        bytes_before, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        t0 = time.perf_counter()
+        yield stage
+        t1 = time.perf_counter()
+        bytes_after, bytes_peak = tracemalloc.get_traced_memory()
+        stage.record['seconds'] = t1 - t0
+        stage.record['allocated_bytes'] = bytes_after - bytes_before
+        stage.record['peak_allocated_bytes'] = bytes_peak - bytes_before
+        if blocks_before is not None:
+            stage.record['allocated_blocks'] = _num_traced_blocks() - blocks_before
+        self.records.append(stage.record)
+        if self.on_record is not None:
+            self.on_record(stage.record)
+
+
+def _num_traced_blocks() -> int:
+    return len(tracemalloc.take_snapshot().traces)
+
+
+@contextlib.contextmanager
+def profile_stage(name: str, **tags: Any) -> Iterator[Stage]:
+    """Measures the enclosed code as a stage of the active StageProfiler.
+
+    Does nothing (beyond yielding a Stage that ignores what it's given) when
+    no profiler is active, so it's cheap to leave in place.
+    """
+    profiler = _ACTIVE_PROFILER.get()
+    if profiler is None:
+        yield _NULL_STAGE
+        return
+    with profiler.stage(name, **tags) as stage:
+        yield stage
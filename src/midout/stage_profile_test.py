@@ -0,0 +1,85 @@
+import threading
+
+import pytest
+import stim
+
+from midout import gen
+from midout.all_circuits import make_grid_circuit, make_requested_surface_code
+from midout.stage_profile import StageProfiler, profile_stage
+
+
+def test_profile_stage_without_profiler():
+    with profile_stage('unused', style='x') as stage:
+        stage.record_output(stim.Circuit('H 0'))
+
+
+def test_stage_profiler():
+    seen = []
+    with StageProfiler(on_record=seen.append, count_blocks=True) as profiler:
+        with profile_stage('a', style='x', d=3) as stage:
+            data = [object() for _ in range(1000)]
+            stage.record_output(stim.Circuit('H 0 1\nM 0\nDETECTOR rec[-1]'))
+        with profile_stage('b'):
+            pass
+        with pytest.raises(ValueError, match='already active'):
+            with StageProfiler():
+                pass
+
+    assert seen == profiler.records
+    a, b = profiler.records
+    assert a['stage'] == 'a' and a['style'] == 'x' and a['d'] == 3
+    assert (a['instructions'], a['qubits'], a['detectors']) == (3, 2, 1)
+    assert a['seconds'] >= 0
+    assert a['allocated_blocks'] >= 1000
+    assert a['peak_allocated_bytes'] >= a['allocated_bytes'] > 0
+    assert b['stage'] == 'b' and 'instructions' not in b
+    del data
+
+
+def test_stage_profiler_is_per_thread():
+    other = StageProfiler()
+
+    def run_other_thread():
+        with profile_stage('other'):
+            pass
+        with other:
+            with profile_stage('inner'):
+                pass
+
+    with StageProfiler() as profiler:
+        thread = threading.Thread(target=run_other_thread)
+        thread.start()
+        thread.join()
+        with profile_stage('main'):
+            pass
+    assert [r['stage'] for r in profiler.records] == ['main']
+    assert [r['stage'] for r in other.records] == ['inner']
+    # Blocks are only counted when asked for.
+    assert 'allocated_blocks' not in profiler.records[0]
+
+
+def test_make_requested_surface_code_stages():
+    with StageProfiler() as profiler:
+        _, circuit = make_requested_surface_code(
+            basis='X',
+            distance=3,
+            noise=gen.NoiseModel.si1000(1e-3),
+            style='4-CZ',
+            rounds=6,
+            noise_tags=dict(noise='SI1000', p=1e-3),
+        )
+    assert [r['stage'] for r in profiler.records] == ['construction', 'noise']
+    for r in profiler.records:
+        assert (r['style'], r['d'], r['b'], r['r']) == ('4-CZ', 3, 'X', 6)
+    assert 'noise' not in profiler.records[0]
+    assert (profiler.records[1]['noise'], profiler.records[1]['p']) == ('SI1000', 1e-3)
+    assert profiler.records[1]['instructions'] == len(circuit)
+    assert profiler.records[1]['detectors'] == circuit.num_detectors
+
+
+def test_make_grid_circuit_noise_stages_are_tagged():
+    with StageProfiler() as profiler:
+        for p in [1e-3, 2e-3]:
+            make_grid_circuit(basis='X', distance=3, noise_model_name='SI1000', noise_strength=p, style='4-CZ')
+    noise_records = [r for r in profiler.records if r['stage'] == 'noise']
+    assert [(r['noise'], r['p']) for r in noise_records] == [('SI1000', 1e-3), ('SI1000', 2e-3)]
@@ -0,0 +1,455 @@
+import argparse
+import functools
+import sys
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import sinter
+from matplotlib import pyplot as plt
+
+from midout.all_circuits import xz_piece_error_rate
+from midout.footprint import FAILURE_UNITS, FootprintFits
+
+# Maps the --unit choices of plot_fan and plot_classic to the number of those units in a shot.
+PLOT_UNITS: Dict[str, Callable[[sinter.TaskStats], float]] = {
+    'round': lambda stat: stat.json_metadata['r'],
+    'quop': lambda stat: stat.json_metadata['r'] / stat.json_metadata['d'],
+    'shot': lambda _: 1,
+}
+
+
+class StatsByStyle:
+    """Stats indexed by their style and basis, so that per-style plots don't scan every stat."""
+
+    def __init__(self, stats: Iterable[sinter.TaskStats]):
+        self.stats = list(stats)
+        self._by_style_basis: Dict[Tuple[str, str], List[sinter.TaskStats]] = {}
+        for stat in self.stats:
+            key = (stat.json_metadata['style'], stat.json_metadata['b'])
+            self._by_style_basis.setdefault(key, []).append(stat)
+
+    def get(self, *, style: str, basis: str) -> List[sinter.TaskStats]:
+        return self._by_style_basis.get((style, basis), [])
+
+
+def _add_common_args(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument(
+        "stats",
+        type=str,
+    )
+    parser.add_argument(
+        "--show",
+        action='store_true',
+        default=False,
+    )
+    parser.add_argument(
+        "--out",
+        default=None,
+        type=str,
+    )
+
+
+def _add_style_plot_args(parser: argparse.ArgumentParser) -> None:
+    _add_common_args(parser)
+    parser.add_argument(
+        "--basis",
+        type=str,
+        required=True,
+    )
+    parser.add_argument(
+        "--style",
+        type=str,
+        required=True,
+    )
+    parser.add_argument(
+        "--unit",
+        choices=sorted(PLOT_UNITS.keys()),
+        required=True,
+    )
+
+
+def fan_arg_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser()
+    _add_style_plot_args(parser)
+    return parser
+
+
+def classic_arg_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser()
+    _add_style_plot_args(parser)
+    return parser
+
+
+def footprint_arg_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser()
+    _add_common_args(parser)
+    parser.add_argument(
+        "--unit",
+        choices=sorted(FAILURE_UNITS.keys()),
+        required=True,
+    )
+    parser.add_argument(
+        "--basis",
+        choices=['X', 'Z', 'XZ'],
+        nargs='+',
+        required=True,
+    )
+    parser.add_argument(
+        "--filter_func",
+        type=str,
+        default="True",
+    )
+    parser.add_argument(
+        "--label_func",
+        type=str,
+        default=None,
+    )
+    parser.add_argument(
+        "--order_func",
+        type=str,
+        default=None,
+    )
+    parser.add_argument(
+        "--title",
+        type=str,
+        default=None,
+    )
+    return parser
+
+
+def _finish_figure(fig: plt.Figure, args: argparse.Namespace) -> bool:
+    """Saves and/or shows the figure, returning whether it was written to a file."""
+    fig.set_size_inches(10, 10)
+    if args.out is not None:
+        fig.savefig(args.out, bbox_inches='tight', dpi=200)
+    if args.show:
+        plt.show()
+    plt.close(fig)
+    return args.out is not None
+
+
+def plot_fit(*,
+             ax: plt.Axes,
+             color: Any,
+             marker: str,
+             label: str,
+             stats: List[sinter.TaskStats],
+             failure_unit_func: Callable[[sinter.TaskStats], float]):
+    import scipy.stats
+
+    fit_xs = []
+    fit_ys = []
+    log_fit_ys = []
+
+    scatter_xs = []
+    scatter_best_ys = []
+    scatter_min_ys = []
+    scatter_max_ys = []
+    for stat in stats:
+        x = stat.json_metadata['q']**0.5
+        e = sinter.fit_binomial(num_shots=stat.shots, num_hits=stat.errors, max_likelihood_factor=1e3)
+        f_low = xz_piece_error_rate(e.low, pieces=failure_unit_func(stat), combo=stat.json_metadata['b'] == 'XZ')
+        f_best = xz_piece_error_rate(e.best, pieces=failure_unit_func(stat), combo=stat.json_metadata['b'] == 'XZ')
+        f_high = xz_piece_error_rate(e.high, pieces=failure_unit_func(stat), combo=stat.json_metadata['b'] == 'XZ')
+        for _ in range(min(stat.errors, 5)):
+            fit_xs.append(x)
+            fit_ys.append(f_best)
+            log_fit_ys.append(np.log(f_best))
+        scatter_min_ys.append(f_low)
+        scatter_max_ys.append(f_high)
+        scatter_best_ys.append(f_best)
+        scatter_xs.append(x)
+    ax.errorbar(
+        scatter_xs,
+        scatter_best_ys,
+        [scatter_best_ys - np.array(scatter_min_ys), np.array(scatter_max_ys) - scatter_best_ys],
+        marker=marker,
+        color=color,
+        linestyle='',
+        elinewidth=1,
+        capsize=3,
+        label=label,
+    )
+    if len(set(fit_xs)) >= 2 and all(e < 0.75 for e in scatter_max_ys):
+        fit = scipy.stats.linregress(fit_xs, log_fit_ys)
+        if fit.slope < 0:
+            x_low = min(fit_xs) * 0.9
+            y_end = np.exp(fit.intercept + fit.slope * 100)
+            ax.plot([x_low, 100],
+                    [np.exp(fit.intercept + fit.slope * x_low), y_end],
+                    linestyle='--',
+                    color=color)
+
+
+def render_fan(stats: StatsByStyle, args: argparse.Namespace) -> bool:
+    """Plots error rate vs sqrt qubit count for one style, a curve per noise strength."""
+    if args.out is None and not args.show:
+        raise ValueError("args.out is None and not args.show")
+    failure_unit_name = args.unit
+    failure_unit_func = PLOT_UNITS[args.unit]
+
+    markers = "ov*sp^<>+xXDd|" * 100
+    import matplotlib.colors
+    colors = list(matplotlib.colors.TABLEAU_COLORS) * 3
+
+    style_stats = stats.get(style=args.style, basis=args.basis)
+    if not style_stats:
+        print(f"WARNING: No stats left after filtering style={args.style} basis={args.basis}. Skipping plot.", file=sys.stderr)
+        return False
+    ax: plt.Axes
+    fig: plt.Figure
+    fig, ax = plt.subplots(1, 1)
+    groups = sinter.group_by(style_stats, key=lambda stat: stat.json_metadata['p'])
+    for k, p in enumerate(sorted(groups.keys(), reverse=True)):
+        plot_fit(
+            ax=ax,
+            color=colors[k],
+            marker=markers[k],
+            stats=groups[p],
+            failure_unit_func=failure_unit_func,
+            label=f'style={args.style} p={p}')
+
+    ax.set_title(f"{args.basis} Logical Error Rate per {failure_unit_name} vs Sqrt Qubit Count for style={args.style}")
+    ax.set_ylabel(f"{args.basis} Logical Error Rate per {failure_unit_name}")
+    ax.set_xlabel("Qubit Count (sqrt scale)")
+    ax.set_ylim(1e-12, 1e-0)
+    sqrt_x_ticks = range(0, 41, 5)
+    ax.set_xlim(0, sqrt_x_ticks[-1])
+    ax.set_xticks(sqrt_x_ticks, labels=[str(d**2) for d in sqrt_x_ticks])
+    ax.legend()
+    ax.semilogy()
+    ax.grid(which='minor')
+    ax.grid(which='major', color='black')
+    return _finish_figure(fig, args)
+
+
+def plot_error_rate(
+        *,
+        ax: 'plt.Axes',
+        stats: 'Iterable[sinter.TaskStats]',
+        x_func: Callable[['sinter.TaskStats'], Any],
+        failure_units_per_shot_func: Callable[['sinter.TaskStats'], Any] = lambda _: 1,
+        group_func: Callable[['sinter.TaskStats'], Any] = lambda _: None,
+        highlight_max_likelihood_factor: Optional[float] = 1e3,
+) -> None:
+    if not (highlight_max_likelihood_factor >= 1):
+        raise ValueError(f"not (highlight_max_likelihood_factor={highlight_max_likelihood_factor} >= 1)")
+
+    curve_groups = sinter.group_by(stats, key=group_func)
+    for k, curve_id in enumerate(sorted(curve_groups.keys(), key=sinter.better_sorted_str_terms)):
+        this_group_stats = sorted(curve_groups[curve_id], key=x_func)
+
+        xs = []
+        ys = []
+        xs_range = []
+        ys_low = []
+        ys_high = []
+        for stat in this_group_stats:
+            num_kept = stat.shots - stat.discards
+            if num_kept == 0:
+                continue
+            x = float(x_func(stat))
+            fit = sinter.fit_binomial(
+                num_shots=num_kept,
+                num_hits=stat.errors,
+                max_likelihood_factor=highlight_max_likelihood_factor,
+            )
+            combo = stat.json_metadata['b'] == 'XZ'
+            pieces = failure_units_per_shot_func(stat)
+            cc = functools.partial(xz_piece_error_rate, pieces=pieces, combo=combo)
+            if stat.errors:
+                xs.append(x)
+                ys.append(cc(fit.best))
+            if highlight_max_likelihood_factor > 1:
+                xs_range.append(x)
+                ys_low.append(cc(fit.low))
+                ys_high.append(cc(fit.high))
+
+        markers = "ov*sp^<>+xXDd|" * 100
+        kwargs = {'marker': markers[k]}
+        if 'label' not in kwargs and curve_id is not None:
+            kwargs['label'] = str(curve_id)
+        ax.plot(xs, ys, **kwargs)
+        if highlight_max_likelihood_factor > 1:
+            if 'zorder' not in kwargs:
+                kwargs['zorder'] = 0
+            if 'alpha' not in kwargs:
+                kwargs['alpha'] = 1
+            kwargs['zorder'] -= 100
+            kwargs['alpha'] *= 0.25
+            if 'marker' in kwargs:
+                del kwargs['marker']
+            if 'linestyle' in kwargs:
+                del kwargs['linestyle']
+            if 'label' in kwargs:
+                del kwargs['label']
+            ax.fill_between(xs_range, ys_low, ys_high, **kwargs)
+
+
+def render_classic(stats: StatsByStyle, args: argparse.Namespace) -> bool:
+    """Plots error rate vs noise strength for one style, a curve per code distance."""
+    if args.out is None and not args.show:
+        raise ValueError("args.out is None and not args.show")
+    failure_unit_name = args.unit
+    failure_unit_func = PLOT_UNITS[args.unit]
+
+    style_stats = stats.get(style=args.style, basis=args.basis)
+    if not style_stats:
+        print(f"WARNING: No stats left after filtering style={args.style} basis={args.basis}. Skipping plot.", file=sys.stderr)
+        return False
+    ax: plt.Axes
+    fig: plt.Figure
+    fig, ax = plt.subplots(1, 1)
+    plot_error_rate(
+        ax=ax,
+        stats=style_stats,
+        x_func=lambda stat: stat.json_metadata['p'],
+        group_func=lambda stat: f'style={stat.json_metadata["style"]} d={stat.json_metadata["d"]}',
+        failure_units_per_shot_func=failure_unit_func,
+    )
+
+    ax.set_title(f"{args.basis} Logical Error Rate per {failure_unit_name} vs Physical Error Rate for style={args.style}")
+    ax.set_ylabel(f"{args.basis} Logical Error Rate per {failure_unit_name}")
+    ax.set_xlabel("Physical Error Rate")
+    ax.legend()
+    ax.loglog()
+    ax.set_yticks([b*10**-k for k in range(13)[::-1] for b in range(1, 10)], minor=True)
+    ax.set_yticks([10**-k for k in range(13)[::-1]])
+    ax.set_ylim(1e-12, 1e-0)
+    ax.set_xlim(1e-4, 1e-2)
+    ax.grid(which='minor')
+    ax.grid(which='major', color='black')
+    return _finish_figure(fig, args)
+
+
+def teraquop_curve(
+        group: List[sinter.TaskStats],
+        *,
+        fits: FootprintFits,
+        unit: str,
+) -> Tuple[List[float], List[float], List[float], List[float]]:
+    xs = []
+    ys_best = []
+    ys_low = []
+    ys_high = []
+    p_groups = sinter.group_by(group, key=lambda stats: stats.json_metadata['p'])
+    for p in sorted(p_groups.keys()):
+        pt = fits.fit_for(p_groups[p], unit=unit)
+        if pt is not None:
+            xs.append(p)
+            ys_best.append(pt.best)
+            ys_low.append(pt.low)
+            ys_high.append(pt.high)
+    return xs, ys_low, ys_best, ys_high
+
+
+def render_footprint(stats: StatsByStyle, args: argparse.Namespace, *, fits: FootprintFits) -> bool:
+    """Plots the extrapolated footprints vs noise strength, a curve per label."""
+    filter_func_desc = args.filter_func
+    filter_func = eval(compile(
+        'lambda *, decoder, metadata, strong_id: ' + args.filter_func,
+        filename='filter_func:command_line_arg',
+        mode='eval'))
+
+    if args.label_func is None:
+        label_func = lambda *, decoder, metadata, strong_id: f"noise={metadata['noise']} basis={metadata['b']} style={metadata['style']}"
+    else:
+        label_func = eval(compile(
+            'lambda *, decoder, metadata, strong_id: ' + args.label_func,
+            filename='label_func:command_line_arg',
+            mode='eval'))
+
+    if args.order_func is None:
+        order_func = label_func
+    else:
+        order_func = eval(compile(
+            'lambda *, decoder, metadata, strong_id: ' + args.order_func,
+            filename='order_func:command_line_arg',
+            mode='eval'))
+
+    def group_key(stats: sinter.TaskStats) -> Any:
+        """the key to use for sinter.group_by
+
+        returns a tuple of the output of order_func then label_func
+            order_func output should override label in terms of sorting,
+            label_func output will be used for the plot label
+
+        Note that stats different order outputs but the same label
+        will appear twice in the plot legend with different colors/markers but the same label
+        """
+        return (
+            order_func(decoder=stats.decoder, metadata=stats.json_metadata, strong_id=stats.strong_id),
+            label_func(decoder=stats.decoder, metadata=stats.json_metadata, strong_id=stats.strong_id),
+        )
+
+    if args.out is None and not args.show:
+        raise ValueError("args.out is None and not args.show")
+
+    failure_unit_name = args.unit[0].upper() + args.unit[1:]
+
+    filtered = [
+        stat
+        for stat in stats.stats
+        if filter_func(decoder=stat.decoder, metadata=stat.json_metadata, strong_id=stat.strong_id)
+        if stat.json_metadata['b'] in args.basis
+    ]
+    if not filtered:
+        print(f"WARNING: No stats left after filtering basis in {args.basis} filter_func={filter_func_desc}. Skipping plot.", file=sys.stderr)
+        return False
+
+    markers = "ov*sp^<>8PhH+xXDd|" * 100
+    import matplotlib.colors
+    colors = list(matplotlib.colors.TABLEAU_COLORS) * 3
+
+    ax: plt.Axes
+    fig: plt.Figure
+    fig, ax = plt.subplots(1, 1)
+    groups = sinter.group_by(filtered, key=group_key)
+    curves = {
+        key: teraquop_curve(
+            groups[key],
+            fits=fits,
+            unit=args.unit,
+        )
+        for key in sorted(groups.keys())
+    }
+    for k, ((order, label), (xs, ys_low, ys_best, ys_high)) in enumerate(curves.items()):
+        ax.fill_between(xs, ys_low, ys_high, alpha=0.2, color=colors[k])
+    for k, ((order, label), (xs, ys_low, ys_best, ys_high)) in enumerate(curves.items()):
+        ax.plot(xs, ys_best, label=label, marker=markers[k], color=colors[k])
+
+    ax.set_title(args.title or f"{failure_unit_name} Footprint vs Physical Error Rate")
+    ax.set_ylabel(f"Physical Qubits for 1 Error per {failure_unit_name}")
+    ax.set_xlabel("Physical Error Rate")
+    ax.set_ylim(1e2, 1e4)
+    ax.set_xlim(1e-4, 1e-2)
+    ax.legend()
+    ax.loglog()
+    ax.grid(which='minor')
+    ax.grid(which='major', color='black')
+    return _finish_figure(fig, args)
+
+
+# Maps the name of each plot tool to its argument parser.
+PLOT_ARG_PARSERS: Dict[str, Callable[[], argparse.ArgumentParser]] = {
+    'plot_classic': classic_arg_parser,
+    'plot_fan': fan_arg_parser,
+    'plot_footprint': footprint_arg_parser,
+}
+
+
+def render_plot(tool: str, args: argparse.Namespace, stats: StatsByStyle, *, fits: Optional[FootprintFits]) -> bool:
+    """Renders the figure that the given plot tool would render for the given arguments.
+
+    Returns:
+        Whether the figure was written to args.out. It isn't when no stats
+        were left to plot, or when there's no args.out.
+    """
+    if tool == 'plot_classic':
+        return render_classic(stats, args)
+    elif tool == 'plot_fan':
+        return render_fan(stats, args)
+    elif tool == 'plot_footprint':
+        return render_footprint(stats, args, fits=fits if fits is not None else FootprintFits.from_stats_csv(args.stats))
+    else:
+        raise ValueError(f"Unknown plot tool {tool!r}. Expected one of {sorted(PLOT_ARG_PARSERS)}.")
@@ -0,0 +1,49 @@
+import matplotlib
+import pytest
+import sinter
+
+from midout._stats_test_util import grid_stat
+from midout.footprint import FootprintFits
+from midout.stat_plots import PLOT_ARG_PARSERS, StatsByStyle, render_plot
+
+
+def _stat(d: int, *, p: float, style: str, b: str = 'XZ') -> sinter.TaskStats:
+    return grid_stat(d, p=p, style=style, b=b, p_shot=0.2 * 0.3**d)
+
+
+def test_stats_by_style():
+    stats = [_stat(d, p=1e-3, style=style, b=b) for d in [3, 5] for style in ['A', 'B'] for b in ['X', 'XZ']]
+    index = StatsByStyle(stats)
+    assert index.stats == stats
+    assert index.get(style='A', basis='XZ') == [stats[1], stats[5]]
+    assert index.get(style='C', basis='XZ') == []
+
+
+def test_render_plot(tmp_path):
+    matplotlib.use('Agg')
+    stats_path = tmp_path / 'stats.csv'
+    stats = [_stat(d, p=p, style='A') for d in [3, 5, 7] for p in [1e-3, 2e-3]]
+    with open(stats_path, 'w') as f:
+        print(sinter.CSV_HEADER, file=f)
+        for stat in stats:
+            print(stat, file=f)
+    index = StatsByStyle(stats)
+
+    for tool, args in [
+        ('plot_fan', ['--unit', 'quop', '--basis', 'XZ', '--style', 'A']),
+        ('plot_classic', ['--unit', 'round', '--basis', 'XZ', '--style', 'A']),
+        ('plot_footprint', ['--unit', 'teraquop', '--basis', 'XZ']),
+    ]:
+        out = tmp_path / f'{tool}.png'
+        parsed = PLOT_ARG_PARSERS[tool]().parse_args([str(stats_path), *args, '--out', str(out)])
+        assert render_plot(tool, parsed, index, fits=None)
+        assert out.exists()
+
+        # Nothing is written when every stat is filtered out.
+        skipped = tmp_path / f'{tool}_skipped.png'
+        parsed = PLOT_ARG_PARSERS[tool]().parse_args([str(stats_path), *args, '--out', str(skipped)])
+        assert not render_plot(tool, parsed, StatsByStyle([]), fits=FootprintFits({}))
+        assert not skipped.exists()
+
+    with pytest.raises(ValueError, match='plot_classic'):
+        render_plot('plot_nope', parsed, index, fits=None)
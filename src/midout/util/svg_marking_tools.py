@@ -128,10 +128,8 @@ def centroid(points):
     cy = 1 / 6.0 / A * np.sum(ly)
     return [cx, cy]
 
-def marker_factory(slice_group_element, id_str, marker='o'):
-    """ add a marker to the slice group element"""
-
-    # get the surrounding path, compute centroid
+def slice_center(slice_group_element):
+    """returns the centroid of the shape drawn by a slice group element"""
     slice_path_element = slice_group_element[0]
     if slice_path_element.tag == SVG_NAMESPACE+'path':
         if 'd' not in slice_path_element.attrib:
@@ -139,12 +137,22 @@ def marker_factory(slice_group_element, id_str, marker='o'):
         all_corners = extract_points_from_path_d(slice_path_element.attrib['d'])
         # because we are geniuses and don't use closepath, remove the last corner, which is a duplicate
         all_corners = all_corners[:-1]
-        c = centroid(all_corners)
+        return centroid(all_corners)
     elif slice_path_element.tag == SVG_NAMESPACE+'circle':
-        c = (float(slice_path_element.attrib['cx']), float(slice_path_element.attrib['cy']))
+        return (float(slice_path_element.attrib['cx']), float(slice_path_element.attrib['cy']))
     else:
         raise ValueError(f"Unexpected slice_path_element.tag={slice_path_element.tag}")
 
+def marker_factory(slice_group_element, id_str, marker='o', c=None):
+    """ add a marker to the slice group element
+
+    c is the centroid of the slice, if it is already known
+    """
+
+    # get the surrounding path, compute centroid
+    if c is None:
+        c = slice_center(slice_group_element)
+
     if marker == 'o':
         marker = ElementTree.SubElement(slice_group_element, SVG_NAMESPACE+'circle')
         marker.set('r', str(3.5))
@@ -261,36 +269,111 @@ def marker_factory(slice_group_element, id_str, marker='o'):
     else:
         raise ValueError(f"Unrecognised Marker: {marker}")
 
+class SliceIndex:
+    """the slices of a parsed detector slice svg, indexed by their id fields
+
+    build once per tree, then look slices up with the same filters as
+    compare_id without re-parsing every element for every query.
+    centroids are computed at most once per slice.
+    """
+
+    def __init__(self, tree):
+        self.ids = []
+        self.elements = []
+        # (field, value) -> indices of slices with that value
+        self._by_field = {}
+        # (coordinate index, value) -> indices of slices with that coordinate
+        self._by_coord = {}
+        self._centers = {}
+        for e in tree.findall(f"./{SVG_NAMESPACE}g"):
+            idd = parse_id(e)
+            if idd['name'] != 'slice':
+                continue
+            k = len(self.ids)
+            self.ids.append(idd)
+            self.elements.append(e)
+            for field, v in idd.items():
+                if field != 'coords':
+                    self._by_field.setdefault((field, v), []).append(k)
+            if idd['coords'] is not None:
+                for i, v in enumerate(idd['coords']):
+                    self._by_coord.setdefault((i, v), []).append(k)
+
+    def _lookup(self, table, key, v):
+        if isinstance(v, list):
+            found = set()
+            for e in v:
+                found.update(table.get((key, e), ()))
+            return found
+        return set(table.get((key, v), ()))
+
+    def find(self, coords=None, **kwargs):
+        """returns the indices of the slices compatible with the filters, in document order
+
+        see compare_id for argument specifications
+        """
+        candidates = None
+        for k, v in kwargs.items():
+            found = self._lookup(self._by_field, k, v)
+            candidates = found if candidates is None else candidates & found
+        if coords is not None:
+            for i, d in enumerate(coords):
+                if d is not None:
+                    found = self._lookup(self._by_coord, i, d)
+                    candidates = found if candidates is None else candidates & found
+        if candidates is None:
+            candidates = range(len(self.ids))
+        # the final check keeps the exact semantics (and errors) of compare_id
+        return [k for k in sorted(candidates) if compare_id(self.ids[k], coords=coords, **kwargs)]
+
+    def center(self, k):
+        if k not in self._centers:
+            self._centers[k] = slice_center(self.elements[k])
+        return self._centers[k]
+
+    def mark(self, marker='x', **kwargs):
+        """adds markers to all slices compatible with kwargs, returning how many were marked"""
+        found = self.find(**kwargs)
+        for k in found:
+            marker_factory(self.elements[k], id_str=marker_id_string(self.ids[k]), marker=marker, c=self.center(k))
+        return len(found)
+
+    def color(self, color='#59FF7A', **kwargs):
+        """changes the background fill of all slices compatible with kwargs, returning how many were colored"""
+        found = self.find(**kwargs)
+        for k in found:
+            slice_path_element = self.elements[k][0]
+            if slice_path_element.tag == SVG_NAMESPACE+'path' or slice_path_element.tag == SVG_NAMESPACE+'circle':
+                slice_path_element.set('fill', color)
+            else:
+                raise ValueError(f"Unexpected slice_path_element.tag={slice_path_element.tag}")
+        return len(found)
+
+    def apply(self, marks=(), colors=()):
+        """applies many markings at once
+
+        marks and colors are lists of kwarg dictionaries for mark and color.
+        returns the number of markers added and the number of slices colored.
+        """
+        num_marked = sum(self.mark(**kwargs) for kwargs in marks)
+        num_colored = sum(self.color(**kwargs) for kwargs in colors)
+        return num_marked, num_colored
+
 def mark_slices(tree, marker='x', **kwargs):
     """adds x markers to all slices compatible with kwargs
     
-    see compare_id for argument specifications
+    see compare_id for argument specifications.
+    when making several queries against the same tree, use a SliceIndex instead.
     """
-    c=0
-    for e in tree.findall(f"./{SVG_NAMESPACE}g"):
-        idd = parse_id(e)
-        if compare_id(idd, tag='g', name='slice', **kwargs):
-            marker_factory(e, id_str=marker_id_string(idd), marker=marker)
-            c += 1
-    return c
+    return SliceIndex(tree).mark(marker=marker, **kwargs)
 
 def color_slices(tree, color='#59FF7A', **kwargs):
     """changes the color of the background fill of the given slice
     
-    see compare_id for argument specifications
+    see compare_id for argument specifications.
+    when making several queries against the same tree, use a SliceIndex instead.
     """
-    c=0
-    for e in tree.findall(f"./{SVG_NAMESPACE}g"):
-        idd = parse_id(e)
-        if compare_id(idd, tag='g', name='slice', **kwargs):
-            # get the surrounding path, compute centroid
-            slice_path_element = e[0]
-            if slice_path_element.tag == SVG_NAMESPACE+'path' or slice_path_element.tag == SVG_NAMESPACE+'circle':
-                slice_path_element.set('fill', color)
-            else:
-                raise ValueError(f"Unexpected slice_path_element.tag={slice_path_element.tag}")
-            c += 1
-    return c
+    return SliceIndex(tree).color(color=color, **kwargs)
 
 def parse_string_to_tree(xml_string: str) -> ElementTree:
     """parses an xml string into an ElementTree
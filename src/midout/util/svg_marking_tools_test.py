@@ -1,4 +1,15 @@
-from midout.util.svg_marking_tools import compare_id, extract_points_from_path_d
+import stim
+
+from midout.util.svg_marking_tools import (
+    SVG_NAMESPACE,
+    SliceIndex,
+    color_slices,
+    compare_id,
+    extract_points_from_path_d,
+    mark_slices,
+    parse_id,
+    parse_string_to_tree,
+)
 
 
 def test_compare_id():
@@ -23,3 +34,54 @@ def test_extract_points_from_path_d():
     expected_coords = [(896.461,38.6274), (873.834, 16.0), (896.461, 38.6274)]
     assert extract_points_from_path_d(example_string) == expected_coords
 
+
+
+def _slice_tree():
+    circuit = stim.Circuit.generated('surface_code:rotated_memory_z', distance=3, rounds=3)
+    diagram = circuit.diagram('time+detector-slice-svg', tick=range(3, 9))
+    return parse_string_to_tree(str(diagram))
+
+
+def _count_by_traversal(tree, **kwargs):
+    return sum(
+        compare_id(parse_id(e), tag='g', name='slice', **kwargs)
+        for e in tree.findall(f"./{SVG_NAMESPACE}g")
+    )
+
+
+def test_slice_index_find():
+    tree = _slice_tree()
+    index = SliceIndex(tree)
+    for kwargs in [
+        {},
+        {'coords': (None, None, 1)},
+        {'coords': ([2, 4], None, 1)},
+        {'coords': (2, 2, [0, 1])},
+        {'tick': 5},
+        {'tick': [4, 6], 'coords': (None, 4, None)},
+        {'detector': '3'},
+        {'missing_field': 1},
+    ]:
+        found = index.find(**kwargs)
+        assert len(found) == _count_by_traversal(tree, **kwargs)
+        assert found == sorted(found)
+
+
+def test_slice_index_marking():
+    tree = _slice_tree()
+    index = SliceIndex(tree)
+    num_slices = len(index.find())
+    num_elements = sum(1 for _ in tree.iter())
+
+    assert index.apply(
+        marks=[{'coords': (None, None, 1)}, {'coords': (None, None, 2), 'marker': 'o'}],
+        colors=[{'tick': 5, 'color': '#FF0000'}],
+    ) == (len(index.find(coords=(None, None, 1))) + len(index.find(coords=(None, None, 2))), len(index.find(tick=5)))
+    assert sum(1 for _ in tree.iter()) > num_elements
+    for k in index.find(tick=5):
+        assert index.elements[k][0].attrib['fill'] == '#FF0000'
+
+    # The module level helpers give the same counts.
+    other = _slice_tree()
+    assert mark_slices(other, coords=(None, None, 1)) == len(index.find(coords=(None, None, 1)))
+    assert color_slices(other) == num_slices
@@ -1,10 +1,11 @@
-import pytest
+import hashlib
 import itertools
 
+import pytest
 import stim
 
 from midout import gen
-from midout.all_circuits import make_requested_surface_code
+from midout.all_circuits import CONSTRUCTIONS, make_requested_surface_code
 from midout.walking._make_walking_circuit_cases import make_walking_code, strategy_to_rounds
 
 
@@ -723,3 +724,53 @@ def test_making_exact_circuit_cz():
         DEPOLARIZE1(0.0001) 0 1 5 6 10 11 15 16 20 21 25 26 27 28 29 30 31 32 33 34 35 36 37 38 39 40 41 42 43 44 45 46 47 48 49 50 51 52 53 54 55 61 62 63 64 65 66 67 68 69 75 76 77
         DEPOLARIZE1(0.002) 0 1 5 6 10 11 15 16 20 21 25 26 27 28 29 30 31 32 33 34 35 36 37 38 39 40 41 42 43 44 45 46 47 48 49 50 51 52 53 54 55 61 62 63 64 65 66 67 68 69 75 76 77
     ''')
+
+
+# sha256 of the text of each walking circuit with 4*d rounds, as generated for assets/stats.csv.
+# Sinter strong ids hash the circuit text, so these must never change (in particular the order of
+# OBSERVABLE_INCLUDE targets, see meas_layer.observable_include_order).
+_PINNED_CIRCUIT_HASHES = {
+    ('GLIDING-CX', 3, 'X'): '284f3dd298470e9494815e7aaaf52cd9b7a7a3e51d646cccd1b5197940f75240',
+    ('GLIDING-CX', 3, 'Z'): 'e3b1b499aff2a62cb151225c095201ef117a8143a0a0ab031e71ae3b5a47714b',
+    ('GLIDING-CX', 5, 'X'): '9272398c6e6d0c6f542ad64663c3be3b74f1044ac13f39c5d84d9873996e17c2',
+    ('GLIDING-CX', 5, 'Z'): '74cfe5e56db9b99067301c6a63bed7e4cdb75e0f04aef900588cd1622f8f12d7',
+    ('GLIDING-CX', 7, 'X'): '69c0f051f01449a37b225d86f308fefa82aaab773cc6a09a587aab274d1774ac',
+    ('GLIDING-CX', 7, 'Z'): '672559baaf78c4743eeab6dee6a5f6a03a89aa0220971e3d1652ef927dc6eb7c',
+    ('GLIDING-CZ', 3, 'X'): '01d326581deda88bdc32b6de2d3e6f9a8cb99a8abb99765772d4dfd56f3545f8',
+    ('GLIDING-CZ', 3, 'Z'): '05d1bc40c1635bb4cf1c8a91138221af597bb8d19dadacbaa6ae74d7bd011802',
+    ('GLIDING-CZ', 5, 'X'): '9a3fe59699351b1bd77a8c75b5f8a76834ad183e7d9acb6c04872f965cebde79',
+    ('GLIDING-CZ', 5, 'Z'): '7c16a9ad9b3384c573935e7fbc83bf1899b825d0b73314a8850d385e8167cae4',
+    ('GLIDING-CZ', 7, 'X'): 'd0968741780ad80fd1b0abd98075ffbd32d8c6a41719e0a90b11d9222b1b8856',
+    ('GLIDING-CZ', 7, 'Z'): '36e53a9779824f50063b2e78f4318694f7f7a99417ca870444b7f5c4e6d5a125',
+    ('SLIDING-CX', 3, 'X'): 'aec6a8de29cc2668ca898d2ca1b408bc31914a1946b441e96d9a4cca8731cb0d',
+    ('SLIDING-CX', 3, 'Z'): 'f639cc18f7cdb90d13b6d4ab8e2155ead8d3065c654e6b5fa475e328fcd0cf0f',
+    ('SLIDING-CX', 5, 'X'): 'd7bb76464b0131f48cf0c3d0e4b102f90ee5b935bed40dbc2311644fb79ec5f4',
+    ('SLIDING-CX', 5, 'Z'): 'b87fee87f9c7c3485ff330a90a6884ac24bde19a50a2c677a540ca4ce4c50430',
+    ('SLIDING-CX', 7, 'X'): 'b32e9af1b33d7fa91a0cb51d7c073245998a932c6ef176a470feba0bfbe00dac',
+    ('SLIDING-CX', 7, 'Z'): 'f75588910378ab2d1c379f3ce4c44f1b8fde7fabdf02618677c6630f591b76fc',
+    ('SLIDING-CZ', 3, 'X'): 'c8a11693909f6165c78c9713ed1b6237df4f6d99d9c1725d5cedc1d3430ce0f4',
+    ('SLIDING-CZ', 3, 'Z'): '383f387e4958606d3e92600551a260342cb20a8248b7560d58abd7be028a7a13',
+    ('SLIDING-CZ', 5, 'X'): '60a2b8580b1512fef2eae41a64cd5711af96aab7e462f95d15b0bf797e0f4f42',
+    ('SLIDING-CZ', 5, 'Z'): '78959f68b263444f52172961f5cd423863aaa05dfc4cc8724539aae3c34c8c98',
+    ('SLIDING-CZ', 7, 'X'): 'a2deb860c947a7a8b2e823c46370740f2d5a73aef901fa24187e2b49dc6dbb5d',
+    ('SLIDING-CZ', 7, 'Z'): '967aeca0704b9db415c5d40eddafabe7192abdb3dab3b83727fc3c13cdafdae2',
+    ('WIGGLING-CX', 3, 'X'): 'bb538c2fa2ddee0bb6b02fd4421c0fd020165520f0acb368ec951acbb8dd5392',
+    ('WIGGLING-CX', 3, 'Z'): '59e9ed28df1a94baf5745d5da3321e05f9926be9dcc83c8e39f03af5d7c42d4a',
+    ('WIGGLING-CX', 5, 'X'): 'de8ffd07136382e1cb0271d8c8aa82aacd2731b4df1a3157c416da7b07917a87',
+    ('WIGGLING-CX', 5, 'Z'): '2f25c18e99d8078ceb16033f0100c988ed7bebb441c25e4c348d7c8adedbc215',
+    ('WIGGLING-CX', 7, 'X'): '16248ac24e04ad7e9fe97351d56dccdb1a00d2e115014ce2b5ba4f96b8bf475a',
+    ('WIGGLING-CX', 7, 'Z'): '47cfa5f2450401d31a8e8fa17c23181fce19f257f56ad4b460c6e09b5b5428e9',
+    ('WIGGLING-CZ', 3, 'X'): 'c6dba0a2965c394dc49c682b5bede5583a485294c563468d24452bd047a4aac1',
+    ('WIGGLING-CZ', 3, 'Z'): 'f1543b7525942e771bf0fb9a90624f4defb9bc092e14187e7d7f989b7c82d02d',
+    ('WIGGLING-CZ', 5, 'X'): '23f64990fcbb2beeb0494ca08fce4f2b3469cd35184b8616f0e851ac8ec85d1b',
+    ('WIGGLING-CZ', 5, 'Z'): '85daec3e375b31ec33ab6e28042c3f8685b724c2e67741c436441d7258c4c3bd',
+    ('WIGGLING-CZ', 7, 'X'): '36619fd608d12f54c21380d14193a3d5ebbde5ab9f58977091595eefb80cf171',
+    ('WIGGLING-CZ', 7, 'Z'): '159f4be554399a8a7bdff327bde5376ffc83fd34329743e38d0cc53a59e60f3e',
+}
+
+
+@pytest.mark.parametrize("style, distance, basis", sorted(_PINNED_CIRCUIT_HASHES))
+def test_walking_circuit_text_is_pinned(style, distance, basis):
+    circuit = CONSTRUCTIONS[style](distance=distance, basis=basis, rounds=4 * distance).circuit
+    actual = hashlib.sha256(str(circuit).encode('utf8')).hexdigest()
+    assert actual == _PINNED_CIRCUIT_HASHES[(style, distance, basis)]
@@ -1,10 +1,9 @@
 import dataclasses
-from typing import Iterable, List, Optional, Union
-
-import matplotlib.pyplot as plt
+import itertools
+from typing import Dict, Iterable, List, Optional, Union
 
 from midout.walking.cycle import Cycle
-from midout.walking.diamonds import Diamond
+from midout.walking.diamonds import assigning_duids
 from midout.walking.meas_layer import MeasLayer
 from midout.walking.reset_layer import ResetLayer
 from midout.walking.stim_circuit_builder import StimCircuitBuilder
@@ -22,9 +21,12 @@ class Circuit:
     def __init__(
         self, distance, rounds: Union[int, List[Optional[Direction]]], basis: Basis, duids=False
     ):
-        if duids:
-            Diamond.reset_duid_counter()
+        # duids are allocated per circuit, so circuits can be built concurrently.
+        self.duid_counter = itertools.count(start=1) if duids else None
+        with assigning_duids(self.duid_counter):
+            self._build(distance=distance, rounds=rounds, basis=basis)
 
+    def _build(self, distance, rounds: Union[int, List[Optional[Direction]]], basis: Basis):
         self.basis = basis
         self.init_tiles = TileState.make_surface_code(distance=distance)
         self.init_diamonds, self.init_layer = ResetLayer.make_init_layer(
@@ -53,22 +55,42 @@ class Circuit:
             direction=directions[0],
         )
         self.cycles = [c0]
+        # Once the patch settles, each cycle is a translation of the last cycle that was built
+        # with the same direction, so it's stamped out from that one instead of being rebuilt.
+        # Rebuilt diamonds get fresh duids, so this is skipped when duids are being tracked.
+        templates = {directions[0]: c0} if self.duid_counter is None else None
         for d in directions[1:]:
-            c = self.cycles[-1].make_next_cycle(d)
+            c = Circuit._next_cycle(self.cycles[-1], d, templates)
             self.cycles.append(c)
 
         self.final_meas_layer = MeasLayer.make_final_measure_layer(
             tile_state=self.cycles[-1].output_tile_state,
-            diamond_state=self.cycles[-1].diamond_states[-1],
+            diamond_state=self.cycles[-1].last_diamond_state,
             index=self.cycles[-1].index + 1,
             basis=self.basis,
         )
-        if duids:
-            Diamond.delete_duid_counter()
-        return
+
+    @staticmethod
+    def _next_cycle(
+        prev: Cycle, direction: Optional[Direction], templates: Optional[Dict[Optional[Direction], Cycle]]
+    ) -> Cycle:
+        template = None if templates is None else templates.get(direction)
+        if template is not None:
+            offset = prev.output_tile_state.offset_from(template.input_tile_state)
+            index_shift = prev.index + 1 - template.index
+            if offset is not None and prev.last_diamond_state == (
+                template.input_contracting_diamond_state.translated(offset, index_shift)
+            ):
+                return template.translated(offset, index_shift, prev.last_diamond_state)
+        c = prev.make_next_cycle(direction)
+        if templates is not None:
+            templates[direction] = c
+        return c
 
     def plot(self, axes=None, plot_gates=False):
         """plot out all the diamond states in this circuit."""
+        import matplotlib.pyplot as plt
+
         num = 1 + 6 * len(self.cycles)  # number of diamonds to plot
         if plot_gates:
             num += 1  # if we're plotting gates as well, plot the final measurements at the end
@@ -98,6 +120,8 @@ class Circuit:
         return axes
 
     def plot_with_and_without_gates(self):
+        import matplotlib.pyplot as plt
+
         num = 2 + 6 * len(self.cycles)
         _, axes = plt.subplots(num, 2, figsize=(15 * 2, 15 * num))
         self.plot(axes=axes[:, 0], plot_gates=False)
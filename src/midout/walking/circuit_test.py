@@ -1,3 +1,5 @@
+import concurrent.futures
+
 import pytest
 import stim
 
@@ -50,3 +52,51 @@ def test_circuit_determinism():
     stim_circuit_1 = c1.build_stim_circuit()
 
     assert stim_circuit_0 == stim_circuit_1
+
+
+def test_duids_are_per_circuit():
+    rounds = [DOWN_RIGHT, DOWN_LEFT, None]
+    expected = Circuit(distance=4, rounds=rounds, basis=Basis.z, duids=True).build_stim_circuit()
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=4) as pool:
+        results = list(pool.map(
+            lambda _: Circuit(distance=4, rounds=rounds, basis=Basis.z, duids=True).build_stim_circuit(),
+            range(8),
+        ))
+    assert all(r == expected for r in results)
+
+    # Diamonds built outside of a circuit don't get duids.
+    c = Circuit(distance=3, rounds=[None], basis=Basis.z, duids=False)
+    assert all(d.duid is None for d in c.init_diamonds.diamonds)
+
+
+@pytest.mark.parametrize("strategy", list(strategy_to_rounds.keys()))
+def test_stamped_cycles_match_built_cycles(strategy):
+    rounds = strategy_to_rounds[strategy] * 3 + [None]
+    c = Circuit(distance=5, rounds=rounds, basis=Basis.z)
+
+    built = [c.cycles[0]]
+    for d in rounds[1:]:
+        built.append(built[-1].make_next_cycle(d))
+    for stamped, expected in zip(c.cycles, built):
+        assert stamped.index == expected.index
+        assert stamped.output_tile_state.all_qubits == expected.output_tile_state.all_qubits
+        assert stamped.layers == expected.layers
+        assert stamped.diamond_states == expected.diamond_states
+        assert stamped.input_contracting_diamond_state == expected.input_contracting_diamond_state
+        assert stamped.post_reset_diamonds == expected.post_reset_diamonds
+
+
+@pytest.mark.parametrize("strategy", list(strategy_to_rounds.keys()))
+@pytest.mark.parametrize("basis", [Basis.z, Basis.x])
+def test_stamped_cycles_give_same_stim_circuit(strategy, basis):
+    rounds = strategy_to_rounds[strategy] * 4 + [None]
+    c = Circuit(distance=5, rounds=rounds, basis=basis, duids=False)
+
+    built = [c.cycles[0]]
+    for d in rounds[1:]:
+        built.append(built[-1].make_next_cycle(d))
+    c.cycles = built
+    assert c.build_stim_circuit(errors=1e-3) == Circuit(
+        distance=5, rounds=rounds, basis=basis, duids=False
+    ).build_stim_circuit(errors=1e-3)
@@ -1,8 +1,7 @@
 import dataclasses
-from typing import cast, Dict, Iterable, Set, Tuple
+from typing import cast, Dict, FrozenSet, Iterable, Set, Tuple
 
-import matplotlib as mpl
-import matplotlib.pyplot as plt
+import numpy as np
 
 from midout.walking.diamonds import Diamond, DiamondState
 from midout.walking.util import Basis, Direction, Qubit, qubit_coords
@@ -47,25 +46,50 @@ def _make_cnot_layer(
     direction = cast(complex, direction)
     if direction.real.is_integer() and direction.imag.is_integer():
         raise ValueError
-    cnot_pairs = []
-    for q in qubits:
-        q = cast(complex, q)
-        direction_from_center = q - center
-        if direction_from_center.real.is_integer() and direction_from_center.imag.is_integer():
-            # q is on the integer subgrid, so it should produce a cnot
-            odd_subgrid = (direction_from_center.real % 2) != (direction_from_center.imag % 2)
-            reverse_cnot = odd_subgrid != flip_cnots  # XOR is equiv to != for bools
-            this_direction = -1 * direction if odd_subgrid and not aligned else direction
-            other_cnot_qubit = q + this_direction
-            if other_cnot_qubit not in qubits:
-                continue
-            gate_qubits = (q, q + this_direction)
-            if reverse_cnot:
-                gate_qubits = gate_qubits[::-1]
-
-            cnot_pairs.append(gate_qubits)
-
-    return cast(Set[Tuple[Qubit, Qubit]], set(cnot_pairs))
+    # Work on integer coordinates of the half-integer grid (i.e. doubled coordinates).
+    # Qubits off that grid can't be on the center's integer subgrid, or be reached from it.
+    center_and_direction = np.array([center.real, center.imag, direction.real, direction.imag]) * 2
+    if not np.array_equal(np.rint(center_and_direction), center_and_direction):
+        raise ValueError(f"center and direction must be on the half-integer grid: {center=}, {direction=}")
+    cx, cy, dx, dy = center_and_direction.astype(np.int64)
+    qubit_list = list(qubits)
+    values = np.array(qubit_list, dtype=np.complex128) * 2
+    on_half_grid = (np.rint(values.real) == values.real) & (np.rint(values.imag) == values.imag)
+    qubit_list = [q for q, keep in zip(qubit_list, on_half_grid.tolist()) if keep]
+    xs = values.real[on_half_grid].astype(np.int64)
+    ys = values.imag[on_half_grid].astype(np.int64)
+
+    # q is on the integer subgrid of the center when its relative doubled coordinates are even.
+    rx = xs - cx
+    ry = ys - cy
+    on_grid = np.flatnonzero((rx % 2 == 0) & (ry % 2 == 0))
+    if not len(on_grid):
+        return set()
+    odd_subgrid = ((rx[on_grid] + ry[on_grid]) // 2) % 2 == 1
+    sign = np.where(odd_subgrid & (not aligned), -1, 1)
+    partner_xs = xs[on_grid] + sign * dx
+    partner_ys = ys[on_grid] + sign * dy
+
+    # Resolve partner membership by looking up packed coordinate keys in sorted order.
+    min_x = min(int(xs.min()), int(partner_xs.min()))
+    min_y = min(int(ys.min()), int(partner_ys.min()))
+    span_y = max(int(ys.max()), int(partner_ys.max())) - min_y + 1
+    keys = (xs - min_x) * span_y + (ys - min_y)
+    partner_keys = (partner_xs - min_x) * span_y + (partner_ys - min_y)
+    order = np.argsort(keys)
+    sorted_keys = keys[order]
+    pos = np.minimum(np.searchsorted(sorted_keys, partner_keys), len(sorted_keys) - 1)
+    found = sorted_keys[pos] == partner_keys
+    partners = order[pos[found]]
+    reverse_cnot = odd_subgrid[found] != flip_cnots  # XOR is equiv to != for bools
+
+    cnot_pairs = set()
+    for k, p, r in zip(on_grid[found].tolist(), partners.tolist(), reverse_cnot.tolist()):
+        if r:
+            cnot_pairs.add((qubit_list[p], qubit_list[k]))
+        else:
+            cnot_pairs.add((qubit_list[k], qubit_list[p]))
+    return cast(Set[Tuple[Qubit, Qubit]], cnot_pairs)
 
 
 @dataclasses.dataclass
@@ -97,6 +121,12 @@ class CnotLayer:
         elif not quiet:
             raise ValueError(f"qubit {qubit} not involved in any gates")
 
+    def translated(self, offset: complex) -> 'CnotLayer':
+        return CnotLayer(
+            targets={t + offset: c + offset for t, c in self.targets.items()},
+            controls={c + offset: t + offset for c, t in self.controls.items()},
+        )
+
     @staticmethod
     def from_tuples(tuples: Iterable[Tuple[Qubit, Qubit]]):
         """construct the class from tuples of (control, target)"""
@@ -208,10 +238,26 @@ class CnotLayer:
         output_map = self.track_stabilizers_dict(*args, **kwargs)
         return set(q for qubits in output_map.values() for q in qubits)
 
+    def propagate(self, qubits: Iterable[Qubit], basis: Basis) -> FrozenSet[Qubit]:
+        """tracks a stabilizer through the cnot layer, as a product with the layer's GF(2) matrix.
+
+        In a given basis the layer's matrix is the identity plus one entry per cnot,
+        from its source to its sink, so the product is just the stabilizer with the
+        sinks of its sources toggled.
+        """
+        qubits = frozenset(qubits)
+        sources, _ = self.source_and_sink(basis)
+        toggled = [sources[q] for q in qubits if q in sources]
+        if not toggled:
+            return qubits
+        return qubits.symmetric_difference(toggled)
+
     def track_diamond(self, diamond: Diamond):
-        qubits = self.track_stabilizers(qubits=diamond.qubits, basis=diamond.basis)
+        qubits = self.propagate(qubits=diamond.qubits, basis=diamond.basis)
+        if qubits == diamond.qubits:
+            return diamond
         return Diamond(
-            qubits=frozenset(qubits),
+            qubits=qubits,
             basis=diamond.basis,
             marker_type=diamond.marker_type,
             override_color=diamond.override_color,
@@ -223,13 +269,23 @@ class CnotLayer:
     def track_diamond_state(self, diamond_state: DiamondState):
         """make a new DiamondState that results from this one being put through a cnot layer."""
         diamonds = [self.track_diamond(d) for d in diamond_state.diamonds]
-        observables = {
-            b: set(self.track_stabilizers(qubits=obvs, basis=b))
-            for b, obvs in diamond_state.observables.items()
-        }
+        observables = self.track_observables(diamond_state.observables)
         return DiamondState(diamonds=frozenset(diamonds), observables=observables)
 
+    def track_observables(self, observables: Dict[Basis, FrozenSet[Qubit]]) -> Dict[Basis, Set[Qubit]]:
+        """the logical observables that result from putting the given ones through this cnot layer.
+
+        Unlike diamonds, these go through track_stabilizers rather than propagate. The iteration
+        order of an observable's qubits decides the order of its OBSERVABLE_INCLUDE targets, and
+        this keeps that order (and so the generated circuits) the same as it has always been.
+        """
+        # The extra set() copy matters too, since copying can change a set's iteration order.
+        return {b: set(self.track_stabilizers(qubits=obvs, basis=b)) for b, obvs in observables.items()}
+
     def plot(self, ax=None):
+        import matplotlib as mpl
+        import matplotlib.pyplot as plt
+
         if ax is None:
             _, ax = plt.subplots()
 
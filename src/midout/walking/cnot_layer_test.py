@@ -1,6 +1,10 @@
 import itertools
+import random
 
-from midout.walking.cnot_layer import _make_cnot_layer
+import pytest
+
+from midout.walking.cnot_layer import _make_cnot_layer, CnotLayer
+from midout.walking.util import Basis
 
 
 def test_cnot_layer():
@@ -78,3 +82,55 @@ def test_cnot_layer():
         (0.5 + 1.5j, 1 + 2j),
         (1.5 + 1.5j, 2 + 2j)[::-1],
     }
+
+
+def _make_cnot_layer_reference(qubits, center, direction, aligned=True, flip_cnots=False):
+    cnot_pairs = set()
+    for q in qubits:
+        d = q - center
+        if d.real.is_integer() and d.imag.is_integer():
+            odd_subgrid = (d.real % 2) != (d.imag % 2)
+            this_direction = -direction if odd_subgrid and not aligned else direction
+            if q + this_direction in qubits:
+                pair = (q, q + this_direction)
+                cnot_pairs.add(pair[::-1] if odd_subgrid != flip_cnots else pair)
+    return cnot_pairs
+
+
+def test_cnot_layer_matches_reference():
+    rng = random.Random(5)
+    grid = [x / 2 + 1j * y / 2 for x, y in itertools.product(range(-6, 14), repeat=2)]
+    for _ in range(50):
+        qubits = set(rng.sample(grid, rng.randint(0, len(grid))))
+        qubits.add(0.25 + 0.25j)  # off the half-integer grid, so never involved
+        center = rng.choice(grid)
+        direction = rng.choice([0.5 + 0.5j, -0.5 + 0.5j, 0.5 - 0.5j, -0.5 - 0.5j, 0.5, 1.5j])
+        for aligned, flip_cnots in itertools.product([False, True], repeat=2):
+            assert _make_cnot_layer(
+                qubits, center, direction, aligned=aligned, flip_cnots=flip_cnots,
+            ) == _make_cnot_layer_reference(
+                qubits, center, direction, aligned=aligned, flip_cnots=flip_cnots,
+            )
+
+
+def test_cnot_layer_rejects_off_grid_center_and_direction():
+    with pytest.raises(ValueError, match='half-integer grid'):
+        _make_cnot_layer({0, 0.5 + 0.5j}, 0.25, 0.5 + 0.5j, aligned=True, flip_cnots=False)
+    with pytest.raises(ValueError, match='half-integer grid'):
+        _make_cnot_layer({0, 0.5 + 0.5j}, 0, 0.25 + 0.5j, aligned=True, flip_cnots=False)
+
+
+def test_propagate_matches_track_stabilizers_dict():
+    rng = random.Random(7)
+    data_qubits = [x + 1j * y for x, y in itertools.product(range(4), repeat=2)]
+    measure_qubits = [x + 0.5 + 1j * (y + 0.5) for x, y in itertools.product(range(3), repeat=2)]
+    layer = CnotLayer.from_layer_spec(
+        set(data_qubits + measure_qubits), 0.5 + 0.5j, direction=-0.5 + 0.5j, aligned=False,
+    )
+    for _ in range(100):
+        qubits = set(rng.sample(data_qubits + measure_qubits, rng.randint(0, 10)))
+        for basis in Basis:
+            expected = set(
+                q for out in layer.track_stabilizers_dict(qubits, basis).values() for q in out
+            )
+            assert layer.propagate(qubits, basis) == expected
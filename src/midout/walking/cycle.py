@@ -1,6 +1,5 @@
-from typing import Iterable
-
-import matplotlib.pyplot as plt
+import dataclasses
+from typing import Iterable, List
 
 from midout.walking.cnot_layer import CnotLayer
 from midout.walking.diamonds import DiamondState
@@ -29,8 +28,12 @@ class Cycle:
         flip_left_right=False,
         reverse_expansion=False,
     ):
+        self._untranslated = None
         self.index = index
+        self.direction = direction
+        self._reverse_expansion = reverse_expansion
         self.input_tile_state = input_tile_state
+        self.input_contracting_diamond_state = input_contracting_diamond_state
         self.output_tile_state = input_tile_state.translate(direction)
         self._dont_make_measurements = dont_make_measurements
 
@@ -156,12 +159,105 @@ class Cycle:
         return Cycle(
             index=self.index + 1,
             input_tile_state=self.output_tile_state,
-            input_contracting_diamond_state=self.diamond_states[-1],
+            input_contracting_diamond_state=self.last_diamond_state,
             direction=direction,
         )
 
+    def translated(
+        self, offset: complex, index_shift: int, input_contracting_diamond_state: DiamondState
+    ) -> 'Cycle':
+        """returns this cycle moved by offset and index_shift rounds later, mostly without rebuilding it.
+
+        input_contracting_diamond_state must equal this cycle's input state, translated.
+        Translating a set doesn't preserve its iteration order, and the order of the logical
+        observable's qubits decides the order of its OBSERVABLE_INCLUDE targets. So the reset
+        layer is rebuilt from the given state, and the observables are traced through the
+        translated layers the same way building the cycle would trace them.
+
+        Only the final diamond state (which the next cycle starts from) is translated
+        immediately. The intermediate ones are translated the first time they're asked for.
+        """
+        result = Cycle.__new__(Cycle)
+        result.index = self.index + index_shift
+        result.direction = self.direction
+        result._reverse_expansion = self._reverse_expansion
+        result.input_tile_state = self.input_tile_state.translate(offset)
+        result.output_tile_state = self.output_tile_state.translate(offset)
+        result._dont_make_measurements = self._dont_make_measurements
+        result._input_contracting_diamond_state = input_contracting_diamond_state
+        result.post_reset_diamonds, result.reset_layer = ResetLayer.from_tiles_and_diamonds(
+            result.input_tile_state,
+            input_contracting_diamond_state,
+            direction=self.direction,
+            reverse_expansion=self._reverse_expansion,
+        )
+        result.cnot_layers = [layer.translated(offset) for layer in self.cnot_layers]
+        result.layers = [result.reset_layer] + result.cnot_layers[: len(self.layers) - 1]
+
+        observables = result.post_reset_diamonds.observables
+        for layer in result.layers[1:]:
+            observables = layer.track_observables(observables)
+        last_diamonds = frozenset(
+            d.translated(offset, index_shift) for d in self.diamond_states[-1].diamonds
+        )
+        if self.measure_layer is None:
+            result.measure_layer = None
+            result.post_measure_cont_diamonds = None
+        else:
+            measure_layer = self.measure_layer.translated(offset, index_shift)
+            measured = {
+                b: {m.qubit: m for m in ms} for b, ms in measure_layer.measurements.items()
+            }
+            includes, observables = MeasLayer.measure_observables(observables, measured)
+            result.measure_layer = dataclasses.replace(
+                measure_layer, observable_includes=includes
+            )
+            result.layers.append(result.measure_layer)
+        last_state = DiamondState(diamonds=last_diamonds, observables=observables)
+        if result.measure_layer is not None:
+            result.post_measure_cont_diamonds = last_state
+        result._diamond_states = [result.post_reset_diamonds, last_state]
+        result._untranslated = (self, offset, index_shift)
+        return result
+
+    def _finish_translation(self):
+        if self._untranslated is not None:
+            source, offset, index_shift = self._untranslated
+            self._untranslated = None
+            self._diamond_states = (
+                self._diamond_states[:1]
+                + [ds.translated(offset, index_shift) for ds in source.diamond_states[1:-1]]
+                + self._diamond_states[-1:]
+            )
+
+    @property
+    def input_contracting_diamond_state(self) -> DiamondState:
+        self._finish_translation()
+        return self._input_contracting_diamond_state
+
+    @input_contracting_diamond_state.setter
+    def input_contracting_diamond_state(self, value: DiamondState):
+        self._input_contracting_diamond_state = value
+
+    @property
+    def diamond_states(self) -> List[DiamondState]:
+        """the diamond state after each layer of the cycle."""
+        self._finish_translation()
+        return self._diamond_states
+
+    @diamond_states.setter
+    def diamond_states(self, value: List[DiamondState]):
+        self._diamond_states = value
+
+    @property
+    def last_diamond_state(self) -> DiamondState:
+        """the diamond state after the last layer, i.e. the state the next cycle starts from."""
+        return self._diamond_states[-1]
+
     def plot(self, axes=None, plot_gates=False):
         """plot out the 6 diamonds from this cycle, optionally with cnots."""
+        import matplotlib.pyplot as plt
+
         if axes is None:
             p = len(self.diamond_states)
             _, axes = plt.subplots(p, figsize=(15, 15 * p))
@@ -1,9 +1,8 @@
+import contextlib
+import contextvars
 import dataclasses
-import itertools
-from typing import ClassVar, Dict, FrozenSet, Iterable, Optional, TYPE_CHECKING, Union
+from typing import Dict, FrozenSet, Iterable, Iterator, Optional, TYPE_CHECKING, Union
 
-import matplotlib as mpl
-import matplotlib.pyplot as plt
 import numpy as np
 
 from midout.walking.util import (
@@ -21,12 +20,27 @@ from midout.walking.util import (
 
 if TYPE_CHECKING:
     from midout.walking.cnot_layer import CnotLayer
-    from midout.walking.stim_circuit_builder import StimCircuitBuilder
 
 DIAMOND_LINE_HALF_WIDTH = 0.09
 DIAMOND_ERROR_HALF_WIDTH = 0.05
 DIAMOND_CIRCLE_RADIUS = DIAMOND_LINE_HALF_WIDTH * 2.0 / 3.0
 
+# The duid source for diamonds created in the current context (None means don't assign duids).
+# Being a context variable, each thread (and each asyncio task) sees its own value.
+_DUID_COUNTER: contextvars.ContextVar[Optional[Iterator[int]]] = contextvars.ContextVar(
+    '_DUID_COUNTER', default=None
+)
+
+
+@contextlib.contextmanager
+def assigning_duids(counter: Iterator[int]):
+    """Within this context, diamonds created without a duid take the next one from counter."""
+    token = _DUID_COUNTER.set(counter)
+    try:
+        yield
+    finally:
+        _DUID_COUNTER.reset(token)
+
 
 @dataclasses.dataclass(frozen=True)
 class Diamond:
@@ -60,24 +74,34 @@ class Diamond:
     qubit_to_reinclude: Optional[Qubit] = None
     duid: Optional[int] = None
 
-    duid_counter: ClassVar[Optional['StimCircuitBuilder']] = None
-
-    @classmethod
-    def reset_duid_counter(cls):
-        cls.duid_counter = itertools.count(start=1)
-
-    @classmethod
-    def delete_duid_counter(cls):
-        cls.duid_counter = None
-
     def __post_init__(self):
-        if self.duid_counter is not None and self.duid is None:
-            object.__setattr__(self, 'duid', next(self.duid_counter))
+        if self.duid is None:
+            counter = _DUID_COUNTER.get()
+            if counter is not None:
+                object.__setattr__(self, 'duid', next(counter))
 
     @property
     def color(self):
         return self.override_color or get_default_color(self.basis, self.marker_type)
 
+    def translated(self, offset: complex, index_shift: int) -> 'Diamond':
+        """returns this diamond moved by offset, with its measurements index_shift rounds later."""
+        return Diamond(
+            qubits=frozenset(q + offset for q in self.qubits),
+            basis=self.basis,
+            marker_type=self.marker_type,
+            override_color=self.override_color,
+            measurements=(
+                None
+                if self.measurements is None
+                else frozenset(m.translated(offset, index_shift) for m in self.measurements)
+            ),
+            qubit_to_reinclude=(
+                None if self.qubit_to_reinclude is None else self.qubit_to_reinclude + offset
+            ),
+            duid=self.duid,
+        )
+
     def __len__(self):
         return len(self.qubits)
 
@@ -171,6 +195,14 @@ class DiamondState:
             qubits.update(obv)
         return qubits
 
+    def translated(self, offset: complex, index_shift: int) -> 'DiamondState':
+        return DiamondState(
+            diamonds=frozenset(d.translated(offset, index_shift) for d in self.diamonds),
+            observables={
+                b: frozenset(q + offset for q in obv) for b, obv in self.observables.items()
+            },
+        )
+
     def add_diamond(self, diamond):
         return DiamondState(
             diamonds=frozenset(self.diamonds | {diamond}), observables=self.observables
@@ -253,6 +285,9 @@ class DiamondState:
         interpolate_kwargs=None,
         plot_expanding_marker=True,
     ):
+        import matplotlib as mpl
+        import matplotlib.pyplot as plt
+
         if ax is None:
             _, ax = plt.subplots()
 
@@ -1,8 +1,5 @@
 import dataclasses
-from typing import Dict, FrozenSet, List, Optional, Set, Tuple
-
-import matplotlib as mpl
-import matplotlib.pyplot as plt
+from typing import Dict, FrozenSet, Iterable, List, Optional, Tuple
 
 from midout.walking.diamonds import Diamond, DiamondState
 from midout.walking.tiles import TileState
@@ -18,12 +15,45 @@ from midout.walking.util import (
 MEAS_CIRCLE_RADIUS = 0.09
 
 
+def observable_include_order(includes: Iterable[Measurement]) -> Tuple[Measurement, ...]:
+    """the order in which the given measurements become OBSERVABLE_INCLUDE targets.
+
+    This is the iteration order of a frozenset of the measurements, which is what the targets were
+    emitted in when the circuits in assets/stats.csv were generated. Their sinter strong ids hash
+    the circuit text, so the order must not change. It isn't a sort: it depends on the hashes of
+    the measurements and on the order they're given in, and so on the order of the observable's
+    qubits, which comes from CnotLayer.track_observables. Fixing the order here, once per measure
+    layer, makes it part of the layer's value (compared by equality), and the walking circuit
+    tests pin the resulting circuit text.
+    """
+    return tuple(frozenset(includes))
+
+
 @dataclasses.dataclass(frozen=True)
 class MeasLayer:
 
     measurements: Dict[Basis, FrozenSet[Measurement]]
     detectors: FrozenSet[Tuple[FrozenSet[Measurement], int]]
-    observable_includes: Dict[Basis, FrozenSet[Measurement]]
+    # in the order of the OBSERVABLE_INCLUDE targets, see observable_include_order
+    observable_includes: Dict[Basis, Tuple[Measurement, ...]]
+
+    def translated(self, offset: complex, index_shift: int) -> 'MeasLayer':
+        """moves the layer by offset and index_shift rounds later.
+
+        The observable includes keep their order, which generally isn't the order building the
+        layer at the new position would give them (see observable_include_order).
+        """
+        def move(ms: FrozenSet[Measurement]) -> FrozenSet[Measurement]:
+            return frozenset(m.translated(offset, index_shift) for m in ms)
+
+        return MeasLayer(
+            measurements={b: move(ms) for b, ms in self.measurements.items()},
+            detectors=frozenset((move(ms), duid) for ms, duid in self.detectors),
+            observable_includes={
+                b: tuple(m.translated(offset, index_shift) for m in ms)
+                for b, ms in self.observable_includes.items()
+            },
+        )
 
     @staticmethod
     def make_measure_layer(tile_state: TileState, diamond_state: DiamondState, index: int):
@@ -45,32 +75,37 @@ class MeasLayer:
         qubits_to_dropout = diamond_state.all_qubits.difference(qubits_to_keep)
         qubits_to_measure = qubits_to_reinclude | qubits_to_dropout
 
-        measurements: Dict[Basis, Set[Measurement]] = {Basis.x: set(), Basis.z: set()}
+        # Each measured qubit's measurement, per basis.
+        measured: Dict[Basis, Dict[Qubit, Measurement]] = {Basis.x: {}, Basis.z: {}}
         detectors: List[Tuple[FrozenSet[Measurement], int]] = []
-        observable_includes: Dict[Basis, Set[Measurement]] = {}
         contracting_diamonds = []
 
         for d in diamond_state.diamonds:
             if d.marker_type == MarkerType.contracting:
                 # make sure all qubits are in qubits to measure, else complain
+                unmeasured = d.qubits - qubits_to_measure
+                if unmeasured:
+                    raise ValueError(
+                        "A contracting diamond did not have all its qubits measured: "
+                        f"Qubit {next(iter(unmeasured))} in Diamond {d} wasn't included in "
+                        f"qubits_to_measure {qubits_to_measure}"
+                    )
                 this_detector = set(d.measurements) if d.measurements is not None else set()
                 for q in d.qubits:
-                    if q not in qubits_to_measure:
-                        raise ValueError(
-                            "A contracting diamond did not have all its qubits measured: "
-                            f"Qubit {q} in Diamond {d} wasn't included in qubits_to_measure "
-                            f"{qubits_to_measure}"
-                        )
-                    measurements[d.basis].add(Measurement(index, q))
-                    this_detector.add(Measurement(index, q))
+                    m = measured[d.basis].get(q)
+                    if m is None:
+                        m = measured[d.basis][q] = Measurement(index, q)
+                    this_detector.add(m)
                 detectors.append((frozenset(this_detector), d.duid))
 
             elif d.marker_type == MarkerType.expanding:
                 # measure the qubits you're supposed to measure
-                this_diamond_measurements = set(
-                    Measurement(index, q) for q in d.qubits if q in qubits_to_measure
-                )
-                measurements[d.basis].update(this_diamond_measurements)
+                this_diamond_measurements = set()
+                for q in d.qubits & qubits_to_measure:
+                    m = measured[d.basis].get(q)
+                    if m is None:
+                        m = measured[d.basis][q] = Measurement(index, q)
+                    this_diamond_measurements.add(m)
                 # work out if we are measuring a qubit to re-include later
                 possible_measure_qubits = [q for q in d.qubits if q in qubits_to_reinclude]
                 if len(possible_measure_qubits) == 0:
@@ -99,33 +134,42 @@ class MeasLayer:
             elif d.marker_type == MarkerType.error:
                 pass
 
-        new_observables: Dict[Basis, Set[Qubit]] = {}
-        for b, obv in diamond_state.observables.items():
-            new_observables[b] = set()
-            observable_includes[b] = set()
-            for q in obv:
-                # each obvs qubit is either being measured, or surviving
-                for m in measurements[b]:
-                    if m.qubit == q:
-                        observable_includes[b].add(m)
-                        break
-                else:
-                    new_observables[b].add(q)
-            # check we didn't find any 'survivors' that are measured in the other basis
-            if len(new_observables[b].intersection({m.qubit for m in measurements[b.flip()]})) != 0:
-                raise ValueError("a qubit in an observable was measured in a non-commuting basis")
-
+        observable_includes, new_observables = MeasLayer.measure_observables(
+            diamond_state.observables, measured
+        )
         contracting_ds = DiamondState(
             diamonds=frozenset(contracting_diamonds),
-            observables={b: frozenset(s) for b, s in new_observables.items()},
+            observables=new_observables,
         )
         m_layer = MeasLayer(
-            measurements={b: frozenset(s) for b, s in measurements.items()},
+            measurements={b: frozenset(ms.values()) for b, ms in measured.items()},
             detectors=frozenset(detectors),
-            observable_includes={b: frozenset(s) for b, s in observable_includes.items()},
+            observable_includes=observable_includes,
         )
         return contracting_ds, m_layer
 
+    @staticmethod
+    def measure_observables(
+        observables: Dict[Basis, FrozenSet[Qubit]],
+        measured: Dict[Basis, Dict[Qubit, Measurement]],
+    ) -> Tuple[Dict[Basis, Tuple[Measurement, ...]], Dict[Basis, FrozenSet[Qubit]]]:
+        """splits the logical observables into their measured and surviving parts.
+
+        Returns the observable includes and the observables left after the measurements.
+        """
+        observable_includes: Dict[Basis, Tuple[Measurement, ...]] = {}
+        new_observables: Dict[Basis, FrozenSet[Qubit]] = {}
+        for b, obv in observables.items():
+            # each obvs qubit is either being measured, or surviving
+            includes = {measured[b][q] for q in obv if q in measured[b]}
+            survivors = {q for q in obv if q not in measured[b]}
+            # check we didn't find any 'survivors' that are measured in the other basis
+            if not survivors.isdisjoint(measured[b.flip()]):
+                raise ValueError("a qubit in an observable was measured in a non-commuting basis")
+            observable_includes[b] = observable_include_order(includes)
+            new_observables[b] = frozenset(survivors)
+        return observable_includes, new_observables
+
     @staticmethod
     def make_final_measure_layer(
         tile_state: TileState,
@@ -162,11 +206,11 @@ class MeasLayer:
                     f"Non-commuting observable {basis.flip()} "
                     f"in final measurement round in basis {basis}"
                 )
-            observable_includes[basis] = frozenset(
+            observable_includes[basis] = observable_include_order(
                 Measurement(index, q) for q in diamond_state.observables[basis]
             )
         else:
-            observable_includes[basis]: FrozenSet[Measurement] = frozenset()
+            observable_includes[basis] = ()
 
         return MeasLayer(
             measurements=measurements,
@@ -176,6 +220,9 @@ class MeasLayer:
 
     def plot(self, ax=None):
         """plot this layer's measurements."""
+        import matplotlib as mpl
+        import matplotlib.pyplot as plt
+
         if ax is None:
             _, ax = plt.subplots()
 
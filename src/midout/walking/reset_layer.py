@@ -1,10 +1,6 @@
 import dataclasses
 from typing import Dict, FrozenSet, Optional, Set, TYPE_CHECKING
 
-import matplotlib as mpl
-import matplotlib.pyplot as plt
-import numpy as np
-
 from midout.walking.diamonds import Diamond, DiamondState
 from midout.walking.util import (
     Basis,
@@ -35,6 +31,11 @@ class ResetLayer:
 
     resets: Dict[Optional[Basis], FrozenSet[Qubit]]
 
+    def translated(self, offset: complex) -> 'ResetLayer':
+        return ResetLayer(
+            resets={b: frozenset(q + offset for q in qs) for b, qs in self.resets.items()}
+        )
+
     @staticmethod
     def from_tiles_and_diamonds(
         tile_state: 'TileState',
@@ -45,13 +46,18 @@ class ResetLayer:
         new_diamonds = []
         resets = {Basis.z: set(), Basis.x: set()}
 
+        # index the contracting diamonds by the qubit they reinclude, instead of searching per tile
+        diamonds_by_reinclude_qubit: Dict[Optional[Qubit], Set[Diamond]] = {}
+        for d in contracting_diamond_state.diamonds:
+            diamonds_by_reinclude_qubit.setdefault(d.qubit_to_reinclude, set()).add(d)
+
         for t in tile_state.tiles:
             # each of tile looks
             # and produce a new expanding diamond
 
             # first, lets get the corresponding contracting diamond for this tile
-            possibly_multiple_diamonds = (
-                contracting_diamond_state.get_diamonds_with_reinclude_qubit(t.measure_qubit)
+            possibly_multiple_diamonds = set(
+                diamonds_by_reinclude_qubit.get(t.measure_qubit, ())
             )
             if len(possibly_multiple_diamonds) > 1:
                 raise ValueError
@@ -171,7 +177,7 @@ class ResetLayer:
         for b, obvs in contracting_diamond_state.observables.items():
             for q in resets[b]:
                 # check if it's near the observable
-                if any([np.abs(qo - q) < 1 for qo in obvs]):
+                if any(abs(qo - q) < 1 for qo in obvs):
                     diamonds_that_have_this_qubit = [d for d in new_diamonds if q in d.qubits]
                     if len(diamonds_that_have_this_qubit) == 0:
                         raise ValueError("a qubit was reset but not included in any diamonds")
@@ -219,6 +225,9 @@ class ResetLayer:
 
     def plot(self, ax=None):
         """plot this layer's resets."""
+        import matplotlib as mpl
+        import matplotlib.pyplot as plt
+
         if ax is None:
             _, ax = plt.subplots()
 
@@ -42,7 +42,7 @@ class StimCircuitBuilder:
     _qubit_coords_circuit: stim.Circuit = dataclasses.field(default_factory=stim.Circuit)
 
     errors: Optional[float] = None
-    duid_counter: Iterator = itertools.count()
+    duid_counter: Iterator = dataclasses.field(default_factory=itertools.count)
 
     @property
     def stim_circuit(self):
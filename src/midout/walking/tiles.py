@@ -1,9 +1,8 @@
 import dataclasses
+import functools
 import itertools
-from typing import cast, Dict, FrozenSet, List, Set
+from typing import cast, Dict, FrozenSet, List, Optional, Set, Tuple
 
-import matplotlib as mpl
-import matplotlib.pyplot as plt
 import numpy as np
 
 from midout.walking.reset_layer import ResetLayer
@@ -62,10 +61,25 @@ class Tile:
 
 @dataclasses.dataclass()
 class TileState:
+    """The tiles (and observables) of a surface code patch at the measure reset layer.
+
+    Walking circuits move the same patch around, so translated tile states are
+    remembered on the untranslated state they came from (the "origin") keyed
+    by their offset. Translating back to an offset seen before returns the same
+    object, along with its already computed qubit sets.
+    """
+
     tiles: FrozenSet[Tile]
     top_boundary_basis: Basis
     observables: Dict[Basis, FrozenSet[Qubit]]
 
+    _origin: Optional[Tuple['TileState', complex]] = dataclasses.field(
+        default=None, init=False, repr=False, compare=False
+    )
+    _translations: Dict[complex, 'TileState'] = dataclasses.field(
+        default_factory=dict, init=False, repr=False, compare=False
+    )
+
     def tiles_with_qubit(self, q: Qubit):
         return set([t for t in self.tiles if q in t.all_qubits])
 
@@ -84,17 +98,17 @@ class TileState:
         """
         return len([t for t in self.tiles_with_qubit(q) if t.basis == basis.flip()]) == 1
 
-    @property
-    def measure_qubits(self) -> Set[Qubit]:
-        return set([t.measure_qubit for t in self.tiles])
+    @functools.cached_property
+    def measure_qubits(self) -> FrozenSet[Qubit]:
+        return frozenset([t.measure_qubit for t in self.tiles])
 
-    @property
-    def all_qubits(self) -> Set[Qubit]:
-        return set(q for t in self.tiles for q in t.all_qubits)
+    @functools.cached_property
+    def all_qubits(self) -> FrozenSet[Qubit]:
+        return frozenset(q for t in self.tiles for q in t.all_qubits)
 
-    @property
-    def all_bulk_qubits(self):
-        return set(q for t in self.tiles for q in t.all_qubits if len(t.data_qubits) == 4)
+    @functools.cached_property
+    def all_bulk_qubits(self) -> FrozenSet[Qubit]:
+        return frozenset(q for t in self.tiles for q in t.all_qubits if len(t.data_qubits) == 4)
 
     @staticmethod
     def make_surface_code(
@@ -176,6 +190,9 @@ class TileState:
         )
 
     def plot(self, ax=None, plot_observables=True, plot_measure_qubits=True):
+        import matplotlib as mpl
+        import matplotlib.pyplot as plt
+
         if ax is None:
             _, ax = plt.subplots()
 
@@ -284,17 +301,32 @@ class TileState:
         )
         return full_diamond_state
 
+    def offset_from(self, other: 'TileState') -> Optional[complex]:
+        """returns the offset translating other into this state, or None if that isn't known."""
+        origin, offset = self._origin or (self, 0)
+        other_origin, other_offset = other._origin or (other, 0)
+        if origin is not other_origin:
+            return None
+        return offset - other_offset
+
     def translate(self, direction) -> 'TileState':
         """returns the equiv tilestate translated by direction."""
-        return (
-            TileState(
-                tiles=frozenset([t.translate(direction) for t in self.tiles]),
-                top_boundary_basis=self.top_boundary_basis,
+        if direction is None:
+            return self
+        origin, offset = self._origin or (self, 0)
+        offset += direction
+        if offset == 0:
+            return origin
+        result = origin._translations.get(offset)
+        if result is None:
+            result = TileState(
+                tiles=frozenset([t.translate(offset) for t in origin.tiles]),
+                top_boundary_basis=origin.top_boundary_basis,
                 observables={
-                    b: frozenset([q + direction for q in obv])
-                    for b, obv in self.observables.items()
+                    b: frozenset([q + offset for q in obv])
+                    for b, obv in origin.observables.items()
                 },
             )
-            if direction is not None
-            else self
-        )
+            result._origin = (origin, offset)
+            origin._translations[offset] = result
+        return result
@@ -0,0 +1,21 @@
+from midout.walking.tiles import TileState
+from midout.walking.util import DOWN_RIGHT, UP_LEFT
+
+
+def test_translate():
+    ts = TileState.make_surface_code(distance=5)
+    moved = ts.translate(DOWN_RIGHT)
+    assert moved.all_qubits == frozenset(q + DOWN_RIGHT for q in ts.all_qubits)
+    assert moved.measure_qubits == frozenset(q + DOWN_RIGHT for q in ts.measure_qubits)
+    assert moved.all_bulk_qubits == frozenset(q + DOWN_RIGHT for q in ts.all_bulk_qubits)
+    assert moved.observables == {
+        b: frozenset(q + DOWN_RIGHT for q in obs) for b, obs in ts.observables.items()
+    }
+    assert moved.translate(None) is moved
+
+    # Translations are remembered, so walking back and forth reuses the same states.
+    assert moved.translate(UP_LEFT) is ts
+    assert ts.translate(DOWN_RIGHT) is moved
+    twice = moved.translate(DOWN_RIGHT)
+    assert twice is ts.translate(2 * DOWN_RIGHT)
+    assert twice.tiles == frozenset(t.translate(2 * DOWN_RIGHT) for t in ts.tiles)
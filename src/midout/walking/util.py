@@ -135,3 +135,6 @@ def get_observable_marker(basis: Basis):
 class Measurement:
     index: int
     qubit: Qubit
+
+    def translated(self, offset: complex, index_shift: int) -> 'Measurement':
+        return Measurement(index=self.index + index_shift, qubit=self.qubit + offset)
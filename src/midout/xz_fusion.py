@@ -0,0 +1,171 @@
+import csv
+import json
+import pathlib
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple, Union
+
+import sinter
+
+PathLike = Union[str, pathlib.Path]
+
+XzPairKey = Tuple[Any, ...]
+
+_CSV_FIELDS = ("shots", "errors", "discards", "seconds", "decoder", "strong_id", "json_metadata")
+
+
+def xz_pair_key(stat: sinter.TaskStats) -> XzPairKey:
+    """Identifies the X and Z basis stats that get fused together.
+
+    Everything except the basis `b` has to match, including the decoder.
+    """
+    return (stat.decoder,) + tuple(sorted((k, v) for k, v in stat.json_metadata.items() if k != 'b'))
+
+
+def fuse_xz_pair(a: sinter.TaskStats, b: sinter.TaskStats) -> sinter.TaskStats:
+    """Combines the stats of the two bases into stats for the 'XZ' basis.
+
+    A fused shot fails when either basis fails, assuming the two fail
+    independently. The fused stats have as many shots as the basis with the
+    fewest shots.
+    """
+    if a.shots > b.shots:
+        a, b = b, a
+    assert a.discards == b.discards == 0
+    new_errors = round((1 - (1 - a.errors / a.shots) * (1 - b.errors / b.shots)) * a.shots)
+
+    new_metadata = dict(a.json_metadata)
+    new_metadata['b'] = 'XZ'
+    return sinter.TaskStats(
+        strong_id=a.strong_id,
+        decoder=a.decoder,
+        json_metadata=new_metadata,
+        shots=a.shots,
+        errors=new_errors,
+        discards=0,
+        seconds=a.seconds + b.seconds,
+    )
+
+
+def _stat_from_row(row: List[str]) -> sinter.TaskStats:
+    shots, errors, discards, seconds, decoder, strong_id, json_metadata = row
+    return sinter.TaskStats(
+        shots=int(shots),
+        errors=int(errors),
+        discards=int(discards),
+        seconds=float(seconds),
+        decoder=decoder.strip(),
+        strong_id=strong_id.strip(),
+        json_metadata=json.loads(json_metadata),
+    )
+
+
+class XzFusionStream:
+    """Incrementally fuses X and Z basis stats out of a stats csv that is still being written.
+
+    Each call to `read_new_rows` only parses the rows appended to the csv
+    since the previous call, adding them to running per-task totals. A line
+    that is still being written (without its trailing newline) is left for
+    the next call.
+    """
+
+    def __init__(self, path: PathLike):
+        self.path = pathlib.Path(path)
+        self.totals: Dict[str, sinter.TaskStats] = {}
+        self.pairs: Dict[XzPairKey, Dict[str, sinter.TaskStats]] = {}
+        self._offset = 0
+        self._columns: Optional[List[int]] = None
+
+    def read_new_rows(self) -> int:
+        """Reads the complete rows appended since the last call, and returns how many there were."""
+        with open(self.path, 'rb') as f:
+            f.seek(self._offset)
+            data = f.read()
+        end = data.rfind(b'\n') + 1
+        self._offset += end
+        lines = data[:end].decode('utf8').splitlines()
+
+        n = 0
+        for row in csv.reader(lines):
+            if self._columns is None:
+                names = [e.strip() for e in row]
+                if sorted(names) != sorted(_CSV_FIELDS):
+                    raise ValueError(
+                        f"Bad CSV data. "
+                        f"Got columns {sorted(names)!r} "
+                        f"but expected columns {sorted(_CSV_FIELDS)!r}")
+                self._columns = [names.index(name) for name in _CSV_FIELDS]
+                continue
+            self._add(_stat_from_row([row[k] for k in self._columns]))
+            n += 1
+        return n
+
+    def _add(self, stat: sinter.TaskStats) -> None:
+        if stat.strong_id in self.totals:
+            stat = self.totals[stat.strong_id] + stat
+        self.totals[stat.strong_id] = stat
+        pair = self.pairs.setdefault(xz_pair_key(stat), {})
+        pair[stat.json_metadata['b']] = stat
+        if len(pair) > 2:
+            raise ValueError(f"More than two bases for {stat.json_metadata}?")
+
+    def completable_pairs(
+            self,
+            *,
+            max_shots: Optional[int],
+            max_errors: Optional[int],
+    ) -> Iterator[Tuple[sinter.TaskStats, sinter.TaskStats]]:
+        """Yields the pairs whose bases both reached one of the collection limits."""
+        assert max_shots is not None or max_errors is not None
+        for pair in self.pairs.values():
+            if len(pair) == 2 and all(
+                (max_shots is not None and stat.shots >= max_shots)
+                or (max_errors is not None and stat.errors >= max_errors)
+                for stat in pair.values()
+            ):
+                yield tuple(pair.values())
+
+
+def fused_index_path(fused_path: PathLike) -> pathlib.Path:
+    """Returns where the strong ids of the already fused stats of a fused stats csv are stored."""
+    fused_path = pathlib.Path(fused_path)
+    return fused_path.with_name(fused_path.name + '.index')
+
+
+def read_fused_index(fused_path: PathLike) -> Set[str]:
+    """Returns the strong ids of the stats that were already fused into a fused stats csv."""
+    path = fused_index_path(fused_path)
+    if not path.exists():
+        return set()
+    with open(path) as f:
+        return {line.strip() for line in f if line.strip()}
+
+
+def append_fused_stats(
+        fused_path: PathLike,
+        pairs: List[Tuple[sinter.TaskStats, sinter.TaskStats]],
+) -> List[sinter.TaskStats]:
+    """Fuses the pairs that aren't in the fused stats csv's index yet, and appends them.
+
+    The csv is written before the index, so an interruption can't result in
+    pairs that are indexed without having been written.
+
+    Returns:
+        The newly appended fused stats.
+    """
+    fused_path = pathlib.Path(fused_path)
+    done = read_fused_index(fused_path)
+    new_pairs = [(a, b) for a, b in pairs if a.strong_id not in done and b.strong_id not in done]
+    if not new_pairs:
+        return []
+
+    fused = [fuse_xz_pair(a, b) for a, b in new_pairs]
+    write_header = not fused_path.exists() or fused_path.stat().st_size == 0
+    with open(fused_path, 'a') as f:
+        if write_header:
+            print(sinter.CSV_HEADER, file=f)
+        for stat in fused:
+            print(stat, file=f)
+    with open(fused_index_path(fused_path), 'a') as f:
+        for a, b in new_pairs:
+            print(a.strong_id, file=f)
+            print(b.strong_id, file=f)
+    return fused
@@ -0,0 +1,76 @@
+import sinter
+
+from midout._stats_test_util import grid_stat
+from midout.xz_fusion import XzFusionStream, append_fused_stats, fuse_xz_pair, fused_index_path, xz_pair_key
+
+
+def _stat(b: str, *, d: int = 3, shots: int, errors: int) -> sinter.TaskStats:
+    return grid_stat(d, b=b, shots=shots, p_shot=errors / shots)
+
+
+def test_fuse_xz_pair():
+    assert xz_pair_key(_stat('X', shots=1, errors=0)) == xz_pair_key(_stat('Z', shots=2, errors=1))
+    assert xz_pair_key(_stat('X', shots=1, errors=0)) != xz_pair_key(_stat('X', d=5, shots=1, errors=0))
+
+    x = _stat('X', shots=1000, errors=100)
+    fused = fuse_xz_pair(_stat('Z', shots=2000, errors=100), x)
+    assert fused.strong_id == x.strong_id
+    assert fused.json_metadata == {**x.json_metadata, 'b': 'XZ'}
+    assert fused.shots == 1000
+    assert fused.errors == round((1 - 0.9 * 0.95) * 1000)
+    assert fused.seconds == 2
+
+
+def test_stream_reads_appended_rows(tmp_path):
+    path = tmp_path / 'stats.csv'
+    with open(path, 'w') as f:
+        print(sinter.CSV_HEADER, file=f)
+        print(_stat('X', shots=100, errors=5), file=f)
+        # A row that's still being written.
+        f.write(str(_stat('Z', shots=100, errors=7))[:20])
+
+    x_id = _stat('X', shots=1, errors=0).strong_id
+    z_id = _stat('Z', shots=1, errors=0).strong_id
+    stream = XzFusionStream(path)
+    assert stream.read_new_rows() == 1
+    assert list(stream.totals) == [x_id]
+    assert stream.read_new_rows() == 0
+
+    with open(path, 'a') as f:
+        print(str(_stat('Z', shots=100, errors=7))[20:], file=f)
+        print(_stat('X', shots=50, errors=1), file=f)
+    assert stream.read_new_rows() == 2
+    assert stream.totals[x_id].shots == 150
+    assert stream.totals[x_id].errors == 6
+    assert stream.totals[z_id].shots == 100
+    assert stream.pairs[xz_pair_key(stream.totals[x_id])] == {'X': stream.totals[x_id], 'Z': stream.totals[z_id]}
+
+
+def test_append_fused_stats(tmp_path):
+    path = tmp_path / 'stats.csv'
+    out = tmp_path / 'fused.csv'
+    with open(path, 'w') as f:
+        print(sinter.CSV_HEADER, file=f)
+        print(_stat('X', shots=100, errors=5), file=f)
+        print(_stat('Z', shots=100, errors=7), file=f)
+        print(_stat('X', d=5, shots=100, errors=1), file=f)
+
+    stream = XzFusionStream(path)
+    stream.read_new_rows()
+    pairs = list(stream.completable_pairs(max_shots=100, max_errors=None))
+    assert len(pairs) == 1
+    assert len(append_fused_stats(out, pairs)) == 1
+    # Already fused pairs aren't appended again.
+    assert append_fused_stats(out, pairs) == []
+
+    with open(path, 'a') as f:
+        print(_stat('Z', d=5, shots=100, errors=2), file=f)
+    stream.read_new_rows()
+    pairs = list(stream.completable_pairs(max_shots=100, max_errors=None))
+    assert len(pairs) == 2
+    assert len(append_fused_stats(out, pairs)) == 1
+
+    fused = sinter.stats_from_csv_files(out)
+    assert sorted(stat.json_metadata['d'] for stat in fused) == [3, 5]
+    assert all(stat.json_metadata['b'] == 'XZ' for stat in fused)
+    assert len(fused_index_path(out).read_text().split()) == 4
@@ -3,6 +3,7 @@
 set -e
 
 PYTHONPATH=src parallel --ungroup tools/gen_circuits \
+    --write_dem \
     --out_dir out/circuits \
     --distance 3 5 7 9 11 13 15 \
     --noise_model SI1000 \
@@ -12,6 +13,7 @@ PYTHONPATH=src parallel --ungroup tools/gen_circuits \
     ::: 0.0001 0.0002 0.0003 0.0005 0.0008 0.001 0.002 0.003 0.004 0.005 0.008 0.01
 
 PYTHONPATH=src parallel --ungroup tools/gen_circuits \
+    --write_dem \
     --out_dir out/circuits \
     --distance 3 5 7 9 11 13 15 \
     --noise_model UniformDepolarizing \
@@ -21,6 +23,7 @@ PYTHONPATH=src parallel --ungroup tools/gen_circuits \
     ::: 0.0001 0.0002 0.0003 0.0005 0.0008 0.001 0.002 0.003 0.004 0.005 0.008 0.01
 
 PYTHONPATH=src parallel --ungroup tools/gen_circuits \
+    --write_dem \
     --out_dir out/circuits \
     --distance 4 6 8 10 12 14\
     --noise_model UniformDepolarizing \
@@ -2,10 +2,9 @@
 
 set -e
 
-sinter collect \
+PYTHONPATH=src tools/collect_stats \
     --circuits out/circuits/*.stim \
     --save_resume_filepath out/stats.csv \
-    --metadata_func auto \
     --decoders pymatching \
     --max_shots 1_000_000 \
     --max_errors 1000 \